@@ -0,0 +1,61 @@
+"""
+Utilitas kecil untuk management command benchmark.
+
+Benchmark selalu dijalankan di database sementara (sama seperti test
+runner) sehingga data sintetis tidak pernah menyentuh database asli.
+"""
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+@contextmanager
+def scratch_database():
+    """Buat database test sementara, hapus lagi setelah selesai"""
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def percentile(samples, pct):
+    """Persentil (nearest-rank) dari list angka"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+class Timer:
+    """Kumpulkan durasi (ms) dari blok `with timer:`"""
+
+    def __init__(self):
+        self.samples = []
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.samples.append((time.perf_counter() - self._started) * 1000)
+        return False
+
+    def summary(self):
+        return {
+            'count': len(self.samples),
+            'p50': percentile(self.samples, 50),
+            'p95': percentile(self.samples, 95),
+            'p99': percentile(self.samples, 99),
+            'max': max(self.samples) if self.samples else 0.0,
+        }
+
+    def format(self):
+        stats = self.summary()
+        return (
+            f"n={stats['count']} p50={stats['p50']:.2f}ms p95={stats['p95']:.2f}ms "
+            f"p99={stats['p99']:.2f}ms max={stats['max']:.2f}ms"
+        )
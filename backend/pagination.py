@@ -0,0 +1,163 @@
+"""
+Keyset (cursor) pagination.
+
+Berbeda dengan OFFSET, halaman berikutnya diambil dengan filter
+`(kolom urutan) < nilai baris terakhir`, sehingga biaya query tetap
+konstan seberapa jauh pun user men-scroll.
+
+Cursor datang dari query string, jadi isinya tidak dipercaya: nilai yang
+tidak bisa diubah ke tipe field urutannya membuat cursor dianggap tidak
+valid (kembali ke halaman pertama), bukan error di ORM.
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 24
+
+
+class KeysetPage:
+    """Satu halaman hasil keyset pagination"""
+
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date)):
+        # isoformat penuh (termasuk mikrodetik) agar urutan tetap presisi
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(values):
+    payload = json.dumps([_encode_value(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """Decode cursor, return None jika cursor tidak valid"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError, binascii.Error):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return values
+
+
+def _field_name(ordering_field):
+    return ordering_field.lstrip('-')
+
+
+def _model_field(queryset, field_name):
+    """Field model (atau output_field anotasi) untuk nama field urutan"""
+    annotation = queryset.query.annotations.get(field_name)
+    if annotation is not None:
+        return annotation.output_field
+    model = queryset.model
+    *path, name = field_name.split('__')
+    for part in path:
+        model = model._meta.get_field(part).related_model
+    return model._meta.get_field(name)
+
+
+def coerce_cursor(queryset, ordering, values):
+    """
+    Ubah nilai cursor ke tipe Python field urutannya.
+
+    Returns:
+        list nilai, atau None jika ada nilai yang tidak cocok dengan field-nya
+    """
+    coerced = []
+    for ordering_field, value in zip(ordering, values):
+        field = _model_field(queryset, _field_name(ordering_field))
+        try:
+            value = field.to_python(value)
+            # Batas nilai (mis. rentang integer database) agar tidak gagal saat query
+            field.run_validators(value)
+        except (ValidationError, ValueError, TypeError):
+            return None
+        if value is None:
+            return None
+        coerced.append(value)
+    return coerced
+
+
+def keyset_filter(ordering, values):
+    """
+    Bangun Q untuk baris setelah `values` pada urutan `ordering`.
+
+    Untuk ordering ['-created_at', '-id'] hasilnya:
+        created_at < v0 OR (created_at = v0 AND id < v1)
+    """
+    condition = Q()
+    for index, ordering_field in enumerate(ordering):
+        lookup = 'lt' if ordering_field.startswith('-') else 'gt'
+        branch = Q(**{f'{_field_name(ordering_field)}__{lookup}': values[index]})
+        for previous, value in zip(ordering[:index], values[:index]):
+            branch &= Q(**{_field_name(previous): value})
+        condition |= branch
+    return condition
+
+
+def paginate_keyset(queryset, ordering, cursor=None, per_page=DEFAULT_PAGE_SIZE):
+    """
+    Ambil satu halaman dari queryset dengan keyset pagination.
+
+    Args:
+        queryset: QuerySet sumber
+        ordering: list field urutan, field terakhir harus unik (mis. '-id')
+        cursor: cursor dari halaman sebelumnya (string) atau None
+        per_page: jumlah item per halaman
+
+    Returns:
+        KeysetPage
+    """
+    values = decode_cursor(cursor, len(ordering))
+    if values is not None:
+        values = coerce_cursor(queryset, ordering, values)
+    queryset = queryset.order_by(*ordering)
+    if values is not None:
+        queryset = queryset.filter(keyset_filter(ordering, values))
+
+    items = list(queryset[:per_page + 1])
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        last = items[-1]
+        next_cursor = encode_cursor(
+            [_resolve(last, _field_name(field)) for field in ordering]
+        )
+    return KeysetPage(items, next_cursor)
+
+
+def _resolve(obj, field_name):
+    """Ambil nilai field dari instance model atau dict hasil values()"""
+    if isinstance(obj, dict):
+        return obj[field_name]
+    value = obj
+    for part in field_name.split('__'):
+        value = getattr(value, part)
+    return value
@@ -0,0 +1,105 @@
+"""
+Regression test untuk query plan.
+
+Rekam semua SELECT yang dijalankan sebuah view, jalankan EXPLAIN untuk
+masing-masing, lalu gagal jika ada tabel yang dibaca dengan full scan:
+
+- SQLite: baris `SCAN <tabel>` di EXPLAIN QUERY PLAN (termasuk
+  `SCAN ... USING INDEX`, yang tetap membaca seluruh index), kecuali
+  scan pada partial index: isinya hanya baris yang lolos filter.
+  `SEARCH` berarti index dipakai untuk mempersempit baris. Tabel virtual
+  FTS5 selalu tampil sebagai `SCAN ... VIRTUAL TABLE INDEX n:<idxStr>`;
+  idxStr berisi constraint yang dipakai (`M` = MATCH lewat index
+  full-text), jadi hanya idxStr kosong yang dihitung full scan.
+- PostgreSQL: `Seq Scan on <tabel>` di EXPLAIN, dengan enable_seqscan=off
+  agar tabel test yang kecil tidak membuat planner memilih seq scan.
+
+Dipakai lewat QueryPlanAssertions.assertNoFullScans di tests.py.
+"""
+import re
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.db import connection, transaction
+
+# Tabel yang memang dibaca seluruhnya: tabel kecil (daftar kategori di
+# navbar, permission admin) dan kosakata pencarian (fts5vocab, dibaca
+# utuh sekali per proses lalu di-cache VOCABULARY_TTL detik untuk koreksi
+# typo, lihat products.search)
+ALLOWED_FULL_SCANS = {'products_category', 'auth_permission', 'products_search_vocab'}
+
+SQLITE_SCAN = re.compile(r'^SCAN (\w+)(?: USING (?:COVERING )?INDEX (\w+))?')
+SQLITE_VIRTUAL_SCAN = re.compile(r'^SCAN (\w+) VIRTUAL TABLE INDEX \d+:(\S*)')
+POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+
+@contextmanager
+def record_selects():
+    """Kumpulkan (sql, params) semua SELECT di dalam blok"""
+    queries = []
+
+    def wrapper(execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith('SELECT'):
+            queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        yield queries
+
+
+def explain(sql, params):
+    """Baris-baris query plan untuk satu query"""
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN {sql}', params)
+            return [row[0] for row in cursor.fetchall()]
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        # (id, parent, notused, detail)
+        return [row[3] for row in cursor.fetchall()]
+
+
+def partial_index_names():
+    return {
+        index.name
+        for model in apps.get_models()
+        for index in model._meta.indexes
+        if index.condition is not None
+    }
+
+
+def full_scans(plan):
+    """Nama tabel yang dibaca dengan full scan pada satu plan"""
+    pattern = POSTGRES_SCAN if connection.vendor == 'postgresql' else SQLITE_SCAN
+    partial = partial_index_names()
+    tables = set()
+    for line in plan:
+        virtual = SQLITE_VIRTUAL_SCAN.search(line.strip())
+        if virtual is not None:
+            if not virtual.group(2):
+                tables.add(virtual.group(1))
+            continue
+        match = pattern.search(line.strip())
+        if match is None:
+            continue
+        index = match.group(2) if pattern.groups > 1 else None
+        if index not in partial:
+            tables.add(match.group(1))
+    return tables - ALLOWED_FULL_SCANS
+
+
+class QueryPlanAssertions:
+    """Mixin untuk TestCase"""
+
+    @contextmanager
+    def assertNoFullScans(self):
+        with record_selects() as queries:
+            yield queries
+        failures = []
+        for sql, params in queries:
+            plan = explain(sql, params)
+            tables = full_scans(plan)
+            if tables:
+                failures.append(f'{", ".join(sorted(tables))}:\n  {sql}\n  ' + '\n  '.join(plan))
+        if failures:
+            self.fail('Full scan pada query:\n' + '\n\n'.join(failures))
@@ -42,6 +42,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'cart.middleware.GuestCartMiddleware',  # ← keranjang tamu (cookie)
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -75,6 +76,59 @@ DATABASES = {
         conn_health_checks=True,
     )
 }
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default']['OPTIONS'] = {
+        # Checkout paralel antre menunggu lock tulis, bukan gagal "database is locked"
+        'transaction_mode': 'IMMEDIATE',
+        'timeout': 20,
+    }
+    # Database test berupa file (bukan in-memory) agar test konkurensi bisa
+    # memakai beberapa koneksi sekaligus
+    DATABASES['default']['TEST'] = {'NAME': os.path.join(BASE_DIR, 'test_db.sqlite3')}
+
+# Cache
+# Default: LocMemCache per proses. Set REDIS_URL di production agar cache
+# (fragment kartu produk, dll.) dibagi semua worker.
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'dapoerhub',
+            'OPTIONS': {
+                'MAX_ENTRIES': 50000,
+            },
+        }
+    }
+
+# Cache kartu produk (products.card_cache) dan halaman katalog anonim
+# (products.catalog) diinvalidasi lewat key versi di cache. Dengan
+# LocMemCache invalidasi hanya terlihat di proses yang menanganinya; worker
+# gunicorn lain tetap menyajikan isi lama sampai entry-nya kedaluwarsa. Tanpa
+# cache bersama umur entry dibuat pendek (selama itulah maksimal data basi
+# di worker lain); dengan satu proses (runserver) invalidasi tetap langsung.
+PRODUCT_CARD_CACHE_TIMEOUT = config(
+    'PRODUCT_CARD_CACHE_TIMEOUT', default=60 * 60 * 24 if REDIS_URL else 60, cast=int
+)
+CATALOG_PAGE_CACHE_TIMEOUT = config(
+    'CATALOG_PAGE_CACHE_TIMEOUT', default=60 * 10 if REDIS_URL else 60, cast=int
+)
+
+# Penyimpanan keranjang aktif (cart.store): 'database' atau 'cache'
+# (write-behind, flush lewat `manage.py flush_carts`). 'cache' hanya aman
+# dengan cache bersama, jadi default-nya mengikuti REDIS_URL.
+CART_STORE = config('CART_STORE', default='cache' if REDIS_URL else 'database')
+
+# Background tasks (backend.tasks)
+BACKGROUND_TASK_WORKERS = config('BACKGROUND_TASK_WORKERS', default=2, cast=int)
+BACKGROUND_TASKS_SYNC = config('BACKGROUND_TASKS_SYNC', default=False, cast=bool)
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -163,6 +217,17 @@ MIDTRANS_CLIENT_KEY = config('MIDTRANS_CLIENT_KEY', default='Mid-client-R1wKibj2
 MIDTRANS_IS_PRODUCTION = config('MIDTRANS_IS_PRODUCTION', default=False, cast=bool)
 MIDTRANS_IS_SANITIZED = True
 MIDTRANS_IS_3DS = True
+# Client Midtrans bersama (payments.gateway): timeout (detik), retry dan
+# circuit breaker agar gateway yang lambat/mati tidak menahan semua worker
+MIDTRANS_CONNECT_TIMEOUT = config('MIDTRANS_CONNECT_TIMEOUT', default=3.05, cast=float)
+MIDTRANS_READ_TIMEOUT = config('MIDTRANS_READ_TIMEOUT', default=10, cast=float)
+MIDTRANS_MAX_RETRIES = config('MIDTRANS_MAX_RETRIES', default=2, cast=int)
+MIDTRANS_POOL_SIZE = config('MIDTRANS_POOL_SIZE', default=10, cast=int)
+MIDTRANS_BREAKER_THRESHOLD = config('MIDTRANS_BREAKER_THRESHOLD', default=5, cast=int)
+MIDTRANS_BREAKER_RESET = config('MIDTRANS_BREAKER_RESET', default=30, cast=float)
+# Kosong = URL resmi Midtrans; diisi untuk proxy/stand-in lokal
+MIDTRANS_API_URL = config('MIDTRANS_API_URL', default='')
+MIDTRANS_SNAP_URL = config('MIDTRANS_SNAP_URL', default='')
 
 # Site URL (akan diisi Railway URL nanti)
 SITE_URL = config('SITE_URL', default='http://127.0.0.1:8000')
\ No newline at end of file
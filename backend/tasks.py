@@ -0,0 +1,57 @@
+"""
+Background task sederhana berbasis thread pool.
+
+Task dijalankan setelah transaksi yang memanggilnya commit, di luar
+request/response cycle. Untuk beban berat atau multi-server sebaiknya
+diganti task queue sungguhan; API `run_in_background` sengaja dibuat
+minimal agar mudah dipindahkan.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'BACKGROUND_TASK_WORKERS', 2),
+                    thread_name_prefix='background-task',
+                )
+    return _executor
+
+
+def _run(func, args, kwargs):
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception('Background task %s gagal', getattr(func, '__name__', func))
+    finally:
+        # Koneksi DB milik thread ini, jangan biarkan menggantung
+        connections.close_all()
+
+
+def run_in_background(func, *args, **kwargs):
+    """
+    Jadwalkan `func(*args, **kwargs)` setelah transaksi saat ini commit.
+
+    Dengan settings.BACKGROUND_TASKS_SYNC = True task dijalankan langsung
+    di thread pemanggil (berguna untuk development/test).
+    """
+    def submit():
+        if getattr(settings, 'BACKGROUND_TASKS_SYNC', False):
+            func(*args, **kwargs)
+        else:
+            _get_executor().submit(_run, func, args, kwargs)
+
+    transaction.on_commit(submit)
@@ -1,16 +1,74 @@
 from django.contrib import admin
 from .models import Cart, CartItem
+from .store import get_cart_store
 
 class CartItemInline(admin.TabularInline):
     model = CartItem
     extra = 0
     readonly_fields = ('total_price',)
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_totals()
+
 @admin.register(Cart)
 class CartAdmin(admin.ModelAdmin):
     list_display = ('user', 'total_items', 'subtotal', 'created_at')
+    list_select_related = ('user',)
     inlines = [CartItemInline]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_totals()
+
+    def total_items(self, obj):
+        return obj.item_total
+    total_items.short_description = 'Total items'
+    total_items.admin_order_field = 'item_total'
+
+    def subtotal(self, obj):
+        return obj.subtotal_amount
+    subtotal.short_description = 'Subtotal'
+    subtotal.admin_order_field = 'subtotal_amount'
+
+    def get_object(self, request, object_id, from_field=None):
+        obj = super().get_object(request, object_id, from_field)
+        if obj is not None:
+            # Tampilkan isi terbaru: tulis dulu perubahan yang masih di cache
+            get_cart_store().flush(obj.user_id)
+        return obj
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        get_cart_store().discard(form.instance.user_id)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        get_cart_store().discard(obj.user_id)
+
+    def delete_queryset(self, request, queryset):
+        user_ids = list(queryset.values_list('user_id', flat=True))
+        super().delete_queryset(request, queryset)
+        for user_id in user_ids:
+            get_cart_store().discard(user_id)
+
 @admin.register(CartItem)
 class CartItemAdmin(admin.ModelAdmin):
-    list_display = ('cart', 'product', 'quantity', 'total_price')
\ No newline at end of file
+    list_display = ('cart', 'product', 'quantity', 'total_price')
+
+    def get_queryset(self, request):
+        # with_totals() sudah memakai select_related, jadi list_select_related
+        # tidak dipakai ChangeList; tambahkan relasi untuk __str__ di sini
+        return super().get_queryset(request).with_totals().select_related('cart__user')
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        get_cart_store().discard(obj.cart.user_id)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        get_cart_store().discard(obj.cart.user_id)
+
+    def delete_queryset(self, request, queryset):
+        user_ids = list(queryset.values_list('cart__user_id', flat=True).distinct())
+        super().delete_queryset(request, queryset)
+        for user_id in user_ids:
+            get_cart_store().discard(user_id)
\ No newline at end of file
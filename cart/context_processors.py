@@ -1,17 +1,20 @@
-from .models import Cart
+from django.utils.functional import SimpleLazyObject
+
+from .guest import guest_store
+from .store import get_cart_store
 
 def cart_count(request):
     """
     Context processor untuk menampilkan jumlah item di cart
     di navbar (semua halaman)
+
+    Lazy: counter baru dibaca (satu cache get) jika template memakai
+    {{ cart_count }}, halaman tanpa badge tidak membayar apa pun.
     """
-    count = 0
-    
-    if request.user.is_authenticated:
-        try:
-            cart = Cart.objects.get(user=request.user)
-            count = cart.total_items
-        except Cart.DoesNotExist:
-            count = 0
+    if not request.user.is_authenticated:
+        # Tamu: dihitung dari cookie, tanpa query
+        guest = getattr(request, 'guest_cart', None)
+        return {'cart_count': guest_store.count_items(guest) if guest else 0}
     
-    return {'cart_count': count}
\ No newline at end of file
+    user = request.user
+    return {'cart_count': SimpleLazyObject(lambda: get_cart_store().count_items(user))}
\ No newline at end of file
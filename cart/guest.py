@@ -0,0 +1,212 @@
+"""
+Keranjang tamu (visitor yang belum login).
+
+Isi keranjang disimpan di cookie bertanda tangan, bukan di tabel
+Cart/CartItem, sehingga visitor anonim tidak membuat baris apa pun di
+database. Format cookie dibuat sekecil mungkin:
+
+    signing.dumps([[product_id, quantity, harga], [product_id, quantity, harga, notes], ...],
+                  compress=True)
+
+Urutan list = urutan item ditambahkan. Cookie ditandatangani dengan
+SECRET_KEY (isi tidak bisa diubah client) dan dibatasi jumlah item serta
+ukurannya agar tetap di bawah batas 4KB browser.
+
+Saat visitor login, GuestCartMiddleware menggabungkan isi cookie ke
+keranjang user dengan satu apply_batch (bulk write), lalu menghapus
+cookie.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.core import signing
+
+from products.models import Product
+
+from .store import (
+    CartOperationError, _product_prices, apply_operations, build_contents,
+    get_cart_store, summarize_lines,
+)
+
+COOKIE_NAME = 'guest_cart'
+COOKIE_SALT = 'cart.guest'
+COOKIE_MAX_AGE = 60 * 60 * 24 * 30
+MAX_ITEMS = 50
+MAX_NOTES_LENGTH = 200
+# Batas browser ~4096 byte untuk nama + nilai + atribut cookie
+MAX_COOKIE_BYTES = 3800
+
+
+class GuestCart:
+    """Isi keranjang tamu: lines dengan format yang sama seperti CacheCartStore"""
+
+    def __init__(self, lines=None):
+        self.lines = lines or {}
+        self.modified = False
+
+    def __bool__(self):
+        return bool(self.lines)
+
+    @classmethod
+    def from_request(cls, request):
+        value = request.COOKIES.get(COOKIE_NAME)
+        if not value:
+            return cls()
+        try:
+            cart = cls(decode(value))
+        except (signing.BadSignature, TypeError, ValueError, ArithmeticError):
+            # Cookie rusak/kedaluwarsa: buang saja
+            cart = cls()
+            cart.modified = True
+        return cart
+
+    def encode(self):
+        return encode(self.lines)
+
+    def apply(self, operations, prices, skip_missing=False):
+        """
+        Terapkan operasi (format parse_operations) lalu cek batas cookie.
+
+        Jika batas terlampaui tidak ada yang berubah.
+        """
+        lines = {product_id: dict(line) for product_id, line in self.lines.items()}
+        apply_operations(lines, operations, prices, skip_missing)
+        for line in lines.values():
+            line['notes'] = line['notes'][:MAX_NOTES_LENGTH]
+        if len(lines) > MAX_ITEMS:
+            raise CartOperationError(
+                f'Keranjang tamu maksimal {MAX_ITEMS} produk. Silakan login untuk menambah lagi.'
+            )
+        if len(encode(lines)) > MAX_COOKIE_BYTES:
+            raise CartOperationError('Keranjang tamu sudah penuh. Silakan login untuk menambah lagi.')
+        self.lines = lines
+        self.modified = True
+
+    def clear(self):
+        if self.lines:
+            self.lines = {}
+            self.modified = True
+
+    def save(self, response):
+        """Tulis/hapus cookie jika isi keranjang berubah selama request"""
+        if not self.modified:
+            return
+        if not self.lines:
+            response.delete_cookie(COOKIE_NAME, samesite='Lax')
+            return
+        response.set_cookie(
+            COOKIE_NAME,
+            self.encode(),
+            max_age=COOKIE_MAX_AGE,
+            httponly=True,
+            samesite='Lax',
+            secure=settings.SESSION_COOKIE_SECURE,
+        )
+
+
+def encode(lines):
+    rows = []
+    for product_id, line in sorted(lines.items(), key=lambda pair: pair[1]['added_at']):
+        price = line['price_per_portion']
+        row = [product_id, line['quantity'], int(price) if price == int(price) else str(price)]
+        if line['notes']:
+            row.append(line['notes'])
+        rows.append(row)
+    return signing.dumps(rows, salt=COOKIE_SALT, compress=True)
+
+
+def decode(value):
+    rows = signing.loads(value, salt=COOKIE_SALT, max_age=COOKIE_MAX_AGE)
+    lines = {}
+    # added_at = posisi di list: cukup untuk urutan tampilan
+    for position, row in enumerate(rows[:MAX_ITEMS]):
+        product_id, quantity, price = row[:3]
+        lines[int(product_id)] = {
+            'quantity': int(quantity),
+            'price_per_portion': Decimal(str(price)),
+            'notes': str(row[3])[:MAX_NOTES_LENGTH] if len(row) > 3 else '',
+            'added_at': position,
+        }
+    return lines
+
+
+class GuestCartStore:
+    """
+    API yang sama dengan store lain, tetapi `owner` adalah GuestCart
+    (request.guest_cart), bukan user. Tidak ada tulisan ke database.
+    """
+
+    def get_cart(self, guest):
+        return build_contents(guest.lines)
+
+    def count_items(self, guest):
+        return sum(line['quantity'] for line in guest.lines.values())
+
+    def add_item(self, guest, product, quantity, price_per_portion, notes=''):
+        created = product.pk not in guest.lines
+        guest.apply(
+            [('add', product.pk, {
+                'quantity': quantity,
+                'price_per_portion': Decimal(price_per_portion),
+                'notes': notes,
+            })],
+            {product.pk: product.price},
+        )
+        return created
+
+    def change_quantity(self, guest, product_id, delta):
+        line = guest.lines.get(product_id)
+        if line is None:
+            return None
+        quantity = max(line['quantity'] + delta, 0)
+        guest.apply([('update', product_id, {'quantity': quantity})], {})
+        return quantity
+
+    def remove_item(self, guest, product_id):
+        if product_id not in guest.lines:
+            return None
+        guest.apply([('remove', product_id, {})], {})
+        return Product.objects.filter(pk=product_id).values_list('name', flat=True).first() or ''
+
+    def clear(self, guest):
+        guest.clear()
+
+    def apply_batch(self, guest, operations):
+        guest.apply(operations, _product_prices(operations))
+        return summarize_lines(guest.lines)
+
+
+guest_store = GuestCartStore()
+
+
+def get_store_for(request):
+    """
+    (store, owner) untuk request ini: store biasa + user jika login,
+    keranjang cookie jika tamu.
+    """
+    if request.user.is_authenticated:
+        return get_cart_store(), request.user
+    guest = getattr(request, 'guest_cart', None)
+    if guest is None:
+        guest = request.guest_cart = GuestCart.from_request(request)
+    return guest_store, guest
+
+
+def merge_guest_cart(user, guest):
+    """
+    Gabungkan keranjang tamu ke keranjang user dalam satu apply_batch.
+
+    Quantity dijumlahkan seperti add_to_cart; produk yang sudah dihapus
+    dilewati. Returns: jumlah produk yang digabung.
+    """
+    operations = [
+        ('add', product_id, {
+            'quantity': line['quantity'],
+            'price_per_portion': line['price_per_portion'],
+            'notes': line['notes'],
+        })
+        for product_id, line in sorted(guest.lines.items(), key=lambda pair: pair[1]['added_at'])
+    ]
+    if operations:
+        get_cart_store().apply_batch(user, operations, skip_missing=True)
+    return len(operations)
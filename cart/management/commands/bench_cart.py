@@ -0,0 +1,113 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from backend.benchmark import Timer, scratch_database
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test add-to-cart lewat view: CART_STORE database vs cache (write-behind). '
+        'Database benchmark SQLite in-memory, jadi biaya write di server sungguhan lebih besar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--products', type=int, default=200)
+        parser.add_argument('--requests', type=int, default=3000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        try:
+            with scratch_database():
+                clients, product_ids = self.populate(options['users'], options['products'])
+                for store in ('database', 'cache'):
+                    random.seed(options['seed'])
+                    self.run(store, clients, product_ids, options['requests'])
+        finally:
+            teardown_test_environment()
+
+    def populate(self, user_total, product_total):
+        from django.contrib.auth import get_user_model
+
+        from products.models import Category, Product
+
+        category = Category.objects.create(name='Bench', slug='bench')
+        Product.objects.bulk_create([
+            Product(
+                category=category, name=f'Menu {index}', slug=f'menu-{index}',
+                description='-', price=random.randint(10, 100) * 1000, stock=100,
+            )
+            for index in range(product_total)
+        ])
+        product_ids = list(Product.objects.values_list('pk', flat=True))
+
+        clients = []
+        User = get_user_model()
+        for index in range(user_total):
+            user = User.objects.create_user(f'bench{index}', f'bench{index}@example.com', 'x')
+            client = Client()
+            client.force_login(user)
+            clients.append(client)
+        return clients, product_ids
+
+    def count_queries(self):
+        """Execute wrapper yang hanya menghitung query (tanpa batas log)"""
+        counter = {'queries': 0, 'writes': 0}
+
+        def wrapper(execute, sql, params, many, context):
+            counter['queries'] += 1
+            if sql.lstrip().upper().startswith(('INSERT', 'UPDATE', 'DELETE')):
+                counter['writes'] += 1
+            return execute(sql, params, many, context)
+
+        return counter, connection.execute_wrapper(wrapper)
+
+    def run(self, store, clients, product_ids, total):
+        from cart.models import CartItem
+        from cart.store import get_cart_store
+
+        CartItem.objects.all().delete()
+        timer = Timer()
+        with override_settings(CART_STORE=store):
+            counter, wrapper = self.count_queries()
+            with wrapper:
+                started = time.perf_counter()
+                for _ in range(total):
+                    client = random.choice(clients)
+                    url = reverse('add_to_cart', args=[random.choice(product_ids)])
+                    with timer:
+                        response = client.post(
+                            url, {'quantity': 10}, HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+                        )
+                    assert response.status_code == 200, response.status_code
+                elapsed = time.perf_counter() - started
+            request_counter = counter
+
+            counter, wrapper = self.count_queries()
+            with wrapper:
+                flush_started = time.perf_counter()
+                flushed = get_cart_store().flush_pending()
+                flush_ms = (time.perf_counter() - flush_started) * 1000
+
+        self.stdout.write(f'[{store}] {timer.format()}')
+        self.stdout.write(
+            f'[{store}] {total / elapsed:.0f} req/s, '
+            f"{request_counter['queries'] / total:.1f} query/request "
+            f"({request_counter['writes'] / total:.1f} write)"
+        )
+        if store == 'cache':
+            self.stdout.write(
+                f'[{store}] flush {flushed} keranjang: {flush_ms:.1f}ms, {counter["queries"]} query '
+                f'({counter["writes"]} write)'
+            )
+        quantity = sum(CartItem.objects.values_list('quantity', flat=True))
+        self.stdout.write(self.style.SUCCESS(
+            f'[{store}] {CartItem.objects.count()} item di DB, total quantity {quantity}'
+        ))
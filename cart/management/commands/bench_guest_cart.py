@@ -0,0 +1,125 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+
+from backend.benchmark import Timer, scratch_database
+
+
+class Command(BaseCommand):
+    help = (
+        'Ukuran/encode cookie keranjang tamu dan benchmark merge saat login: '
+        'satu apply_batch vs add_item per produk.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--items', type=int, default=15, help='Produk per keranjang tamu')
+        parser.add_argument('--products', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.encoding(options['seed'])
+        with scratch_database(), override_settings(CART_STORE='database'):
+            users, product_ids = self.populate(options['users'], options['products'])
+            for mode in ('per-item', 'bulk'):
+                random.seed(options['seed'])
+                self.merge(mode, users, product_ids, options['items'])
+
+    def guest_cart(self, product_ids, total):
+        from cart.guest import GuestCart
+
+        lines = {}
+        for position, product_id in enumerate(random.sample(product_ids, total)):
+            lines[product_id] = {
+                'quantity': random.randint(10, 60),
+                'price_per_portion': Decimal(random.randint(10, 100) * 1000),
+                'notes': random.choice(['', '', 'Tanpa sambal', 'Antar jam 11 siang']),
+                'added_at': position,
+            }
+        return GuestCart(lines)
+
+    def encoding(self, seed):
+        from cart.guest import MAX_COOKIE_BYTES, MAX_ITEMS, decode
+
+        random.seed(seed)
+        product_ids = list(range(1, 1000))
+        for total in (1, 10, 25, MAX_ITEMS):
+            guest = self.guest_cart(product_ids, total)
+            encode_timer, decode_timer = Timer(), Timer()
+            for _ in range(200):
+                with encode_timer:
+                    value = guest.encode()
+                with decode_timer:
+                    decode(value)
+            self.stdout.write(
+                f'[cookie] {total} item: {len(value)} byte (batas {MAX_COOKIE_BYTES}), '
+                f"encode p50={encode_timer.summary()['p50']:.3f}ms "
+                f"decode p50={decode_timer.summary()['p50']:.3f}ms"
+            )
+
+    def populate(self, user_total, product_total):
+        from django.contrib.auth import get_user_model
+
+        from products.models import Category, Product
+
+        category = Category.objects.create(name='Bench', slug='bench')
+        Product.objects.bulk_create([
+            Product(
+                category=category, name=f'Menu {index}', slug=f'menu-{index}',
+                description='-', price=random.randint(10, 100) * 1000, stock=100,
+            )
+            for index in range(product_total)
+        ])
+        User = get_user_model()
+        users = [
+            User.objects.create_user(f'bench{index}', f'bench{index}@example.com', 'x')
+            for index in range(user_total)
+        ]
+        return users, list(Product.objects.values_list('pk', flat=True))
+
+    def merge(self, mode, users, product_ids, item_total):
+        from cart.guest import merge_guest_cart
+        from cart.models import Cart, CartItem
+        from cart.store import get_cart_store
+        from products.models import Product
+
+        CartItem.objects.all().delete()
+        Cart.objects.all().delete()
+        # Separuh user sudah punya keranjang di DB (sebagian produk tumpang tindih)
+        for user in users[::2]:
+            get_cart_store().apply_batch(user, [
+                ('add', product_id, {'quantity': 10})
+                for product_id in random.sample(product_ids, 5)
+            ])
+
+        queries = [0]
+
+        def wrapper(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        store = get_cart_store()
+        timer = Timer()
+        with connection.execute_wrapper(wrapper):
+            for user in users:
+                guest = self.guest_cart(product_ids, item_total)
+                with timer:
+                    if mode == 'bulk':
+                        merge_guest_cart(user, guest)
+                    else:
+                        products = Product.objects.in_bulk(list(guest.lines))
+                        for product_id, line in guest.lines.items():
+                            store.add_item(
+                                user, products[product_id], line['quantity'],
+                                line['price_per_portion'], line['notes'],
+                            )
+
+        self.stdout.write(f'[merge {mode}] {timer.format()}')
+        self.stdout.write(self.style.SUCCESS(
+            f'[merge {mode}] {queries[0] / len(users):.1f} query/login, '
+            f'{CartItem.objects.count()} item di DB'
+        ))
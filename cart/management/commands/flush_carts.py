@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from cart.store import CacheCartStore, get_cart_store
+
+
+class Command(BaseCommand):
+    help = 'Simpan keranjang yang masih di cache (CART_STORE=cache) ke database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Ulangi setiap N detik (0 = jalan sekali)',
+        )
+
+    def handle(self, *args, **options):
+        store = get_cart_store()
+        if not isinstance(store, CacheCartStore):
+            self.stdout.write('CART_STORE bukan "cache", tidak ada yang perlu di-flush.')
+            return
+
+        while True:
+            started = time.perf_counter()
+            flushed = store.flush_pending()
+            elapsed = (time.perf_counter() - started) * 1000
+            if flushed or not options['interval']:
+                self.stdout.write(f'{flushed} keranjang disimpan ({elapsed:.1f}ms)')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,127 @@
+import json
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from cart.models import Cart, CartItem
+from cart.store import get_cart_store
+
+
+class Command(BaseCommand):
+    help = (
+        'Hapus keranjang terbengkalai (tidak diubah selama --days hari) per batch kecil, '
+        'masing-masing dalam transaksi sendiri agar lock tabel tetap singkat.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Umur minimal keranjang (hari)')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--sleep', type=float, default=0.05,
+            help='Jeda antar batch (detik) agar request lain kebagian lock',
+        )
+        parser.add_argument(
+            '--snapshot', metavar='FILE',
+            help='Tambahkan isi keranjang yang dihapus ke FILE (JSON lines) untuk analitik',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Hanya hitung, tidak menghapus')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        store = get_cart_store()
+
+        stale = Cart.objects.stale(cutoff)
+        if options['dry_run']:
+            # Tanpa flush: dry run tidak boleh menulis apa pun
+            carts = stale.count()
+            items = CartItem.objects.filter(cart__in=stale).count()
+            self.stdout.write(
+                f'{carts} keranjang ({items} item) lebih lama dari {options["days"]} hari (dry run)'
+            )
+            return
+
+        # Keranjang di cache (write-behind) disimpan dulu agar updated_at di DB akurat
+        store.flush_pending()
+
+        snapshot = open(options['snapshot'], 'a', encoding='utf-8') if options['snapshot'] else None
+        totals = {'carts': 0, 'items': 0, 'batches': 0}
+        last_pk = 0
+        try:
+            while True:
+                # Ambil kandidat di luar transaksi; lock hanya selama DELETE satu batch
+                batch = list(
+                    stale.filter(pk__gt=last_pk).order_by('pk')
+                    .values_list('pk', flat=True)[:options['batch_size']]
+                )
+                if not batch:
+                    break
+                last_pk = batch[-1]
+                # Keranjang yang diubah setelah flush_pending: simpan (updated_at
+                # jadi baru) dan jangan dihapus
+                busy_users = store.unflushed(
+                    Cart.objects.filter(pk__in=batch).values_list('user_id', flat=True)
+                )
+                for user_id in busy_users:
+                    store.flush(user_id)
+                with transaction.atomic():
+                    # Cek ulang: user bisa saja mengubah keranjang setelah SELECT di atas
+                    carts = list(
+                        Cart.objects.stale(cutoff).filter(pk__in=batch)
+                        .exclude(user_id__in=busy_users)
+                        .select_for_update()
+                        .values_list('pk', 'user_id', 'created_at', 'updated_at')
+                    )
+                    cart_ids = [cart[0] for cart in carts]
+                    if snapshot is not None:
+                        self.write_snapshot(snapshot, carts)
+                    items, _ = CartItem.objects.filter(cart_id__in=cart_ids).delete()
+                    deleted, _ = Cart.objects.filter(pk__in=cart_ids).delete()
+                # Counter badge / state cache user tersebut ikut dibuang, kecuali
+                # state yang berubah sejak pengecekan di atas: flush berikutnya
+                # membuat ulang keranjangnya
+                for _, user_id, _, _ in carts:
+                    store.discard_if_flushed(user_id)
+                totals['carts'] += deleted
+                totals['items'] += items
+                totals['batches'] += 1
+                if options['sleep']:
+                    time.sleep(options['sleep'])
+        finally:
+            if snapshot is not None:
+                snapshot.close()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{totals['carts']} keranjang dan {totals['items']} item dihapus "
+            f"dalam {totals['batches']} batch ({elapsed:.2f}s)"
+        ))
+
+    def write_snapshot(self, snapshot, carts):
+        """Satu baris JSON per keranjang: user, waktu, item dan subtotal"""
+        lines = {cart[0]: [] for cart in carts}
+        items = (
+            CartItem.objects.filter(cart_id__in=lines)
+            .with_totals()
+            .values_list('cart_id', 'product_id', 'product__name', 'quantity', 'unit_price', 'notes')
+        )
+        for cart_id, product_id, name, quantity, unit_price, notes in items:
+            lines[cart_id].append({
+                'product_id': product_id,
+                'product': name,
+                'quantity': quantity,
+                'price_per_portion': int(unit_price or 0),
+                'notes': notes,
+            })
+        for cart_id, user_id, created_at, updated_at in carts:
+            snapshot.write(json.dumps({
+                'cart_id': cart_id,
+                'user_id': user_id,
+                'created_at': created_at.isoformat(),
+                'updated_at': updated_at.isoformat(),
+                'items': lines[cart_id],
+                'subtotal': sum(line['quantity'] * line['price_per_portion'] for line in lines[cart_id]),
+            }) + '\n')
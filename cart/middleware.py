@@ -0,0 +1,32 @@
+from .guest import COOKIE_NAME, GuestCart, merge_guest_cart
+from .store import CartBusy
+
+
+class GuestCartMiddleware:
+    """
+    Pasang request.guest_cart (keranjang cookie) dan tulis ulang cookie
+    jika isinya berubah. Request pertama setelah login menggabungkan
+    keranjang tamu ke keranjang user lalu menghapus cookie.
+
+    Harus setelah AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.guest_cart = GuestCart.from_request(request)
+        # request.user baru disentuh jika cookie ada: request lain tidak membaca session
+        if COOKIE_NAME in request.COOKIES and request.user.is_authenticated:
+            try:
+                merge_guest_cart(request.user, request.guest_cart)
+            except CartBusy:
+                # Cookie dibiarkan: digabung pada request berikutnya
+                pass
+            else:
+                request.guest_cart.clear()
+                request.guest_cart.modified = True
+
+        response = self.get_response(request)
+        request.guest_cart.save(response)
+        return response
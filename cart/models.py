@@ -1,8 +1,55 @@
 #cart/models.py
 from django.db import models
+from django.db.models import Exists, F, OuterRef, Sum, Value
+from django.db.models.functions import Coalesce
 from django.conf import settings
 from products.models import Product
 
+
+def _unit_price(prefix=''):
+    """Harga per porsi, fallback ke harga produk jika kosong"""
+    return Coalesce(
+        f'{prefix}price_per_portion', f'{prefix}product__price',
+        output_field=models.DecimalField(max_digits=12, decimal_places=0),
+    )
+
+
+def _line_total(prefix=''):
+    """quantity * harga per porsi, dihitung di SQL"""
+    return F(f'{prefix}quantity') * _unit_price(prefix)
+
+
+class CartQuerySet(models.QuerySet):
+    def with_totals(self):
+        """Anotasi item_total dan subtotal_amount (satu query, tanpa loop Python)"""
+        return self.annotate(
+            item_total=Coalesce(Sum('items__quantity'), Value(0)),
+            subtotal_amount=Coalesce(
+                Sum(_line_total('items__')), Value(0),
+                output_field=models.DecimalField(max_digits=14, decimal_places=0),
+            ),
+        )
+
+
+    def stale(self, cutoff):
+        """
+        Keranjang yang tidak disentuh sejak `cutoff`.
+
+        DatabaseCartStore.add_item hanya menyentuh CartItem, jadi item yang
+        baru diubah juga membuat keranjang dianggap aktif.
+        """
+        recent_items = CartItem.objects.filter(cart=OuterRef('pk'), updated_at__gte=cutoff)
+        return self.filter(updated_at__lt=cutoff).filter(~Exists(recent_items))
+
+
+class CartItemQuerySet(models.QuerySet):
+    def with_totals(self):
+        """select_related product + anotasi unit_price dan line_total per item"""
+        return self.select_related('product').annotate(
+            unit_price=_unit_price(), line_total=_line_total()
+        )
+
+
 class Cart(models.Model):
     """Keranjang belanja per user"""
     user = models.OneToOneField(
@@ -13,10 +60,16 @@ class Cart(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CartQuerySet.as_manager()
+
     class Meta:
         db_table = 'carts'
         verbose_name = 'Cart'
         verbose_name_plural = 'Carts'
+        indexes = [
+            # sweep_carts mencari keranjang terbengkalai berdasarkan updated_at
+            models.Index(fields=['updated_at'], name='cart_updated_idx'),
+        ]
 
     def __str__(self):
         return f"Cart - {self.user.username}"
@@ -24,12 +77,24 @@ class Cart(models.Model):
     @property
     def total_items(self):
         """Total jumlah item di cart"""
-        return sum(item.quantity for item in self.items.all())
+        if not hasattr(self, 'item_total'):
+            self._load_totals()
+        return self.item_total
 
     @property
     def subtotal(self):
         """Total harga sebelum ongkir"""
-        return sum(item.total_price for item in self.items.all())
+        if not hasattr(self, 'subtotal_amount'):
+            self._load_totals()
+        return self.subtotal_amount
+
+    def _load_totals(self):
+        """Untuk instance tanpa with_totals(): satu query agregat"""
+        totals = Cart.objects.filter(pk=self.pk).with_totals().values(
+            'item_total', 'subtotal_amount'
+        ).first() or {'item_total': 0, 'subtotal_amount': 0}
+        self.item_total = totals['item_total']
+        self.subtotal_amount = totals['subtotal_amount']
 
     def clear(self):
         """Kosongkan cart"""
@@ -59,6 +124,8 @@ class CartItem(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CartItemQuerySet.as_manager()
+
     class Meta:
         db_table = 'cart_items'
         verbose_name = 'Cart Item'
@@ -71,6 +138,8 @@ class CartItem(models.Model):
     @property
     def total_price(self):
         """Total harga item ini"""
+        if hasattr(self, 'line_total'):
+            return self.line_total or 0
         # ✅ FIX: Handle None value
         if self.price_per_portion:
             return self.price_per_portion * self.quantity
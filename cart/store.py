@@ -0,0 +1,710 @@
+"""
+Penyimpanan keranjang aktif.
+
+Dua backend dengan API yang sama (dipilih lewat settings.CART_STORE):
+
+- 'database': setiap aksi langsung ditulis ke tabel Cart/CartItem.
+- 'cache': keranjang aktif disimpan di cache (write-behind). Klik
+  "tambah ke keranjang" hanya menulis satu key cache; perubahan disimpan
+  ke Cart/CartItem secara batch (bulk_create/bulk_update/delete) oleh
+  `flush()` sebelum checkout dan oleh `manage.py flush_carts` (timer).
+
+State cache per user (key `cart:state:<user_id>`):
+
+    {
+        'version': 7,   # naik setiap mutasi
+        'flushed': 5,   # versi terakhir yang sudah tersimpan di DB
+        'items': {product_id: {'quantity', 'price_per_portion', 'notes', 'added_at'}},
+    }
+
+User yang keranjangnya berubah dicatat di dirty log (nomor urut dari
+cache.incr), sehingga flush_carts hanya menulis keranjang yang berubah.
+Backend 'cache' butuh cache bersama (REDIS_URL) jika aplikasi berjalan
+di lebih dari satu proses.
+"""
+import copy
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from products.models import Product
+from products.pricing import is_portion_price
+
+from .models import Cart, CartItem
+
+logger = logging.getLogger(__name__)
+
+STATE_TIMEOUT = 60 * 60 * 24 * 7
+COUNT_TIMEOUT = 60 * 60
+LOCK_TIMEOUT = 5
+DIRTY_SEQ_KEY = 'cart:dirty:seq'
+DIRTY_CURSOR_KEY = 'cart:dirty:cursor'
+DIRTY_GAP_KEY = 'cart:dirty:gap'
+# _mark_dirty menulis key segera setelah incr; nomor urut yang key-nya
+# belum ada selama ini berarti penulisnya gagal di antara keduanya
+DIRTY_GAP_TIMEOUT = 60
+DIRTY_BATCH_SIZE = 500
+MAX_BATCH_OPERATIONS = 100
+MAX_NOTES_LENGTH = 1000
+
+
+class CartContents:
+    """Isi keranjang untuk template: item + total, tanpa query tambahan"""
+
+    def __init__(self, items):
+        self.items = items
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def total_items(self):
+        return sum(item.quantity for item in self.items)
+
+    @property
+    def subtotal(self):
+        return sum(item.total_price for item in self.items)
+
+
+class CartOperationError(ValueError):
+    """Operasi batch tidak valid; tidak ada perubahan yang disimpan"""
+
+
+class CartBusy(Exception):
+    """Keranjang sedang diubah request lain terlalu lama; tidak ada perubahan yang disimpan"""
+
+
+def parse_operations(operations):
+    """
+    Validasi payload batch dari cart_batch.
+
+    Format tiap operasi:
+        {"op": "add", "product_id": 1, "quantity": 10, "price_per_portion": 25000, "notes": ""}
+        {"op": "update", "product_id": 1, "quantity": 12, "notes": "..."}   # quantity 0 = hapus
+        {"op": "remove", "product_id": 1}
+
+    Returns:
+        list of (op, product_id, data)
+    """
+    if not isinstance(operations, list) or not operations:
+        raise CartOperationError('operations harus berupa list yang tidak kosong')
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        raise CartOperationError(f'Maksimal {MAX_BATCH_OPERATIONS} operasi per batch')
+
+    parsed = []
+    for number, operation in enumerate(operations, start=1):
+        if not isinstance(operation, dict) or operation.get('op') not in ('add', 'update', 'remove'):
+            raise CartOperationError(f'Operasi #{number}: op harus add, update atau remove')
+        op = operation['op']
+        try:
+            product_id = int(operation['product_id'])
+        except (KeyError, TypeError, ValueError):
+            raise CartOperationError(f'Operasi #{number}: product_id tidak valid')
+
+        data = {}
+        if op != 'remove':
+            try:
+                quantity = int(operation['quantity'] if op == 'update' else operation.get('quantity', 10))
+            except (KeyError, TypeError, ValueError):
+                raise CartOperationError(f'Operasi #{number}: quantity tidak valid')
+            if quantity < (1 if op == 'add' else 0):
+                raise CartOperationError(f'Operasi #{number}: quantity tidak valid')
+            data['quantity'] = quantity
+            if operation.get('notes') is not None:
+                data['notes'] = str(operation['notes'])[:MAX_NOTES_LENGTH]
+        if op == 'add' and operation.get('price_per_portion') is not None:
+            try:
+                price = Decimal(str(operation['price_per_portion']))
+            except ArithmeticError:
+                raise CartOperationError(f'Operasi #{number}: price_per_portion tidak valid')
+            if not price.is_finite() or price < 0:
+                raise CartOperationError(f'Operasi #{number}: price_per_portion tidak valid')
+            data['price_per_portion'] = price
+        parsed.append((op, product_id, data))
+    return parsed
+
+
+def parse_order_input(data, product):
+    """
+    quantity dan price_per_portion dari form checkout.
+
+    Harga hanya diterima jika salah satu tingkat harga produk
+    (products.pricing); selain itu CartOperationError.
+    """
+    try:
+        quantity = int(data.get('quantity', 10))
+        price_per_portion = Decimal(data.get('price_per_portion', product.price))
+    except (TypeError, ValueError, ArithmeticError):
+        raise CartOperationError('Jumlah atau harga pesanan tidak valid.')
+    if quantity < 1 or not price_per_portion.is_finite():
+        raise CartOperationError('Jumlah atau harga pesanan tidak valid.')
+    if not is_portion_price(product.price, price_per_portion):
+        raise CartOperationError('Harga per porsi tidak sesuai dengan harga produk.')
+    return quantity, price_per_portion
+
+
+def apply_operations(lines, operations, prices, skip_missing=False):
+    """
+    Terapkan operasi hasil parse_operations ke `lines` (in place).
+
+    Args:
+        lines: {product_id: {'quantity', 'price_per_portion', 'notes', 'added_at'}}
+        prices: {product_id: harga produk} untuk produk yang ada di DB
+        skip_missing: lewati 'add' untuk produk yang sudah dihapus (merge
+            keranjang tamu) alih-alih membatalkan seluruh batch
+
+    price_per_portion 'add' harus salah satu tingkat harga produk
+    (products.pricing). Saat merge keranjang tamu, harga lama yang tidak
+    lagi cocok (harga produk berubah) diganti harga normal.
+    """
+    for op, product_id, data in operations:
+        line = lines.get(product_id)
+        if op == 'add':
+            if product_id not in prices:
+                if skip_missing:
+                    continue
+                raise CartOperationError(f'Produk {product_id} tidak ditemukan')
+            if line is None:
+                line = lines[product_id] = {'quantity': 0, 'added_at': time.time()}
+            # Sama dengan add_to_cart: quantity ditambah, harga & catatan diganti
+            price = data.get('price_per_portion', prices[product_id])
+            if not is_portion_price(prices[product_id], price):
+                if not skip_missing:
+                    raise CartOperationError(f'Harga per porsi produk {product_id} tidak valid')
+                price = prices[product_id]
+            line['quantity'] += data['quantity']
+            line['price_per_portion'] = price
+            line['notes'] = data.get('notes', '')
+        elif op == 'update':
+            if line is None:
+                raise CartOperationError(f'Produk {product_id} tidak ada di keranjang')
+            if data['quantity'] == 0:
+                del lines[product_id]
+                continue
+            line['quantity'] = data['quantity']
+            if 'notes' in data:
+                line['notes'] = data['notes']
+        else:
+            lines.pop(product_id, None)
+    return lines
+
+
+def summarize_lines(lines):
+    """Total untuk response batch (halaman cart di-update tanpa reload)"""
+    items = [
+        {
+            'product_id': product_id,
+            'quantity': line['quantity'],
+            'line_total': int(line['quantity'] * line['price_per_portion']),
+        }
+        for product_id, line in lines.items()
+    ]
+    return {
+        'count': sum(item['quantity'] for item in items),
+        'subtotal': sum(item['line_total'] for item in items),
+        'items': items,
+    }
+
+
+def build_contents(lines):
+    """CartContents dari `lines` (terbaru dulu) dengan satu query produk"""
+    ordered = sorted(lines.items(), key=lambda pair: pair[1]['added_at'], reverse=True)
+    products = Product.objects.in_bulk([product_id for product_id, _ in ordered])
+    items = []
+    for product_id, line in ordered:
+        product = products.get(product_id)
+        if product is None:
+            continue
+        items.append(CartItem(
+            product=product,
+            quantity=line['quantity'],
+            price_per_portion=line['price_per_portion'],
+            notes=line['notes'],
+        ))
+    return CartContents(items)
+
+
+def _product_prices(operations):
+    product_ids = {product_id for op, product_id, _ in operations if op == 'add'}
+    if not product_ids:
+        return {}
+    return dict(Product.objects.filter(pk__in=product_ids).values_list('pk', 'price'))
+
+
+def write_lines(cart, lines, existing):
+    """
+    Samakan isi CartItem dengan `lines` dalam tiga statement batch.
+
+    Args:
+        existing: {product_id: CartItem} isi keranjang di DB saat ini
+    """
+    existing = dict(existing)
+    now = timezone.now()
+    to_create, to_update = [], []
+    for product_id, line in lines.items():
+        item = existing.pop(product_id, None)
+        if item is None:
+            to_create.append(CartItem(
+                cart=cart,
+                product_id=product_id,
+                quantity=line['quantity'],
+                price_per_portion=line['price_per_portion'],
+                notes=line['notes'],
+            ))
+        elif (item.quantity, item.price_per_portion, item.notes) != (
+            line['quantity'], line['price_per_portion'], line['notes']
+        ):
+            item.quantity = line['quantity']
+            item.price_per_portion = line['price_per_portion']
+            item.notes = line['notes']
+            item.updated_at = now
+            to_update.append(item)
+
+    CartItem.objects.bulk_create(to_create)
+    CartItem.objects.bulk_update(to_update, ['quantity', 'price_per_portion', 'notes', 'updated_at'])
+    if existing:
+        CartItem.objects.filter(pk__in=[item.pk for item in existing.values()]).delete()
+    Cart.objects.filter(pk=cart.pk).update(updated_at=now)
+
+
+class DatabaseCartStore:
+    """
+    Langsung ke tabel Cart/CartItem.
+
+    Mutasi dan pengisian awal counter badge berjalan di dalam lock per user
+    (cache), sehingga counter yang dihitung dari data lama tidak bisa
+    tersimpan setelah mutasi yang bersamaan.
+    """
+
+    @contextmanager
+    def _lock(self, user_id):
+        """Lock per user agar read-modify-write keranjang/counter tidak saling menimpa"""
+        key = f'cart:lock:{user_id}'
+        # Token pemilik: lock yang sudah kedaluwarsa lalu diambil request lain
+        # tidak ikut dilepas oleh pemilik lamanya
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        acquired = cache.add(key, token, LOCK_TIMEOUT)
+        while not acquired and time.monotonic() < deadline:
+            time.sleep(0.005)
+            acquired = cache.add(key, token, LOCK_TIMEOUT)
+        if not acquired:
+            # Tanpa lock dua penulis saling menimpa state: satu perubahan hilang diam-diam
+            raise CartBusy(f'Keranjang user {user_id} sedang diubah, coba lagi')
+        try:
+            yield
+        finally:
+            if cache.get(key) == token:
+                cache.delete(key)
+
+    def get_cart(self, user):
+        items = (
+            CartItem.objects.filter(cart__user=user)
+            .with_totals()
+            .order_by('-created_at', '-id')
+        )
+        return CartContents(list(items))
+
+    def _count_key(self, user_id):
+        return f'cart:count:{user_id}'
+
+    def count_items(self, user):
+        """
+        Total quantity untuk badge navbar: satu cache get.
+
+        Counter dihitung ulang hanya jika belum ada di cache, lalu dijaga
+        dengan incr/decr oleh setiap mutasi.
+        """
+        key = self._count_key(user.pk)
+        count = cache.get(key)
+        if count is None:
+            try:
+                with self._lock(user.pk):
+                    count = cache.get(key)
+                    if count is None:
+                        count = self._compute_count(user.pk)
+                        cache.set(key, count, COUNT_TIMEOUT)
+            except CartBusy:
+                # Keranjang sedang diubah: tampilkan hitungan sekarang tanpa disimpan
+                count = self._compute_count(user.pk)
+        return count
+
+    def _compute_count(self, user_id):
+        return CartItem.objects.filter(cart__user_id=user_id).aggregate(
+            total=Sum('quantity')
+        )['total'] or 0
+
+    def _adjust_count(self, user_id, delta):
+        """Ubah counter (dipanggil di dalam lock); jika belum ada, biarkan dihitung saat dibaca"""
+        if not delta:
+            return
+        try:
+            cache.incr(self._count_key(user_id), delta)
+        except ValueError:
+            pass
+
+    def _reset_count(self, user_id, count=None):
+        if count is None:
+            cache.delete(self._count_key(user_id))
+        else:
+            cache.set(self._count_key(user_id), count, COUNT_TIMEOUT)
+
+    def add_item(self, user, product, quantity, price_per_portion, notes=''):
+        """Tambah produk (atau tambah quantity jika sudah ada). Return True jika item baru"""
+        with self._lock(user.pk):
+            cart, _ = Cart.objects.get_or_create(user=user)
+            cart_item, created = CartItem.objects.get_or_create(
+                cart=cart,
+                product=product,
+                defaults={
+                    'quantity': quantity,
+                    'price_per_portion': price_per_portion,
+                    'notes': notes,
+                }
+            )
+            if not created:
+                cart_item.quantity += quantity
+                cart_item.price_per_portion = price_per_portion
+                cart_item.notes = notes
+                cart_item.save()
+            self._adjust_count(user.pk, quantity)
+        return created
+
+    def change_quantity(self, user, product_id, delta):
+        """
+        Ubah quantity satu item; item dengan quantity < 1 dihapus.
+
+        Returns:
+            quantity baru, 0 jika item dihapus, None jika item tidak ada
+        """
+        with self._lock(user.pk):
+            cart_item = CartItem.objects.filter(cart__user=user, product_id=product_id).first()
+            if cart_item is None:
+                return None
+            if cart_item.quantity + delta < 1:
+                cart_item.delete()
+                self._adjust_count(user.pk, -cart_item.quantity)
+                return 0
+            cart_item.quantity += delta
+            cart_item.save()
+            self._adjust_count(user.pk, delta)
+        return cart_item.quantity
+
+    def remove_item(self, user, product_id):
+        """Return nama produk yang dihapus, atau None jika item tidak ada"""
+        with self._lock(user.pk):
+            cart_item = (
+                CartItem.objects.filter(cart__user=user, product_id=product_id)
+                .select_related('product')
+                .first()
+            )
+            if cart_item is None:
+                return None
+            cart_item.delete()
+            self._adjust_count(user.pk, -cart_item.quantity)
+        return cart_item.product.name
+
+    def clear(self, user):
+        with self._lock(user.pk):
+            CartItem.objects.filter(cart__user=user).delete()
+            self._reset_count(user.pk, 0)
+
+    def apply_batch(self, user, operations, skip_missing=False):
+        """
+        Terapkan banyak operasi sekaligus dalam satu transaksi.
+
+        Returns:
+            dict hasil summarize_lines (count, subtotal, items)
+        """
+        prices = _product_prices(operations)
+        with self._lock(user.pk), transaction.atomic():
+            cart, _ = Cart.objects.get_or_create(user=user)
+            # Kunci baris cart: batch paralel milik user yang sama berjalan berurutan
+            Cart.objects.select_for_update().filter(pk=cart.pk).exists()
+            existing = {item.product_id: item for item in cart.items.with_totals()}
+            lines = {
+                product_id: {
+                    'quantity': item.quantity,
+                    'price_per_portion': item.unit_price,
+                    'notes': item.notes,
+                }
+                for product_id, item in existing.items()
+            }
+            apply_operations(lines, operations, prices, skip_missing)
+            write_lines(cart, lines, existing)
+            result = summarize_lines(lines)
+            self._reset_count(user.pk, result['count'])
+        return result
+
+    def flush(self, user_id):
+        return False
+
+    def flush_pending(self):
+        return 0
+
+    def discard(self, user_id):
+        """Dipanggil setelah keranjang diubah di luar store (admin, checkout)"""
+        try:
+            with self._lock(user_id):
+                self._forget(user_id)
+        except CartBusy:
+            # Tetap dibuang: lebih baik dihitung ulang daripada menampilkan angka lama
+            self._forget(user_id)
+
+    def _forget(self, user_id):
+        self._reset_count(user_id)
+
+    def unflushed(self, user_ids):
+        """User di `user_ids` yang perubahan keranjangnya belum tersimpan ke DB"""
+        return set()
+
+    def discard_if_flushed(self, user_id):
+        """discard() hanya jika tidak ada perubahan yang belum tersimpan. Return True jika dibuang"""
+        self.discard(user_id)
+        return True
+
+
+class CacheCartStore(DatabaseCartStore):
+    """Keranjang aktif di cache, ditulis ke DB secara batch (write-behind)"""
+
+    def _key(self, user_id):
+        return f'cart:state:{user_id}'
+
+    def _load_from_db(self, user_id):
+        items = {}
+        rows = CartItem.objects.filter(cart__user_id=user_id).with_totals().values_list(
+            'product_id', 'quantity', 'unit_price', 'notes', 'created_at'
+        )
+        for product_id, quantity, price, notes, created_at in rows:
+            items[product_id] = {
+                'quantity': quantity,
+                'price_per_portion': price,
+                'notes': notes,
+                'added_at': created_at.timestamp(),
+            }
+        return {'version': 0, 'flushed': 0, 'items': items}
+
+    def _get_state(self, user_id):
+        state = cache.get(self._key(user_id))
+        if state is None:
+            state = self._load_from_db(user_id)
+            if not cache.add(self._key(user_id), state, STATE_TIMEOUT):
+                state = cache.get(self._key(user_id)) or state
+        return state
+
+    def _save_state(self, user_id, state):
+        """Simpan mutasi; catat user di dirty log saat keranjang mulai 'kotor'"""
+        was_clean = state['version'] == state['flushed']
+        state['version'] += 1
+        cache.set(self._key(user_id), state, STATE_TIMEOUT)
+        if was_clean:
+            self._mark_dirty(user_id)
+
+    def _mark_dirty(self, user_id):
+        try:
+            seq = cache.incr(DIRTY_SEQ_KEY)
+        except ValueError:
+            cache.add(DIRTY_SEQ_KEY, 0, None)
+            seq = cache.incr(DIRTY_SEQ_KEY)
+        cache.set(f'cart:dirty:{seq}', user_id, STATE_TIMEOUT)
+
+    def get_cart(self, user):
+        # Produk yang sudah dihapus tidak ditampilkan; dibuang saat flush
+        return build_contents(self._get_state(user.pk)['items'])
+
+    def _compute_count(self, user_id):
+        state = self._get_state(user_id)
+        return sum(line['quantity'] for line in state['items'].values())
+
+    def add_item(self, user, product, quantity, price_per_portion, notes=''):
+        with self._lock(user.pk):
+            state = self._get_state(user.pk)
+            line = state['items'].get(product.pk)
+            created = line is None
+            if created:
+                line = {'quantity': 0, 'added_at': time.time()}
+                state['items'][product.pk] = line
+            line['quantity'] += quantity
+            line['price_per_portion'] = Decimal(price_per_portion)
+            line['notes'] = notes
+            self._save_state(user.pk, state)
+            self._adjust_count(user.pk, quantity)
+        return created
+
+    def change_quantity(self, user, product_id, delta):
+        with self._lock(user.pk):
+            state = self._get_state(user.pk)
+            line = state['items'].get(product_id)
+            if line is None:
+                return None
+            if line['quantity'] + delta < 1:
+                del state['items'][product_id]
+                delta = -line['quantity']
+                quantity = 0
+            else:
+                line['quantity'] += delta
+                quantity = line['quantity']
+            self._save_state(user.pk, state)
+            self._adjust_count(user.pk, delta)
+        return quantity
+
+    def remove_item(self, user, product_id):
+        with self._lock(user.pk):
+            state = self._get_state(user.pk)
+            line = state['items'].pop(product_id, None)
+            if line is None:
+                return None
+            self._save_state(user.pk, state)
+            self._adjust_count(user.pk, -line['quantity'])
+        return Product.objects.filter(pk=product_id).values_list('name', flat=True).first() or ''
+
+    def clear(self, user):
+        with self._lock(user.pk):
+            state = self._get_state(user.pk)
+            state['items'] = {}
+            self._save_state(user.pk, state)
+            self._reset_count(user.pk, 0)
+
+    def apply_batch(self, user, operations, skip_missing=False):
+        prices = _product_prices(operations)
+        with self._lock(user.pk):
+            state = self._get_state(user.pk)
+            # Salinan: jika satu operasi gagal, state tidak berubah sama sekali
+            lines = copy.deepcopy(state['items'])
+            apply_operations(lines, operations, prices, skip_missing)
+            state['items'] = lines
+            self._save_state(user.pk, state)
+            result = summarize_lines(lines)
+            self._reset_count(user.pk, result['count'])
+        return result
+
+    def flush(self, user_id):
+        """
+        Tulis keranjang satu user ke DB jika ada perubahan.
+
+        Returns:
+            bool: True jika ada yang ditulis
+        """
+        state = cache.get(self._key(user_id))
+        if state is None or state['version'] == state['flushed']:
+            return False
+        version = state['version']
+
+        with transaction.atomic():
+            if not get_user_model().objects.filter(pk=user_id).exists():
+                cache.delete(self._key(user_id))
+                return False
+            cart, _ = Cart.objects.get_or_create(user_id=user_id)
+            existing = {item.product_id: item for item in CartItem.objects.filter(cart=cart)}
+            valid_ids = set(
+                Product.objects.filter(pk__in=list(state['items'])).values_list('pk', flat=True)
+            )
+            lines = {
+                product_id: line for product_id, line in state['items'].items()
+                if product_id in valid_ids
+            }
+            write_lines(cart, lines, existing)
+
+        with self._lock(user_id):
+            current = cache.get(self._key(user_id))
+            if current is not None:
+                current['flushed'] = version
+                cache.set(self._key(user_id), current, STATE_TIMEOUT)
+                if current['version'] != version:
+                    # Ada mutasi selama flush; pastikan tetap ikut flush berikutnya
+                    self._mark_dirty(user_id)
+        return True
+
+    def flush_pending(self):
+        """
+        Flush semua keranjang yang tercatat di dirty log.
+
+        Returns:
+            int: jumlah keranjang yang ditulis ke DB
+        """
+        last = cache.get(DIRTY_SEQ_KEY, 0)
+        cursor = cache.get(DIRTY_CURSOR_KEY, 0)
+        flushed = 0
+        while cursor < last:
+            seqs = range(cursor + 1, min(cursor + DIRTY_BATCH_SIZE, last) + 1)
+            found = cache.get_many([f'cart:dirty:{seq}' for seq in seqs])
+            # Cursor berhenti di nomor urut pertama yang key-nya belum ditulis
+            # (incr sudah, set belum): keranjang itu tidak dicatat ulang
+            # karena sudah 'kotor', jadi tidak boleh terlewat
+            ready = []
+            for seq in seqs:
+                if f'cart:dirty:{seq}' not in found and not self._gap_expired(seq):
+                    break
+                ready.append(f'cart:dirty:{seq}')
+            for user_id in {found[key] for key in ready if key in found}:
+                try:
+                    flushed += self.flush(user_id)
+                except Exception:
+                    logger.exception('Gagal flush keranjang user %s', user_id)
+                    self._mark_dirty(user_id)
+            cache.delete_many(ready)
+            cursor += len(ready)
+            if len(ready) < len(seqs):
+                break
+        cache.set(DIRTY_CURSOR_KEY, cursor, None)
+        return flushed
+
+    def _gap_expired(self, seq):
+        """True jika key dirty log `seq` sudah lebih dari DIRTY_GAP_TIMEOUT detik tidak muncul"""
+        gap = cache.get(DIRTY_GAP_KEY)
+        if gap is None or gap[0] != seq:
+            cache.set(DIRTY_GAP_KEY, (seq, time.time()), None)
+            return False
+        return time.time() - gap[1] >= DIRTY_GAP_TIMEOUT
+
+    def _forget(self, user_id):
+        # Buang state cache (mis. setelah keranjang diubah lewat admin)
+        cache.delete(self._key(user_id))
+        self._reset_count(user_id)
+
+    def unflushed(self, user_ids):
+        keys = {self._key(user_id): user_id for user_id in user_ids}
+        return {
+            keys[key] for key, state in cache.get_many(list(keys)).items()
+            if state['version'] != state['flushed']
+        }
+
+    def discard_if_flushed(self, user_id):
+        # Di dalam lock: mutasi yang masuk setelah pengecekan tidak ikut terbuang
+        try:
+            with self._lock(user_id):
+                state = cache.get(self._key(user_id))
+                if state is not None and state['version'] != state['flushed']:
+                    return False
+                self._forget(user_id)
+        except CartBusy:
+            # Keranjang sedang diubah: state-nya akan di-flush, jangan dibuang
+            return False
+        return True
+
+
+STORES = {
+    'database': DatabaseCartStore,
+    'cache': CacheCartStore,
+}
+
+_stores = {}
+
+
+def get_cart_store(name=None):
+    name = name or getattr(settings, 'CART_STORE', 'database')
+    if name not in _stores:
+        _stores[name] = STORES[name]()
+    return _stores[name]
@@ -1,3 +1,423 @@
-from django.test import TestCase
+import json
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from products.models import Category, Product
+from users.models import CustomUser
+
+from .context_processors import cart_count
+from .guest import COOKIE_NAME
+from .models import Cart, CartItem
+from .store import DIRTY_SEQ_KEY, CacheCartStore, CartBusy, get_cart_store
+
+
+class CartStoreTests:
+    """Perilaku keranjang yang sama untuk kedua backend (CART_STORE)"""
+
+    store_name = None
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(username='pelanggan')
+        category = Category.objects.create(name='Nasi')
+        cls.products = [
+            Product.objects.create(
+                category=category, name=f'Menu {index}', description='-', price=25000, stock=100,
+            )
+            for index in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.enterContext(self.settings(CART_STORE=self.store_name))
+        self.store = get_cart_store()
+
+    def add(self, product, quantity=10, **extra):
+        return self.client.post(reverse('add_to_cart', args=[product.pk]), {
+            'quantity': quantity, 'price_per_portion': 20000, **extra,
+        })
+
+    def batch(self, operations):
+        return self.client.post(
+            reverse('cart_batch'), json.dumps({'operations': operations}),
+            content_type='application/json',
+        )
+
+    def lines(self):
+        return {item.product.pk: item.quantity for item in self.store.get_cart(self.user)}
+
+    def count(self):
+        return self.client.get(reverse('cart_item_count')).json()['count']
+
+    def db_lines(self):
+        return dict(CartItem.objects.filter(cart__user=self.user).values_list('product_id', 'quantity'))
+
+    def test_add_update_remove(self):
+        self.client.force_login(self.user)
+        first, second = self.products[:2]
+        self.assertRedirects(self.add(first), reverse('cart'))
+        self.add(first, 5)
+        self.add(second)
+        self.assertEqual(self.lines(), {first.pk: 15, second.pk: 10})
+        self.assertEqual(self.count(), 25)
+
+        self.client.post(reverse('update_cart_item', args=[first.pk]), {'action': 'increase'})
+        self.client.post(reverse('update_cart_item', args=[second.pk]), {'action': 'decrease'})
+        self.assertEqual(self.lines(), {first.pk: 16, second.pk: 9})
+
+        self.client.post(reverse('remove_cart_item', args=[second.pk]))
+        self.assertEqual(self.lines(), {first.pk: 16})
+        self.assertEqual(self.count(), 16)
+        response = self.client.post(reverse('remove_cart_item', args=[second.pk]))
+        self.assertEqual(response.status_code, 404)
+
+        self.client.post(reverse('clear_cart'))
+        self.assertEqual(self.lines(), {})
+        self.assertEqual(self.count(), 0)
+
+    def test_batch_operations(self):
+        self.client.force_login(self.user)
+        first, second, third = self.products
+        self.add(first)
+        self.add(second)
+        response = self.batch([
+            {'op': 'update', 'product_id': first.pk, 'quantity': 12},
+            {'op': 'remove', 'product_id': second.pk},
+            {'op': 'add', 'product_id': third.pk, 'quantity': 10},
+        ])
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['count'], data['subtotal']), (22, 12 * 20000 + 10 * 25000))
+        self.assertEqual(self.lines(), {first.pk: 12, third.pk: 10})
+        self.assertEqual(self.count(), 22)
+
+    def test_invalid_batch_changes_nothing(self):
+        self.client.force_login(self.user)
+        self.add(self.products[0])
+        invalid = [
+            [{'op': 'update', 'product_id': self.products[0].pk, 'quantity': 12},
+             {'op': 'add', 'product_id': 999999}],
+            [{'op': 'update', 'product_id': self.products[1].pk, 'quantity': 1}],
+            [{'op': 'rename', 'product_id': self.products[0].pk}],
+            [],
+        ]
+        for operations in invalid:
+            with self.subTest(operations=operations):
+                response = self.batch(operations)
+                self.assertEqual(response.status_code, 400)
+                self.assertFalse(response.json()['success'])
+        response = self.client.post(reverse('cart_batch'), 'bukan json', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.lines(), {self.products[0].pk: 10})
+
+    def test_price_must_be_portion_tier(self):
+        self.client.force_login(self.user)
+        first, second = self.products[:2]
+        for price in (1, 0, 24999, 'abc'):
+            with self.subTest(price=price):
+                response = self.client.post(
+                    reverse('add_to_cart', args=[first.pk]),
+                    {'quantity': 10, 'price_per_portion': price},
+                    headers={'X-Requested-With': 'XMLHttpRequest'},
+                )
+                self.assertEqual(response.status_code, 400)
+                response = self.batch([
+                    {'op': 'add', 'product_id': first.pk, 'quantity': 10, 'price_per_portion': price},
+                ])
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.lines(), {})
+        # Tingkat harga 10-50 / 50-150 / >150 porsi
+        self.add(first, price_per_portion=15000)
+        self.batch([{'op': 'add', 'product_id': second.pk, 'quantity': 10, 'price_per_portion': 25000}])
+        prices = {item.product.pk: item.price_per_portion for item in self.store.get_cart(self.user)}
+        self.assertEqual(prices, {first.pk: 15000, second.pk: 25000})
+
+    def test_guest_price_replaced_when_product_price_changed(self):
+        first = self.products[0]
+        self.add(first)
+        Product.objects.filter(pk=first.pk).update(price=30000)
+        self.client.force_login(self.user)
+        self.client.get(reverse('cart'))
+        prices = [item.price_per_portion for item in self.store.get_cart(self.user)]
+        self.assertEqual(prices, [30000])
+
+    def test_guest_cart_merged_on_login(self):
+        first, second = self.products[:2]
+        self.client.force_login(self.user)
+        self.add(first)
+        self.client.logout()
+
+        self.add(first, 5, notes='pedas')
+        self.add(second)
+        self.assertIn(COOKIE_NAME, self.client.cookies)
+        self.assertEqual(self.count(), 15)
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('cart'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.cookies[COOKIE_NAME].value, '')
+        self.assertEqual(self.lines(), {first.pk: 15, second.pk: 10})
+        notes = {item.product.pk: item.notes for item in self.store.get_cart(self.user)}
+        self.assertEqual(notes[first.pk], 'pedas')
+
+    def test_checkout_uses_latest_cart(self):
+        self.client.force_login(self.user)
+        self.add(self.products[0])
+        response = self.client.post(reverse('checkout_from_cart'), {'delivery_date': '2030-01-02'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.products[0].__class__.objects.get(pk=self.products[0].pk).stock, 90)
+        self.assertEqual(self.lines(), {})
+
+    def test_badge_counter(self):
+        first, second, third = self.products
+        steps = [
+            lambda: self.store.add_item(self.user, first, 10, 25000),
+            lambda: self.store.add_item(self.user, first, 5, 25000),
+            lambda: self.store.add_item(self.user, second, 3, 25000),
+            lambda: self.store.change_quantity(self.user, first, 1),
+            lambda: self.store.change_quantity(self.user, second, -3),
+            lambda: self.store.apply_batch(self.user, [
+                ('add', third.pk, {'quantity': 4}), ('update', first.pk, {'quantity': 12}),
+            ]),
+            lambda: self.store.remove_item(self.user, third.pk),
+            lambda: self.store.clear(self.user),
+        ]
+        # Counter sudah ada (incr/decr) dan counter yang baru diisi setelah dibuang
+        for seeded in (True, False):
+            for number, step in enumerate(steps):
+                with self.subTest(seeded=seeded, step=number):
+                    if seeded:
+                        self.store.count_items(self.user)
+                    else:
+                        cache.delete(f'cart:count:{self.user.pk}')
+                    step()
+                    expected = sum(self.lines().values())
+                    self.assertEqual(self.store.count_items(self.user), expected)
+
+    def test_badge_counter_is_lazy(self):
+        request = RequestFactory().get('/')
+        request.user = self.user
+        with mock.patch.object(type(self.store), 'count_items', return_value=7) as count_items:
+            context = cart_count(request)
+            count_items.assert_not_called()
+            self.assertEqual(str(context['cart_count']), '7')
+            self.assertEqual(count_items.call_count, 1)
+
+    def test_sweep_carts(self):
+        stale_user = CustomUser.objects.create(username='lama')
+        for user in (self.user, stale_user):
+            cart = Cart.objects.create(user=user)
+            CartItem.objects.create(cart=cart, product=self.products[0], quantity=10)
+        old = timezone.now() - timedelta(days=40)
+        Cart.objects.filter(user=stale_user).update(updated_at=old)
+        CartItem.objects.filter(cart__user=stale_user).update(updated_at=old)
+
+        out = StringIO()
+        call_command('sweep_carts', '--days', '30', '--sleep', '0', stdout=out)
+        self.assertIn('1 keranjang dan 1 item dihapus', out.getvalue())
+        self.assertEqual(list(Cart.objects.values_list('user__username', flat=True)), ['pelanggan'])
+
+
+class DatabaseCartStoreTest(CartStoreTests, TestCase):
+    store_name = 'database'
+
+    def test_flush_carts_noop(self):
+        out = StringIO()
+        call_command('flush_carts', stdout=out)
+        self.assertIn('bukan "cache"', out.getvalue())
+
+
+class CacheCartStoreTest(CartStoreTests, TestCase):
+    store_name = 'cache'
+
+    def test_flush_carts(self):
+        self.client.force_login(self.user)
+        self.add(self.products[0])
+        self.add(self.products[1])
+        # Write-behind: belum ada di database sampai di-flush
+        self.assertEqual(self.db_lines(), {})
+
+        out = StringIO()
+        call_command('flush_carts', stdout=out)
+        self.assertIn('1 keranjang disimpan', out.getvalue())
+        self.assertEqual(self.db_lines(), {self.products[0].pk: 10, self.products[1].pk: 10})
+
+        self.client.post(reverse('remove_cart_item', args=[self.products[1].pk]))
+        call_command('flush_carts', stdout=StringIO())
+        self.assertEqual(self.db_lines(), {self.products[0].pk: 10})
+
+    def test_sweep_flushes_cached_carts_first(self):
+        self.client.force_login(self.user)
+        self.add(self.products[0])
+        call_command('sweep_carts', '--sleep', '0', stdout=StringIO())
+        self.assertEqual(self.db_lines(), {self.products[0].pk: 10})
+
+    def make_stale(self):
+        old = timezone.now() - timedelta(days=40)
+        Cart.objects.filter(user=self.user).update(updated_at=old)
+        CartItem.objects.filter(cart__user=self.user).update(updated_at=old)
+
+    def test_sweep_keeps_cart_changed_after_flush(self):
+        self.client.force_login(self.user)
+        self.add(self.products[0])
+        call_command('flush_carts', stdout=StringIO())
+        self.make_stale()
+        # Perubahan yang masuk setelah flush_pending di awal sweep
+        with mock.patch.object(CacheCartStore, 'flush_pending', return_value=0):
+            self.add(self.products[1])
+            out = StringIO()
+            call_command('sweep_carts', '--sleep', '0', stdout=out)
+        self.assertIn('0 keranjang', out.getvalue())
+        self.assertEqual(self.db_lines(), {self.products[0].pk: 10, self.products[1].pk: 10})
+        self.assertEqual(self.lines(), {self.products[0].pk: 10, self.products[1].pk: 10})
+
+    def test_sweep_does_not_discard_unflushed_state(self):
+        self.client.force_login(self.user)
+        self.add(self.products[0])
+        call_command('flush_carts', stdout=StringIO())
+        self.make_stale()
+        # Mutasi di antara pengecekan dan DELETE: state tetap, flush membuat ulang keranjang
+        with mock.patch.object(CacheCartStore, 'unflushed', return_value=set()), \
+                mock.patch.object(CacheCartStore, 'flush_pending', return_value=0):
+            self.add(self.products[1])
+            call_command('sweep_carts', '--sleep', '0', stdout=StringIO())
+        self.assertFalse(Cart.objects.exists())
+        self.assertEqual(self.lines(), {self.products[0].pk: 10, self.products[1].pk: 10})
+        self.store.flush(self.user.pk)
+        self.assertEqual(self.db_lines(), {self.products[0].pk: 10, self.products[1].pk: 10})
+
+    def test_sweep_dry_run_does_not_flush(self):
+        self.client.force_login(self.user)
+        self.add(self.products[0])
+        call_command('sweep_carts', '--dry-run', stdout=StringIO())
+        self.assertFalse(Cart.objects.exists())
+
+    def test_counter_seed_not_overwritten_by_concurrent_change(self):
+        product = self.products[0]
+        self.store.get_cart(self.user)  # state keranjang (kosong) sudah di cache
+        compute = self.store._compute_count
+        writers = []
+
+        def compute_then_race(user_id):
+            count = compute(user_id)
+            # Mutasi bersamaan di antara hitung dan simpan counter
+            writer = threading.Thread(target=self.store.add_item, args=(self.user, product, 5, 25000))
+            writer.start()
+            writer.join(0.1)
+            writers.append(writer)
+            return count
+
+        with mock.patch.object(self.store, '_compute_count', side_effect=compute_then_race):
+            self.store.count_items(self.user)
+        writers[0].join()
+        self.assertEqual(self.lines(), {product.pk: 5})
+        self.assertEqual(self.store.count_items(self.user), 5)
+
+    def reserve_dirty_seq(self):
+        """Nomor urut dirty log yang sudah di-incr tapi key-nya belum ditulis"""
+        cache.add(DIRTY_SEQ_KEY, 0, None)
+        return cache.incr(DIRTY_SEQ_KEY)
+
+    def test_flush_waits_for_dirty_log_entry(self):
+        seq = self.reserve_dirty_seq()
+        self.assertEqual(self.store.flush_pending(), 0)
+        # Penulis yang terlambat: state sudah kotor, key dirty log baru ditulis sekarang
+        with mock.patch.object(CacheCartStore, '_mark_dirty'):
+            self.store.add_item(self.user, self.products[0], 10, 25000)
+        cache.set(f'cart:dirty:{seq}', self.user.pk)
+        self.assertEqual(self.store.flush_pending(), 1)
+        self.assertEqual(self.db_lines(), {self.products[0].pk: 10})
+
+    def test_flush_skips_dirty_log_gap_after_timeout(self):
+        self.reserve_dirty_seq()
+        self.store.add_item(self.user, self.products[0], 10, 25000)
+        self.assertEqual(self.store.flush_pending(), 0)
+        with mock.patch('cart.store.DIRTY_GAP_TIMEOUT', 0):
+            self.assertEqual(self.store.flush_pending(), 1)
+        self.assertEqual(self.db_lines(), {self.products[0].pk: 10})
+
+    def test_expired_lock_not_released_by_old_holder(self):
+        key = f'cart:lock:{self.user.pk}'
+        with self.store._lock(self.user.pk):
+            # Lock kedaluwarsa dan diambil request lain
+            cache.set(key, 'pemilik-baru', 60)
+        self.assertEqual(cache.get(key), 'pemilik-baru')
+
+    @mock.patch('cart.store.LOCK_TIMEOUT', 0.05)
+    def test_lock_timeout_does_not_write_unlocked(self):
+        self.client.force_login(self.user)
+        self.add(self.products[0])
+        # Request lain memegang lock keranjang user ini
+        cache.add(f'cart:lock:{self.user.pk}', 1, 60)
+
+        self.assertIsInstance(self.store, CacheCartStore)
+        with self.assertRaises(CartBusy):
+            self.store.add_item(self.user, self.products[1], 10, 25000)
+
+        response = self.add(self.products[1])
+        self.assertRedirects(response, reverse('cart'), fetch_redirect_response=False)
+        response = self.batch([{'op': 'remove', 'product_id': self.products[0].pk}])
+        self.assertEqual(response.status_code, 409)
+
+        cache.delete(f'cart:lock:{self.user.pk}')
+        self.assertEqual(self.lines(), {self.products[0].pk: 10})
+
+
+
+class CartQueryCountTest(TestCase):
+    """Halaman keranjang dan admin: jumlah query tetap, berapa pun item-nya"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Nasi')
+        cls.products = [
+            Product.objects.create(
+                category=category, name=f'Menu {index}', description='-', price=25000, stock=100,
+            )
+            for index in range(5)
+        ]
+        cls.admin = CustomUser.objects.create_superuser(
+            username='admin', email='admin@example.com', password='password'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.enterContext(self.settings(CART_STORE='database'))
+
+    def create_cart(self, username, product_total):
+        user = CustomUser.objects.create(username=username)
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.bulk_create([
+            CartItem(cart=cart, product=product, quantity=10, price_per_portion=product.price)
+            for product in self.products[:product_total]
+        ])
+        return user
+
+    def test_cart_view(self):
+        # Session, user, item beranotasi, counter badge (cache kosong)
+        for product_total in (1, 5):
+            with self.subTest(items=product_total):
+                cache.clear()
+                self.client.force_login(self.create_cart(f'user{product_total}', product_total))
+                with self.assertNumQueries(4):
+                    response = self.client.get(reverse('cart'))
+                self.assertEqual(len(response.context['cart_items']), product_total)
+
+    def test_admin_changelists(self):
+        for index in range(3):
+            self.create_cart(f'user{index}', 5)
+        self.client.force_login(self.admin)
+        # Session, user, 2 x COUNT, satu SELECT beranotasi, 2 x permission
+        for name, rows in (('admin:cart_cart_changelist', 3), ('admin:cart_cartitem_changelist', 15)):
+            with self.subTest(changelist=name):
+                with self.assertNumQueries(7):
+                    response = self.client.get(reverse(name))
+                self.assertEqual(len(response.context['cl'].result_list), rows)
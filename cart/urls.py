@@ -3,8 +3,10 @@ from . import views
 
 urlpatterns = [
     path('', views.cart_view, name='cart'),
+    path('count/', views.cart_item_count, name='cart_item_count'),
     path('add/<int:product_id>/', views.add_to_cart, name='add_to_cart'),
-    path('update/<int:item_id>/', views.update_cart_item, name='update_cart_item'),
-    path('remove/<int:item_id>/', views.remove_cart_item, name='remove_cart_item'),  
+    path('update/<int:product_id>/', views.update_cart_item, name='update_cart_item'),
+    path('remove/<int:product_id>/', views.remove_cart_item, name='remove_cart_item'),  
+    path('batch/', views.cart_batch, name='cart_batch'),
     path('clear/', views.clear_cart, name='clear_cart'),
 ]
\ No newline at end of file
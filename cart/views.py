@@ -1,55 +1,71 @@
 #cart/views.py
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
-from .models import Cart, CartItem
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import require_POST
+from .guest import get_store_for
+from .store import CartBusy, CartOperationError, parse_operations, parse_order_input
 from products.models import Product
-from decimal import Decimal
+from functools import wraps
+import json
+
+BUSY_MESSAGE = 'Keranjang sedang diperbarui, silakan coba lagi.'
+
+
+def retry_when_busy(view):
+    """CartBusy (lock keranjang timeout) menjadi pesan 'coba lagi', bukan error 500"""
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except CartBusy:
+            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+                return JsonResponse({'success': False, 'error': BUSY_MESSAGE}, status=409)
+            messages.error(request, BUSY_MESSAGE)
+            return redirect('cart')
+    return wrapped
+
 
-@login_required
 def cart_view(request):
-    """Halaman keranjang belanja"""
-    cart, created = Cart.objects.get_or_create(user=request.user)
+    """Halaman keranjang belanja (user login atau tamu)"""
+    store, owner = get_store_for(request)
+    cart = store.get_cart(owner)
     
     context = {
         'cart': cart,
-        'cart_items': cart.items.all(),
+        'cart_items': cart.items,
     }
     return render(request, 'cart/cart.html', context)
 
 
-@login_required
+def cart_item_count(request):
+    """Jumlah item untuk badge navbar (JSON, tanpa render halaman cart)"""
+    store, owner = get_store_for(request)
+    return JsonResponse({'count': store.count_items(owner)})
+
+
+@retry_when_busy
 def add_to_cart(request, product_id):
     """Tambah produk ke keranjang"""
     if request.method == 'POST':
         product = get_object_or_404(Product, id=product_id)
         
-        # Get or create cart
-        cart, created = Cart.objects.get_or_create(user=request.user)
-        
         # Get data from POST
-        quantity = int(request.POST.get('quantity', 10))
-        price_per_portion = Decimal(request.POST.get('price_per_portion', product.price))
         notes = request.POST.get('notes', '')
         
-        # Check if item already in cart
-        cart_item, created = CartItem.objects.get_or_create(
-            cart=cart,
-            product=product,
-            defaults={
-                'quantity': quantity,
-                'price_per_portion': price_per_portion,
-                'notes': notes
-            }
-        )
+        # Item baru, atau quantity ditambah jika produk sudah ada di cart
+        store, owner = get_store_for(request)
+        try:
+            quantity, price_per_portion = parse_order_input(request.POST, product)
+            created = store.add_item(owner, product, quantity, price_per_portion, notes)
+        except CartOperationError as e:
+            # Input tidak valid, atau keranjang tamu melewati batas cookie
+            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+                return JsonResponse({'success': False, 'error': str(e)}, status=400)
+            messages.error(request, str(e))
+            return redirect('cart')
         
         if not created:
-            # Item sudah ada, update quantity
-            cart_item.quantity += quantity
-            cart_item.price_per_portion = price_per_portion  # Update harga
-            cart_item.notes = notes
-            cart_item.save()
             messages.success(request, f'✅ {product.name} berhasil ditambahkan! Quantity diupdate.')
         else:
             messages.success(request, f'✅ {product.name} berhasil ditambahkan ke keranjang!')
@@ -63,46 +79,68 @@ def add_to_cart(request, product_id):
     return redirect('menu')
 
 
-@login_required
-def update_cart_item(request, item_id):
+@retry_when_busy
+def update_cart_item(request, product_id):
     """Update quantity item di cart"""
     if request.method == 'POST':
-        cart_item = get_object_or_404(CartItem, id=item_id, cart__user=request.user)
         action = request.POST.get('action')
+        delta = {'increase': 1, 'decrease': -1}.get(action, 0)
         
-        if action == 'increase':
-            cart_item.quantity += 1
-        elif action == 'decrease':
-            if cart_item.quantity > 1:
-                cart_item.quantity -= 1
-            else:
-                cart_item.delete()
-                messages.success(request, 'Item dihapus dari keranjang')
-                return redirect('cart')
+        store, owner = get_store_for(request)
+        quantity = store.change_quantity(owner, product_id, delta)
+        if quantity is None:
+            raise Http404('Item tidak ada di keranjang')
+        if quantity == 0:
+            messages.success(request, 'Item dihapus dari keranjang')
+            return redirect('cart')
         
-        cart_item.save()
         messages.success(request, 'Quantity berhasil diupdate')
     
     return redirect('cart')
 
 
-@login_required
-def remove_cart_item(request, item_id):
+@retry_when_busy
+def remove_cart_item(request, product_id):
     """Hapus item dari cart"""
-    cart_item = get_object_or_404(CartItem, id=item_id, cart__user=request.user)
-    product_name = cart_item.product.name
-    cart_item.delete()
+    store, owner = get_store_for(request)
+    product_name = store.remove_item(owner, product_id)
+    if product_name is None:
+        raise Http404('Item tidak ada di keranjang')
     
     messages.success(request, f'❌ {product_name} dihapus dari keranjang')
     return redirect('cart')
 
 
-@login_required
+@require_POST
+def cart_batch(request):
+    """
+    Terapkan sekumpulan add/update/remove dalam satu request (JSON).
+
+    Body: {"operations": [{"op": "update", "product_id": 3, "quantity": 12}, ...]}
+    Semua operasi berhasil atau tidak ada yang disimpan. Response berisi
+    count, subtotal dan total per item agar halaman cart di-update di tempat.
+    """
+    try:
+        payload = json.loads(request.body or b'{}')
+        operations = parse_operations(payload.get('operations') if isinstance(payload, dict) else None)
+        store, owner = get_store_for(request)
+        result = store.apply_batch(owner, operations)
+    except ValueError as e:
+        # CartOperationError dan JSON tidak valid sama-sama turunan ValueError
+        message = str(e) if isinstance(e, CartOperationError) else 'Body harus JSON'
+        return JsonResponse({'success': False, 'error': message}, status=400)
+    except CartBusy:
+        return JsonResponse({'success': False, 'error': BUSY_MESSAGE}, status=409)
+    
+    return JsonResponse({'success': True, **result})
+
+
+@retry_when_busy
 def clear_cart(request):
     """Kosongkan seluruh cart"""
     if request.method == 'POST':
-        cart = get_object_or_404(Cart, user=request.user)
-        cart.clear()
+        store, owner = get_store_for(request)
+        store.clear(owner)
         messages.success(request, 'Keranjang berhasil dikosongkan')
     
     return redirect('cart')
\ No newline at end of file
@@ -9,7 +9,9 @@ class OrderItemInline(admin.TabularInline):
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ('order_number', 'customer_name', 'status', 'total', 'delivery_date')
-    list_filter = ('status', 'delivery_method', 'created_at')
+    list_filter = ('status', 'delivery_date', 'delivery_method', 'created_at')
+    # Tanpa COUNT(*) seluruh tabel di setiap halaman yang difilter
+    show_full_result_count = False
     search_fields = ('order_number', 'customer_name', 'customer_phone')
     readonly_fields = ('order_number', 'created_at', 'updated_at')
     inlines = [OrderItemInline]
\ No newline at end of file
@@ -0,0 +1,125 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from backend.benchmark import Timer, scratch_database
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark checkout_from_cart: latency & query per checkout untuk beberapa ukuran '
+        'cart, lalu checkout paralel untuk satu produk dengan stok terbatas (cek oversell).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=30, help='Checkout per ukuran cart')
+        parser.add_argument('--buyers', type=int, default=40, help='Thread checkout paralel')
+        parser.add_argument('--stock', type=int, default=200)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        try:
+            with scratch_database():
+                self.populate()
+                for item_total in (1, 5, 20):
+                    self.serial(item_total, options['repeat'])
+                if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+                    self.stdout.write('Database in-memory: checkout paralel dilewati')
+                else:
+                    self.concurrent(options['buyers'], options['stock'])
+        finally:
+            teardown_test_environment()
+
+    def populate(self):
+        from products.models import Category, Product
+
+        category = Category.objects.create(name='Bench', slug='bench')
+        Product.objects.bulk_create([
+            Product(
+                category=category, name=f'Menu {index}', slug=f'menu-{index}',
+                description='-', price=25000, stock=1_000_000,
+            )
+            for index in range(20)
+        ])
+        self.products = list(Product.objects.all())
+        self.user_count = 0
+
+    def buyer(self, products, quantity=10):
+        from django.contrib.auth import get_user_model
+
+        from cart.models import Cart, CartItem
+
+        self.user_count += 1
+        user = get_user_model().objects.create(username=f'bench{self.user_count}')
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.bulk_create([
+            CartItem(cart=cart, product=product, quantity=quantity, price_per_portion=product.price)
+            for product in products
+        ])
+        client = Client()
+        client.force_login(user)
+        return client
+
+    def checkout(self, client):
+        return client.post(reverse('checkout_from_cart'), {'delivery_date': '2030-01-01'})
+
+    def serial(self, item_total, repeat):
+        timer = Timer()
+        queries = [0]
+
+        def wrapper(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        for _ in range(repeat):
+            client = self.buyer(self.products[:item_total])
+            with connection.execute_wrapper(wrapper), timer:
+                response = self.checkout(client)
+            assert response.status_code == 302, response.status_code
+        self.stdout.write(
+            f'[{item_total:>2} item] {timer.format()} | {queries[0] / repeat:.1f} query/checkout'
+        )
+
+    def concurrent(self, buyers, stock):
+        from orders.models import Order
+        from products.models import Product
+
+        product = self.products[0]
+        Product.objects.filter(pk=product.pk).update(stock=stock)
+        orders_before = Order.objects.count()
+        clients = [self.buyer([product]) for _ in range(buyers)]
+        barrier = threading.Barrier(buyers)
+        timer = Timer()
+        errors = []
+
+        def buy(client):
+            try:
+                barrier.wait()
+                with timer:
+                    self.checkout(client)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=buy, args=(client,)) for client in clients]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        product.refresh_from_db()
+        orders = Order.objects.count() - orders_before
+        self.stdout.write(f'[paralel] {timer.format()} | {buyers / elapsed:.0f} checkout/s')
+        style = self.style.SUCCESS if orders * 10 <= stock and not errors else self.style.ERROR
+        self.stdout.write(style(
+            f'[paralel] {buyers} pembeli x 10 porsi, stok {stock}: {orders} order, '
+            f'sisa stok {product.stock}, {len(errors)} error'
+        ))
@@ -0,0 +1,85 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from backend.benchmark import Timer, scratch_database
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Stress test generator nomor order: banyak thread (dan beberapa allocator, '
+        'seperti beberapa proses) membuat nomor bersamaan, lalu cek tidak ada yang dobel.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--total', type=int, default=1_000_000)
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--allocators', type=int, default=4, help='Simulasi jumlah proses')
+        parser.add_argument('--block-size', type=int, default=1000)
+        parser.add_argument(
+            '--rollback-every', type=int, default=500,
+            help='Setiap N nomor, satu nomor dibuat di transaksi yang di-rollback (0 = tidak)',
+        )
+
+    def handle(self, *args, **options):
+        from orders.numbering import OrderNumberAllocator
+
+        with scratch_database():
+            if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+                raise CommandError('Butuh database test berupa file untuk koneksi paralel')
+
+            allocators = [
+                OrderNumberAllocator(options['block_size']) for _ in range(options['allocators'])
+            ]
+            per_thread = options['total'] // options['threads']
+            rollback_every = options['rollback_every']
+            results = [[] for _ in range(options['threads'])]
+            errors = []
+            timer = Timer()
+            barrier = threading.Barrier(options['threads'])
+
+            def work(index):
+                allocator = allocators[index % len(allocators)]
+                numbers = results[index]
+                try:
+                    barrier.wait()
+                    for count in range(per_thread):
+                        if rollback_every and count % rollback_every == 0:
+                            # Order yang gagal: nomornya boleh dipakai ulang, tidak dihitung
+                            try:
+                                with transaction.atomic():
+                                    allocator.next_order_number()
+                                    raise Rollback
+                            except Rollback:
+                                pass
+                        with timer:
+                            numbers.append(allocator.next_order_number())
+                except Exception as e:
+                    errors.append(e)
+                finally:
+                    connection.close()
+
+            threads = [threading.Thread(target=work, args=(index,)) for index in range(options['threads'])]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+
+            generated = sum(len(numbers) for numbers in results)
+            unique = len({number for numbers in results for number in numbers})
+            self.stdout.write(f'{timer.format()}')
+            self.stdout.write(
+                f'{generated} nomor dari {options["threads"]} thread / {len(allocators)} allocator '
+                f'dalam {elapsed:.1f}s ({generated / elapsed:,.0f} nomor/s), contoh {results[0][-1]}'
+            )
+            if errors or unique != generated:
+                raise CommandError(f'{generated - unique} nomor dobel, {len(errors)} error: {errors[:3]}')
+            self.stdout.write(self.style.SUCCESS('Tidak ada nomor yang dobel'))
@@ -1,8 +1,33 @@
 from django.db import models
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.conf import settings
 from products.models import Product
 from django.utils import timezone
-import uuid
+
+class OrderQuerySet(models.QuerySet):
+    def with_summary(self):
+        """
+        Anotasi item_count (total porsi) dan payment_status untuk daftar order.
+
+        Subquery per baris (bukan JOIN + GROUP BY), jadi tetap murah jika
+        dipotong LIMIT oleh keyset pagination.
+        """
+        from payments.models import Payment
+
+        portions = (
+            OrderItem.objects.filter(order=OuterRef('pk'))
+            .values('order')
+            .annotate(total=Sum('quantity'))
+            .values('total')
+        )
+        return self.annotate(
+            item_count=Coalesce(Subquery(portions), Value(0)),
+            payment_status=Subquery(
+                Payment.objects.filter(order=OuterRef('pk')).order_by().values('status')[:1]
+            ),
+        )
+
 
 class Order(models.Model):
     """Model untuk pesanan catering"""
@@ -48,28 +73,42 @@ class Order(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     paid_at = models.DateTimeField(null=True, blank=True)
 
+    objects = OrderQuerySet.as_manager()
+
     class Meta:
         db_table = 'orders'
         verbose_name = 'Order'
         verbose_name_plural = 'Orders'
         ordering = ['-created_at']
+        indexes = [
+            # Riwayat pesanan user (keyset created_at, id)
+            models.Index(fields=['user', '-created_at', '-id'], name='order_user_list_idx'),
+            # Daftar kerja dapur/admin: pesanan per status untuk tanggal kirim tertentu
+            models.Index(fields=['status', 'delivery_date'], name='order_status_delivery_idx'),
+        ]
 
     def __str__(self):
         return f"Order #{self.order_number} - {self.customer_name}"
 
     def save(self, *args, **kwargs):
         if not self.order_number:
-            from datetime import datetime
-            date_str = datetime.now().strftime('%Y%m%d')
-            random_str = str(uuid.uuid4().hex)[:4].upper()
-            self.order_number = f"DH-{date_str}-{random_str}"
+            from .numbering import next_order_number
+            self.order_number = next_order_number()
         super().save(*args, **kwargs)
 
     @property
     def total_items(self):
         """Total porsi dalam order"""
+        if hasattr(self, 'item_count'):
+            return self.item_count
         return sum(item.quantity for item in self.items.all())
 
+    def get_payment_status_display(self):
+        """Label status pembayaran dari anotasi with_summary()"""
+        from payments.models import Payment
+
+        return dict(Payment.STATUS_CHOICES).get(getattr(self, 'payment_status', None), '-')
+
     def calculate_total(self):
         """Hitung ulang total"""
         self.subtotal = sum(item.total_price for item in self.items.all())
@@ -77,6 +116,18 @@ class Order(models.Model):
         self.save()
 
 
+class OrderNumberSequence(models.Model):
+    """Nomor urut order terakhir yang sudah dialokasikan per hari (lihat orders.numbering)"""
+    day = models.DateField(primary_key=True)
+    last_value = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'order_number_sequences'
+
+    def __str__(self):
+        return f"{self.day}: {self.last_value}"
+
+
 class OrderItem(models.Model):
     """Item dalam pesanan"""
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
@@ -0,0 +1,87 @@
+"""
+Nomor order yang tidak bisa bentrok: DH-YYYYMMDD-NNNNN.
+
+NNNNN adalah nomor urut per hari dari tabel OrderNumberSequence. Agar
+baris sequence tidak menjadi titik antre setiap checkout, tiap proses
+mengambil satu blok nomor sekaligus (BLOCK_SIZE) lalu membagikannya dari
+memori; baris sequence hanya disentuh sekali per blok.
+
+Blok diambil di dalam transaksi yang sedang berjalan (mis. checkout).
+Sisa blok baru dipakai ulang setelah transaksi tersebut commit
+(transaction.on_commit). Jika transaksi di-rollback, pengambilan blok
+ikut batal di database dan sisa blok dibuang, sehingga nomor yang sama
+tidak mungkin dibagikan dua kali. Akibatnya nomor bisa berlompat (blok
+yang tidak habis saat proses restart), tetapi tidak pernah dobel.
+
+Nomor lama (4 karakter hex) tidak bisa bentrok dengan nomor baru yang
+minimal 5 digit.
+"""
+import threading
+from collections import deque
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OrderNumberSequence
+
+BLOCK_SIZE = 50
+PREFIX = 'DH'
+
+
+def format_order_number(day, value):
+    return f'{PREFIX}-{day:%Y%m%d}-{value:05d}'
+
+
+def allocate_block(day, size):
+    """
+    Cadangkan `size` nomor untuk `day` di database.
+
+    Returns:
+        range nomor yang dicadangkan
+    """
+    sequence = OrderNumberSequence.objects.filter(day=day)
+    with transaction.atomic():
+        # UPDATE mengunci baris sampai transaksi selesai; pengambil blok lain menunggu
+        if not sequence.update(last_value=F('last_value') + size):
+            OrderNumberSequence.objects.get_or_create(day=day)
+            sequence.update(last_value=F('last_value') + size)
+        last = sequence.values_list('last_value', flat=True).get()
+    return range(last - size + 1, last + 1)
+
+
+class OrderNumberAllocator:
+    """Pembagi nomor order per proses (thread-safe)"""
+
+    def __init__(self, block_size=BLOCK_SIZE):
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._blocks = {}  # day -> deque nomor yang sudah ter-commit
+
+    def next_value(self, day):
+        with self._lock:
+            pool = self._blocks.get(day)
+            if pool:
+                return pool.popleft()
+
+        numbers = allocate_block(day, self.block_size)
+        transaction.on_commit(lambda: self._release(day, numbers[1:]))
+        return numbers[0]
+
+    def _release(self, day, numbers):
+        with self._lock:
+            # Blok hari sebelumnya tidak akan dipakai lagi
+            for old_day in [key for key in self._blocks if key < day]:
+                del self._blocks[old_day]
+            self._blocks.setdefault(day, deque()).extend(numbers)
+
+    def next_order_number(self, day=None):
+        day = day or timezone.localdate()
+        return format_order_number(day, self.next_value(day))
+
+
+allocator = OrderNumberAllocator()
+
+
+def next_order_number():
+    return allocator.next_order_number()
@@ -0,0 +1,130 @@
+"""
+Pengurangan stok produk saat checkout.
+
+Semua produk dalam satu pesanan dikurangi dengan SATU statement UPDATE
+bersyarat:
+
+    UPDATE products_product SET stock = stock - CASE id WHEN 1 THEN 20 ... END, ...
+    WHERE (id = 1 AND stock >= 20) OR (id = 2 AND stock >= 15) ...
+
+Database sendiri yang memastikan stok tidak pernah negatif: jika jumlah
+baris yang ter-update kurang dari jumlah produk, ada produk yang stoknya
+tidak cukup: pengurangan dibatalkan (savepoint), InsufficientStock
+dilempar dan transaksi checkout ikut di-rollback.
+
+Status out_of_stock diubah di statement terpisah karena MySQL
+mengevaluasi assignment SET secara berurutan (CASE akan melihat stok yang
+sudah dikurangi), berbeda dengan SQLite/Postgres.
+
+Order yang dibatalkan (pembayaran kedaluwarsa) mengembalikan stoknya lewat
+release_order_stock, di transaksi yang sama dengan pembatalannya.
+"""
+from django.db import models, transaction
+from django.db.models import Case, F, Q, Sum, Value, When
+from django.utils import timezone
+
+from products.catalog import catalog_changed
+from products.models import Product
+
+from .models import OrderItem
+
+
+class InsufficientStock(Exception):
+    """Stok tidak cukup untuk satu atau lebih produk"""
+
+    def __init__(self, shortages):
+        # [(nama produk, stok tersedia, quantity diminta), ...]
+        self.shortages = shortages
+        super().__init__(', '.join(
+            f'{name} (sisa {available}, diminta {requested})'
+            for name, available, requested in shortages
+        ))
+
+
+def per_product(quantities):
+    """CASE id WHEN ... THEN quantity END untuk {product_id: quantity}"""
+    return Case(
+        *[When(pk=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()],
+        output_field=models.PositiveIntegerField(),
+    )
+
+
+def reserve_stock(quantities):
+    """
+    Kurangi stok sesuai `quantities` ({product_id: quantity}).
+
+    Harus dipanggil di dalam transaction.atomic() milik checkout.
+    Produk yang stoknya menjadi 0 otomatis berstatus out_of_stock
+    (sama seperti Product.save). Quantity < 1 ditolak dengan ValueError:
+    quantity negatif justru akan menambah stok (stock >= -n selalu benar).
+    """
+    invalid = [product_id for product_id, quantity in quantities.items() if quantity < 1]
+    if invalid:
+        raise ValueError(f'Quantity harus minimal 1 (produk {invalid})')
+    if not quantities:
+        return
+
+    condition = Q()
+    for product_id, quantity in quantities.items():
+        condition |= Q(pk=product_id, stock__gte=quantity)
+    with transaction.atomic():
+        updated = Product.objects.filter(condition).update(
+            stock=F('stock') - per_product(quantities),
+            updated_at=timezone.now(),
+        )
+        if updated != len(quantities):
+            # Batalkan pengurangan sebagian (savepoint) lalu cari produk yang kurang
+            transaction.set_rollback(True)
+        else:
+            Product.objects.filter(pk__in=quantities, stock=0).update(status='out_of_stock')
+
+    if updated != len(quantities):
+        rows = Product.objects.filter(pk__in=quantities).values_list('pk', 'name', 'stock')
+        found = {product_id: (name, stock) for product_id, name, stock in rows}
+        raise InsufficientStock([
+            (*found.get(product_id, (f'Produk {product_id}', 0)), quantity)
+            for product_id, quantity in quantities.items()
+            if found.get(product_id, (None, 0))[1] < quantity
+        ])
+
+    # Kartu produk/halaman katalog menampilkan stok & status
+    transaction.on_commit(lambda: catalog_changed(list(quantities)))
+
+
+def release_stock(quantities):
+    """
+    Kembalikan stok sesuai `quantities` ({product_id: quantity}).
+
+    Kebalikan reserve_stock: produk out_of_stock yang stoknya tadinya 0
+    kembali active. Produk yang sudah dihapus dilewati.
+    """
+    quantities = {product_id: quantity for product_id, quantity in quantities.items() if quantity}
+    if not quantities:
+        return
+
+    with transaction.atomic():
+        Product.objects.filter(pk__in=quantities).update(
+            stock=F('stock') + per_product(quantities),
+            updated_at=timezone.now(),
+        )
+        restocked = Q()
+        for product_id, quantity in quantities.items():
+            restocked |= Q(pk=product_id, stock=quantity)
+        Product.objects.filter(restocked, status='out_of_stock').update(status='active')
+
+    transaction.on_commit(lambda: catalog_changed(list(quantities)))
+
+
+def release_order_stock(order_ids):
+    """
+    Kembalikan stok semua item `order_ids`.
+
+    Panggil di transaksi yang sama dengan perubahan status order menjadi
+    cancelled, dan hanya untuk order yang sebelumnya belum cancelled.
+    """
+    quantities = (
+        OrderItem.objects.filter(order_id__in=order_ids, product__isnull=False)
+        .values('product_id').annotate(total=Sum('quantity')).order_by()
+        .values_list('product_id', 'total')
+    )
+    release_stock(dict(quantities))
@@ -1,3 +1,440 @@
-from django.test import TestCase
+import datetime
+import threading
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from backend.query_plan import QueryPlanAssertions
+from cart.models import Cart, CartItem
+from payments.fake_midtrans import FakeMidtrans
+from payments.gateway import reset_midtrans_client
+from payments.inbox import process_batch
+from payments.models import Payment, PaymentNotification
+from products.models import Category, Product
+from users.models import CustomUser
+
+from .models import Order, OrderItem
+from .numbering import OrderNumberAllocator
+from .stock import release_stock, reserve_stock
+from .views import ORDER_PAGE_SIZE
+
+
+def create_cart(user, products, quantity=10):
+    cart = Cart.objects.create(user=user)
+    CartItem.objects.bulk_create([
+        CartItem(cart=cart, product=product, quantity=quantity, price_per_portion=product.price)
+        for product in products
+    ])
+    return cart
+
+
+class CheckoutFromCartTest(TestCase):
+    """Checkout dari cart: satu transaksi, bulk insert item, stok berkurang"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Nasi')
+        cls.products = [
+            Product.objects.create(
+                category=cls.category, name=f'Menu {index}', description='-',
+                price=25000, stock=50,
+            )
+            for index in range(10)
+        ]
+
+    def checkout(self, username, product_total):
+        user = CustomUser.objects.create(username=username)
+        create_cart(user, self.products[:product_total])
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                reverse('checkout_from_cart'), {'delivery_date': '2030-01-01'}
+            )
+        self.assertEqual(response.status_code, 302)
+        return len(context.captured_queries)
+
+    def test_query_count_independent_of_item_count(self):
+        self.checkout('warmup', 1)  # baris sequence nomor order hari ini dibuat di sini
+        self.assertEqual(self.checkout('one', 1), self.checkout('ten', 10))
+
+    def test_confirm_page_query_count(self):
+        # Session, user, cart beranotasi, item beranotasi, counter badge (cache kosong)
+        self.enterContext(self.settings(CART_STORE='database'))
+        for product_total in (1, 10):
+            with self.subTest(items=product_total):
+                cache.clear()
+                user = CustomUser.objects.create(username=f'user{product_total}')
+                create_cart(user, self.products[:product_total])
+                self.client.force_login(user)
+                with self.assertNumQueries(5):
+                    response = self.client.get(reverse('checkout_from_cart'))
+                self.assertEqual(len(response.context['cart_items']), product_total)
+
+    def test_stock_decremented_and_cart_cleared(self):
+        self.checkout('buyer', 3)
+        order = Order.objects.get()
+        self.assertEqual(order.items.count(), 3)
+        self.assertEqual(order.subtotal, 3 * 10 * 25000)
+        self.assertEqual(order.payment.amount, order.total)
+        self.assertFalse(CartItem.objects.exists())
+        stocks = Product.objects.filter(pk__in=[p.pk for p in self.products[:3]])
+        self.assertEqual(set(stocks.values_list('stock', flat=True)), {40})
+
+    def test_insufficient_stock_rolls_back(self):
+        Product.objects.filter(pk=self.products[1].pk).update(stock=5)
+        self.checkout('buyer', 3)
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderItem.objects.exists())
+        self.assertEqual(CartItem.objects.count(), 3)
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).stock, 50)
+        self.assertEqual(Product.objects.get(pk=self.products[1].pk).stock, 5)
+
+    def test_last_portion_marks_out_of_stock(self):
+        Product.objects.filter(pk=self.products[0].pk).update(stock=10)
+        self.checkout('buyer', 1)
+        product = Product.objects.get(pk=self.products[0].pk)
+        self.assertEqual((product.stock, product.status), (0, 'out_of_stock'))
+
+    def test_user_without_cart_redirected_to_cart(self):
+        user = CustomUser.objects.create(username='baru')
+        self.client.force_login(user)
+        response = self.client.post(reverse('checkout_from_cart'), {'delivery_date': '2030-01-01'})
+        self.assertRedirects(response, reverse('cart'))
+        self.assertFalse(Order.objects.exists())
+
+
+class CheckoutDirectTest(TestCase):
+    """Checkout langsung: input tidak valid kembali ke form tanpa menyentuh stok"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Nasi')
+        cls.product = Product.objects.create(
+            category=category, name='Menu', description='-', price=25000, stock=50,
+        )
+        cls.user = CustomUser.objects.create(username='buyer')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def post(self, **data):
+        data.setdefault('delivery_date', '2030-01-01')
+        return self.client.post(reverse('checkout_direct', args=[self.product.pk]), data)
+
+    def test_valid_order(self):
+        response = self.post(quantity=20, price_per_portion=25000)
+        order = Order.objects.get()
+        self.assertRedirects(
+            response, reverse('payment_detail', args=[order.pk]), fetch_redirect_response=False
+        )
+        self.assertEqual(order.subtotal, 20 * 25000)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).stock, 30)
+
+    def test_discounted_tier_price_accepted(self):
+        Product.objects.filter(pk=self.product.pk).update(stock=500)
+        self.post(quantity=200, price_per_portion=15000)
+        item = OrderItem.objects.get()
+        self.assertEqual((item.product_price, item.quantity), (15000, 200))
+
+    def test_invalid_input_redirects_back(self):
+        cases = [
+            {'quantity': -5},
+            {'quantity': 0},
+            {'quantity': 'abc'},
+            {'quantity': ''},
+            {'quantity': 10, 'price_per_portion': 'abc'},
+            {'quantity': 10, 'price_per_portion': 'NaN'},
+            {'quantity': 10, 'price_per_portion': -1},
+            {'quantity': 10, 'price_per_portion': 1},
+            {'quantity': 10, 'price_per_portion': 24000},
+        ]
+        for data in cases:
+            with self.subTest(data=data):
+                response = self.post(**data)
+                self.assertRedirects(
+                    response, reverse('checkout', args=[self.product.pk]), fetch_redirect_response=False
+                )
+                self.assertFalse(Order.objects.exists())
+                self.assertEqual(Product.objects.get(pk=self.product.pk).stock, 50)
+
+    def test_reserve_stock_rejects_non_positive_quantity(self):
+        for quantity in (-5, 0):
+            with self.subTest(quantity=quantity), self.assertRaises(ValueError):
+                reserve_stock({self.product.pk: quantity})
+        self.assertEqual(Product.objects.get(pk=self.product.pk).stock, 50)
+
+
+class ReleaseStockTest(TestCase):
+    """Order yang dibatalkan mengembalikan stok tepat sekali"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Nasi')
+        cls.products = [
+            Product.objects.create(
+                category=category, name=f'Menu {index}', description='-', price=25000, stock=stock,
+            )
+            for index, stock in enumerate([10, 50])
+        ]
+        cls.user = CustomUser.objects.create(username='buyer')
+
+    def setUp(self):
+        create_cart(self.user, self.products)
+        self.client.force_login(self.user)
+        self.client.post(reverse('checkout_from_cart'), {'delivery_date': '2030-01-01'})
+        self.order = Order.objects.get()
+        self.payment = self.order.payment
+        Payment.objects.filter(pk=self.payment.pk).update(midtrans_order_id='ORDER-1')
+
+    def stocks(self):
+        return list(Product.objects.order_by('pk').values_list('stock', 'status'))
+
+    def expire(self, transaction_id):
+        PaymentNotification.objects.create(
+            order_id='ORDER-1', transaction_id=transaction_id, transaction_status='expire', payload={},
+        )
+        process_batch()
+
+    def test_expired_payment_releases_stock(self):
+        self.assertEqual(self.stocks(), [(0, 'out_of_stock'), (40, 'active')])
+        self.expire('trx-1')
+        self.assertEqual(Order.objects.get().status, 'cancelled')
+        self.assertEqual(self.stocks(), [(10, 'active'), (50, 'active')])
+
+        # Notifikasi expire lain untuk order yang sudah dibatalkan tidak mengembalikan lagi
+        self.expire('trx-2')
+        self.assertEqual(self.stocks(), [(10, 'active'), (50, 'active')])
+
+    def test_mark_as_expired_releases_stock(self):
+        self.payment.refresh_from_db()
+        self.payment.mark_as_expired()
+        self.payment.mark_as_expired()
+        self.assertEqual(self.stocks(), [(10, 'active'), (50, 'active')])
+
+    def test_release_keeps_manual_status(self):
+        Product.objects.filter(pk=self.products[1].pk).update(status='inactive')
+        release_stock({self.products[1].pk: 10})
+        self.assertEqual(self.stocks()[1], (50, 'inactive'))
+
+
+class ConcurrentCheckoutTest(TransactionTestCase):
+    """Banyak checkout bersamaan untuk produk yang sama tidak boleh oversell"""
+
+    BUYERS = 20
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('Butuh database test berupa file (lihat DATABASES di settings)')
+        # Snap token setelah commit dibuat di thread request ke stand-in lokal
+        fake = FakeMidtrans().start()
+        self.addCleanup(fake.stop)
+        self.enterContext(self.settings(
+            MIDTRANS_API_URL=fake.url, MIDTRANS_SNAP_URL=fake.snap_url, BACKGROUND_TASKS_SYNC=True,
+        ))
+        reset_midtrans_client()
+        self.addCleanup(reset_midtrans_client)
+
+    def test_no_oversell(self):
+        category = Category.objects.create(name='Nasi')
+        product = Product.objects.create(
+            category=category, name='Nasi Kuning', description='-', price=25000, stock=100,
+        )
+        clients = []
+        for index in range(self.BUYERS):
+            user = CustomUser.objects.create(username=f'buyer{index}')
+            create_cart(user, [product], quantity=10)
+            client = Client()
+            client.force_login(user)
+            clients.append(client)
+
+        barrier = threading.Barrier(self.BUYERS)
+        results, errors = [], []
+
+        def buy(client):
+            try:
+                barrier.wait()
+                response = client.post(
+                    reverse('checkout_from_cart'), {'delivery_date': '2030-01-01'}
+                )
+                results.append(response.url)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=buy, args=(client,)) for client in clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        product.refresh_from_db()
+        self.assertEqual((product.stock, product.status), (0, 'out_of_stock'))
+        self.assertEqual(Order.objects.count(), 10)
+        self.assertEqual(sum(OrderItem.objects.values_list('quantity', flat=True)), 100)
+        # Pembeli yang kehabisan kembali ke cart dengan isi cart utuh
+        self.assertEqual(results.count(reverse('cart')), 10)
+        self.assertEqual(CartItem.objects.count(), 10)
+        self.assertEqual(Payment.objects.exclude(midtrans_snap_token=None).count(), 10)
+
+
+class OrderNumberTest(TestCase):
+    """Nomor order dari sequence per hari, dibagikan per blok"""
+
+    day = datetime.date(2030, 1, 1)
+
+    def test_format(self):
+        order = Order.objects.create(
+            customer_name='Budi', customer_phone='-', customer_email='budi@example.com',
+            delivery_address='-', delivery_date='2030-01-02',
+        )
+        self.assertRegex(order.order_number, r'^DH-\d{8}-\d{5,}$')
+
+    def test_block_reused_after_commit(self):
+        allocator = OrderNumberAllocator(block_size=3)
+        with self.captureOnCommitCallbacks(execute=True):
+            first = allocator.next_order_number(self.day)
+        with CaptureQueriesContext(connection) as context:
+            numbers = [allocator.next_order_number(self.day) for _ in range(2)]
+        self.assertEqual(len(context.captured_queries), 0)
+        self.assertEqual([first] + numbers, [f'DH-20300101-0000{value}' for value in (1, 2, 3)])
+
+    def test_rolled_back_block_is_not_reused(self):
+        first, second = OrderNumberAllocator(block_size=5), OrderNumberAllocator(block_size=5)
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    first.next_order_number(self.day)
+                    raise ValueError
+            except ValueError:
+                pass
+        # Blok 1-5 batal di database, jadi allocator lain boleh mengambilnya
+        with self.captureOnCommitCallbacks(execute=True):
+            numbers = [second.next_order_number(self.day) for _ in range(5)]
+            numbers += [first.next_order_number(self.day) for _ in range(5)]
+        self.assertEqual(len(set(numbers)), 10)
+
+
+class ConcurrentOrderNumberTest(TransactionTestCase):
+    """Banyak thread/allocator bersamaan tidak pernah menghasilkan nomor yang sama"""
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('Butuh database test berupa file (lihat DATABASES di settings)')
+
+    def test_unique_under_concurrency(self):
+        allocators = [OrderNumberAllocator(block_size=7) for _ in range(3)]
+        results, errors = [], []
+        barrier = threading.Barrier(8)
+
+        def work(index):
+            try:
+                barrier.wait()
+                for _ in range(300):
+                    results.append(allocators[index % 3].next_order_number())
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=work, args=(index,)) for index in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(results), 2400)
+        self.assertEqual(len(set(results)), 2400)
+
+
+class OrderListTest(TestCase):
+    """Daftar pesanan: satu query beranotasi per halaman, keyset pagination"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(username='pelanggan')
+        category = Category.objects.create(name='Nasi')
+        cls.product = Product.objects.create(
+            category=category, name='Nasi Kuning', description='-', price=25000, stock=50,
+        )
+
+    def create_orders(self, total):
+        for _ in range(total):
+            order = Order.objects.create(
+                user=self.user, customer_name='Budi', customer_phone='-',
+                customer_email='budi@example.com', delivery_address='-',
+                delivery_date='2030-01-02',
+            )
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=self.product, product_name='Nasi Kuning',
+                          product_price=25000, quantity=quantity)
+                for quantity in (10, 15)
+            ])
+            Payment.objects.create(order=order, amount=0, status='success')
+
+    def list_queries(self, **params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('order_list'), params)
+        self.assertEqual(response.status_code, 200)
+        return response, len(context.captured_queries)
+
+    def test_query_count_independent_of_order_count(self):
+        self.client.force_login(self.user)
+        self.create_orders(2)
+        _, few = self.list_queries()
+        self.create_orders(10)
+        response, many = self.list_queries()
+        self.assertEqual(few, many)
+        self.assertContains(response, '25 porsi')
+        self.assertContains(response, 'Berhasil')
+
+    def test_cursor_pagination(self):
+        self.client.force_login(self.user)
+        self.create_orders(ORDER_PAGE_SIZE + 3)
+        first, _ = self.list_queries()
+        page = first.context['page']
+        self.assertEqual(len(page), ORDER_PAGE_SIZE)
+        second, _ = self.list_queries(cursor=page.next_cursor)
+        self.assertEqual(len(second.context['page']), 3)
+        self.assertFalse(second.context['page'].has_next)
+        seen = {order.pk for order in page} | {order.pk for order in second.context['page']}
+        self.assertEqual(len(seen), ORDER_PAGE_SIZE + 3)
+
+
+class OrderQueryPlanTest(QueryPlanAssertions, TestCase):
+    """Riwayat pesanan dan filter admin memakai index, bukan full scan"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(username='pelanggan')
+        cls.admin = CustomUser.objects.create_superuser(
+            username='admin', email='admin@example.com', password='password'
+        )
+        for _ in range(3):
+            order = Order.objects.create(
+                user=cls.user, customer_name='Budi', customer_phone='-',
+                customer_email='budi@example.com', delivery_address='-',
+                delivery_date='2030-01-02',
+            )
+            Payment.objects.create(order=order, amount=100000)
+
+    def test_order_list(self):
+        self.client.force_login(self.user)
+        with self.assertNoFullScans():
+            self.client.get(reverse('order_list'))
+
+    def test_admin_status_filter(self):
+        self.client.force_login(self.admin)
+        url = reverse('admin:orders_order_changelist')
+        with self.assertNoFullScans() as queries:
+            response = self.client.get(url, {
+                'status__exact': 'pending',
+                'delivery_date__gte': '2030-01-01', 'delivery_date__lt': '2030-01-08',
+            })
+        self.assertContains(response, 'Budi')
+        self.assertTrue(queries)
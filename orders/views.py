@@ -2,21 +2,39 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db import transaction
 from django.utils import timezone
 from .models import Order, OrderItem
+from .stock import InsufficientStock, reserve_stock
 from cart.models import Cart
+from cart.store import CartBusy, CartOperationError, get_cart_store, parse_order_input
 from payments.models import Payment
+from payments.tokens import prepare_snap_token
+from backend.tasks import run_in_background
 from products.models import Product
+from backend.pagination import paginate_keyset
 from datetime import datetime, timedelta
 
+ORDER_PAGE_SIZE = 20
+ORDER_LIST_ORDERING = ['-created_at', '-id']
+
 @login_required
 def checkout_from_cart(request):
     """
     ✅ CHECKOUT DARI CART - LANGSUNG KONFIRMASI (TANPA FORM PANJANG)
     """
-    cart = get_object_or_404(Cart, user=request.user)
+    # Keranjang aktif bisa masih di cache (write-behind), simpan dulu ke DB
+    try:
+        get_cart_store().flush(request.user.pk)
+    except CartBusy:
+        messages.error(request, 'Keranjang sedang diperbarui, silakan coba lagi.')
+        return redirect('cart')
+    # Total & item dari dua query beranotasi, tanpa query per item. User yang
+    # belum pernah menambah item tidak punya baris Cart (cart_view tidak membuatnya)
+    cart = Cart.objects.with_totals().filter(user=request.user).first()
+    cart_items = list(cart.items.with_totals()) if cart else []
     
-    if not cart.items.exists():
+    if not cart_items:
         messages.warning(request, 'Keranjang belanja kosong')
         return redirect('cart')
     
@@ -26,48 +44,68 @@ def checkout_from_cart(request):
         delivery_method = request.POST.get('delivery_method', 'delivery')
         notes = request.POST.get('notes', '')
         
-        # Hitung total
-        subtotal = cart.subtotal
         delivery_fee = 15000 if delivery_method == 'delivery' else 0
-        total = subtotal + delivery_fee
-        
-        # Buat order (ambil data dari user profile)
-        order = Order.objects.create(
-            user=request.user,
-            customer_name=request.user.get_full_name() or request.user.username,
-            customer_phone=request.user.phone_number or '-',
-            customer_email=request.user.email,
-            delivery_method=delivery_method,
-            delivery_address=request.user.address or '-',
-            delivery_location=f"{request.user.city}, {request.user.postal_code}" if request.user.city else 'Makassar',
-            delivery_date=delivery_date,
-            delivery_time='10:00',
-            subtotal=subtotal,
-            delivery_fee=delivery_fee,
-            total=total,
-            notes=notes,
-        )
         
-        # Buat order items
-        for cart_item in cart.items.all():
-            OrderItem.objects.create(
-                order=order,
-                product=cart_item.product,
-                product_name=cart_item.product.name,
-                product_price=cart_item.price_per_portion,
-                quantity=cart_item.quantity,
-                notes=cart_item.notes
-            )
+        try:
+            # Stok, order, item, payment dan pengosongan cart: semua atau tidak sama sekali
+            with transaction.atomic():
+                # Kunci cart: double submit menunggu, lalu mendapati cart sudah kosong
+                Cart.objects.select_for_update().filter(pk=cart.pk).exists()
+                cart_items = list(cart.items.with_totals())
+                if not cart_items:
+                    messages.warning(request, 'Keranjang belanja kosong')
+                    return redirect('order_list')
+                
+                reserve_stock({item.product_id: item.quantity for item in cart_items})
+                
+                subtotal = sum(item.line_total for item in cart_items)
+                total = subtotal + delivery_fee
+                
+                # Buat order (ambil data dari user profile)
+                order = Order.objects.create(
+                    user=request.user,
+                    customer_name=request.user.get_full_name() or request.user.username,
+                    customer_phone=request.user.phone_number or '-',
+                    customer_email=request.user.email,
+                    delivery_method=delivery_method,
+                    delivery_address=request.user.address or '-',
+                    delivery_location=f"{request.user.city}, {request.user.postal_code}" if request.user.city else 'Makassar',
+                    delivery_date=delivery_date,
+                    delivery_time='10:00',
+                    subtotal=subtotal,
+                    delivery_fee=delivery_fee,
+                    total=total,
+                    notes=notes,
+                )
+                
+                # Order items: satu INSERT untuk semua item
+                OrderItem.objects.bulk_create([
+                    OrderItem(
+                        order=order,
+                        product=cart_item.product,
+                        product_name=cart_item.product.name,
+                        product_price=cart_item.unit_price,
+                        quantity=cart_item.quantity,
+                        notes=cart_item.notes
+                    )
+                    for cart_item in cart_items
+                ])
+                
+                # Buat payment; Snap token disiapkan di background setelah commit
+                payment = Payment.objects.create(
+                    order=order,
+                    payment_method='pending',
+                    amount=total,
+                )
+                run_in_background(prepare_snap_token, payment.pk)
+                
+                # Kosongkan cart
+                cart.clear()
+        except InsufficientStock as e:
+            messages.error(request, f'Stok tidak mencukupi: {e}')
+            return redirect('cart')
         
-        # Buat payment
-        Payment.objects.create(
-            order=order,
-            payment_method='pending',
-            amount=total,
-        )
-        
-        # Kosongkan cart
-        cart.clear()
+        get_cart_store().discard(request.user.pk)
         
         messages.success(request, f'🎉 Pesanan berhasil dibuat! Order: {order.order_number}')
         
@@ -79,7 +117,7 @@ def checkout_from_cart(request):
     
     context = {
         'cart': cart,
-        'cart_items': cart.items.all(),
+        'cart_items': cart_items,
         'min_date': min_date,
         'user': request.user,
     }
@@ -92,8 +130,13 @@ def checkout_direct(request, product_id):
     product = get_object_or_404(Product, id=product_id)
     
     if request.method == 'POST':
-        quantity = int(request.POST.get('quantity', 10))
-        price_per_portion = float(request.POST.get('price_per_portion', product.price))
+        # Validasi sebelum transaksi: input tidak valid kembali ke form, bukan 500.
+        # Harga harus salah satu tingkat harga produk, bukan angka bebas dari client
+        try:
+            quantity, price_per_portion = parse_order_input(request.POST, product)
+        except CartOperationError as e:
+            messages.error(request, str(e))
+            return redirect('checkout', product_id=product.id)
         customer_name = request.POST.get('customer_name', request.user.get_full_name())
         customer_phone = request.POST.get('customer_phone', request.user.phone_number)
         customer_email = request.POST.get('customer_email', request.user.email)
@@ -106,35 +149,43 @@ def checkout_direct(request, product_id):
         delivery_fee = 15000
         total = subtotal + delivery_fee
         
-        order = Order.objects.create(
-            user=request.user,
-            customer_name=customer_name,
-            customer_phone=customer_phone,
-            customer_email=customer_email,
-            delivery_method='delivery',
-            delivery_address=delivery_address,
-            delivery_location=delivery_location,
-            delivery_date=delivery_date,
-            delivery_time='10:00',
-            subtotal=subtotal,
-            delivery_fee=delivery_fee,
-            total=total,
-            notes=notes,
-        )
+        try:
+            with transaction.atomic():
+                reserve_stock({product.id: quantity})
+                
+                order = Order.objects.create(
+                    user=request.user,
+                    customer_name=customer_name,
+                    customer_phone=customer_phone,
+                    customer_email=customer_email,
+                    delivery_method='delivery',
+                    delivery_address=delivery_address,
+                    delivery_location=delivery_location,
+                    delivery_date=delivery_date,
+                    delivery_time='10:00',
+                    subtotal=subtotal,
+                    delivery_fee=delivery_fee,
+                    total=total,
+                    notes=notes,
+                )
         
-        OrderItem.objects.create(
-            order=order,
-            product=product,
-            product_name=product.name,
-            product_price=price_per_portion,
-            quantity=quantity,
-        )
+                OrderItem.objects.create(
+                    order=order,
+                    product=product,
+                    product_name=product.name,
+                    product_price=price_per_portion,
+                    quantity=quantity,
+                )
         
-        Payment.objects.create(
-            order=order,
-            payment_method='pending',
-            amount=total,
-        )
+                payment = Payment.objects.create(
+                    order=order,
+                    payment_method='pending',
+                    amount=total,
+                )
+                run_in_background(prepare_snap_token, payment.pk)
+        except InsufficientStock as e:
+            messages.error(request, f'Stok tidak mencukupi: {e}')
+            return redirect('checkout', product_id=product.id)
         
         messages.success(request, f'Pesanan berhasil! Order: {order.order_number}')
         return redirect('payment_detail', order_id=order.id)
@@ -144,11 +195,18 @@ def checkout_direct(request, product_id):
 
 @login_required
 def order_list(request):
-    """Daftar pesanan"""
-    orders = Order.objects.filter(user=request.user).order_by('-created_at')
+    """
+    Daftar pesanan, terbaru dulu.
+
+    Satu query beranotasi per halaman (item_count, payment_status);
+    halaman berikutnya lewat ?cursor= (keyset created_at, id).
+    """
+    orders = Order.objects.filter(user=request.user).with_summary()
+    page = paginate_keyset(orders, ORDER_LIST_ORDERING, request.GET.get('cursor'), ORDER_PAGE_SIZE)
     
     context = {
-        'orders': orders,
+        'orders': page.items,
+        'page': page,
     }
     return render(request, 'orders/order_list.html', context)
 
@@ -1,12 +1,24 @@
 from django.contrib import admin
-from .models import Payment
+from .models import Payment, PaymentNotification
 
 @admin.register(Payment)
 class PaymentAdmin(admin.ModelAdmin):
     list_display = ('id', 'get_order_number', 'payment_method', 'amount', 'status', 'payment_date')
     list_filter = ('status', 'payment_method')
+    # Tanpa COUNT(*) seluruh tabel di setiap halaman yang difilter
+    show_full_result_count = False
     search_fields = ('order__order_number', 'transaction_id')
     
     def get_order_number(self, obj):
         return obj.order.order_number if obj.order else '-'
-    get_order_number.short_description = 'Order Number'
\ No newline at end of file
+    get_order_number.short_description = 'Order Number'
+
+
+@admin.register(PaymentNotification)
+class PaymentNotificationAdmin(admin.ModelAdmin):
+    list_display = ('order_id', 'transaction_status', 'received_at', 'processed_at', 'result')
+    list_filter = ('result', 'transaction_status')
+    search_fields = ('order_id', 'transaction_id')
+    show_full_result_count = False
+    readonly_fields = ('order_id', 'transaction_id', 'transaction_status', 'payload',
+                       'received_at', 'processed_at', 'result')
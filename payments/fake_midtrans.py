@@ -0,0 +1,139 @@
+"""
+Stand-in HTTP lokal untuk API Midtrans (test & benchmark, bukan produksi).
+
+Melayani endpoint yang dipakai aplikasi ini:
+
+- POST /snap/v1/transactions      -> {"token", "redirect_url"}
+- GET  /v2/<order_id>/status      -> status dari `transactions`
+
+Latensi dan kegagalan bisa disuntikkan lewat `delay` dan `fail_next()`.
+Server mencatat jumlah request dan koneksi TCP (port client) sehingga
+pemakaian ulang koneksi keep-alive bisa diperiksa.
+
+    with FakeMidtrans() as fake:
+        client = MidtransClient(core_url=fake.url, snap_url=fake.snap_url)
+"""
+import json
+import multiprocessing
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STATUS_PATH = re.compile(r'^/v2/(?P<order_id>[^/]+)/status$')
+
+
+class FakeMidtransHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    # Header dan body dikirim terpisah; tanpa TCP_NODELAY delayed ACK menambah ~40ms
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def handle_request(self):
+        fake = self.server.fake
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        failure = fake.begin_request(self.client_address[1])
+        if fake.delay:
+            time.sleep(fake.delay)
+        if failure:
+            self.send_json(failure, {'status_code': str(failure), 'status_message': 'Injected failure'})
+            return
+
+        match = STATUS_PATH.match(self.path.split('?')[0])
+        if self.command == 'GET' and match:
+            order_id = match['order_id']
+            status = fake.transactions.get(order_id)
+            if status is None:
+                self.send_json(200, {'status_code': '404', 'status_message': "Transaction doesn't exist."})
+            else:
+                self.send_json(200, {
+                    'status_code': '200', 'order_id': order_id,
+                    'transaction_id': f'trx-{order_id}', 'transaction_status': status,
+                    'fraud_status': 'accept', 'payment_type': 'qris',
+                })
+        elif self.command == 'POST' and self.path == '/snap/v1/transactions':
+            order_id = json.loads(body or b'{}').get('transaction_details', {}).get('order_id')
+            fake.transactions.setdefault(order_id, 'pending')
+            token = uuid.uuid4().hex
+            self.send_json(201, {'token': token, 'redirect_url': f'{fake.url}/snap/v2/vtweb/{token}'})
+        else:
+            self.send_json(404, {'status_code': '404', 'status_message': 'Not found'})
+
+    do_GET = handle_request
+    do_POST = handle_request
+
+
+class FakeMidtransServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Client yang sudah timeout menutup koneksi lebih dulu: wajar di sini
+        pass
+
+
+class FakeMidtrans:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.transactions = {}  # order_id -> transaction_status
+        self.requests = 0
+        self.connections = set()
+        self._failures = []
+        self._process = None
+        self._lock = threading.Lock()
+        self.server = FakeMidtransServer(('127.0.0.1', 0), FakeMidtransHandler)
+        self.server.fake = self
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+        self.snap_url = f'{self.url}/snap/v1'
+
+    def fail_next(self, count=1, status=503):
+        """`count` request berikutnya dijawab dengan HTTP `status`"""
+        with self._lock:
+            self._failures.extend([status] * count)
+
+    def begin_request(self, client_port):
+        with self._lock:
+            self.requests += 1
+            self.connections.add(client_port)
+            return self._failures.pop(0) if self._failures else None
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def start_process(self):
+        """
+        Jalankan server di proses terpisah (fork) untuk benchmark, agar tidak
+        berebut GIL dengan client yang diukur. `transactions` disalin saat
+        fork; perubahan dan counter setelahnya tidak terlihat di sini.
+        """
+        self._process = multiprocessing.get_context('fork').Process(
+            target=self.server.serve_forever, daemon=True,
+        )
+        self._process.start()
+        return self
+
+    def stop(self):
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+        else:
+            self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
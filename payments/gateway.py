@@ -0,0 +1,242 @@
+"""
+Client Midtrans bersama untuk satu proses.
+
+midtransclient memanggil `requests.request` langsung: koneksi (dan TLS
+handshake) baru di setiap panggilan dan tanpa timeout. Modul ini memasang
+transport sendiri ke Snap/CoreApi:
+
+- satu requests.Session dengan pool koneksi keep-alive (MIDTRANS_POOL_SIZE);
+- timeout connect/read (MIDTRANS_CONNECT_TIMEOUT / MIDTRANS_READ_TIMEOUT);
+- retry terbatas (MIDTRANS_MAX_RETRIES) dengan backoff + full jitter.
+  GET (cek status) diulang untuk timeout, koneksi putus, 429 dan 5xx.
+  POST (membuat transaksi) hanya diulang jika koneksi belum terbentuk
+  (connect timeout atau koneksi ditolak), karena request yang sudah
+  terkirim bisa saja sudah diproses Midtrans;
+- circuit breaker: setelah MIDTRANS_BREAKER_THRESHOLD panggilan gagal
+  berturut-turut, panggilan berikutnya langsung GatewayUnavailable selama
+  MIDTRANS_BREAKER_RESET detik, lalu satu panggilan percobaan dibiarkan
+  lewat (half-open).
+
+Dipakai lewat get_midtrans_client() (MidtransService memakainya).
+"""
+import random
+import threading
+import time
+
+import midtransclient
+import requests
+from django.conf import settings
+from urllib3.exceptions import NewConnectionError
+from midtransclient.config import ApiConfig
+from midtransclient.http_client import HttpClient
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+BACKOFF_BASE = 0.2  # detik
+BACKOFF_CAP = 2.0
+
+
+class GatewayUnavailable(Exception):
+    """Midtrans tidak bisa dihubungi (timeout, koneksi gagal, atau circuit breaker terbuka)"""
+
+
+def not_sent(error):
+    """True jika koneksi belum terbentuk sehingga request pasti belum terkirim"""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    if isinstance(error, requests.ConnectionError) and error.args:
+        # requests membungkus NewConnectionError (ditolak / DNS gagal) dalam MaxRetryError
+        reason = getattr(error.args[0], 'reason', error.args[0])
+        return isinstance(reason, NewConnectionError)
+    return False
+
+
+def backoff_limit(attempt):
+    """Jeda maksimum sebelum percobaan ke-`attempt` + 1"""
+    return min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt)
+
+
+class CircuitBreaker:
+    """Circuit breaker sederhana (closed -> open -> half-open), thread-safe"""
+
+    def __init__(self, threshold, reset_timeout, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def before_call(self):
+        with self._lock:
+            state = self.state
+            if state == 'open' or (state == 'half-open' and self._trial_running):
+                raise GatewayUnavailable('Midtrans sedang tidak tersedia (circuit breaker terbuka)')
+            if state == 'half-open':
+                self._trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.threshold:
+                self.opened_at = self.clock()
+            self._trial_running = False
+
+
+class ResilientSession:
+    """
+    Pengganti modul `requests` di midtransclient.HttpClient.
+
+    HttpClient hanya memanggil `.request(method, url, **kwargs)`, jadi
+    timeout, retry dan circuit breaker dipasang di sini.
+    """
+
+    def __init__(self, connect_timeout, read_timeout, max_retries, pool_size, breaker):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.breaker = breaker
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def backoff(self, attempt):
+        time.sleep(random.uniform(0, backoff_limit(attempt)))
+
+    def request(self, method, url, **kwargs):
+        self.breaker.before_call()
+        idempotent = method.lower() == 'get'
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except requests.RequestException as e:
+                if not idempotent and not not_sent(e):
+                    self.breaker.record_failure()
+                    raise GatewayUnavailable(f'Midtrans tidak merespons: {e}') from e
+                error = e
+            else:
+                if response.status_code not in RETRY_STATUS_CODES:
+                    self.breaker.record_success()
+                    return response
+                if not idempotent or last_attempt:
+                    # 5xx tetap dikembalikan; HttpClient mengubahnya menjadi MidtransAPIError
+                    self.breaker.record_failure()
+                    return response
+                response.close()
+                error = None
+
+            if last_attempt:
+                self.breaker.record_failure()
+                raise GatewayUnavailable(f'Midtrans tidak merespons: {error}') from error
+            self.backoff(attempt)
+
+    def close(self):
+        self.session.close()
+
+
+class GatewayConfig(ApiConfig):
+    """ApiConfig dengan base URL yang bisa diganti (proxy / stand-in lokal)"""
+
+    def __init__(self, core_url='', snap_url='', **kwargs):
+        super().__init__(**kwargs)
+        self.core_url = core_url.rstrip('/')
+        self.snap_url = snap_url.rstrip('/')
+
+    def get_core_api_base_url(self):
+        return self.core_url or super().get_core_api_base_url()
+
+    def get_snap_base_url(self):
+        return self.snap_url or super().get_snap_base_url()
+
+
+class MidtransClient:
+    """Snap + CoreApi yang berbagi satu ResilientSession"""
+
+    def __init__(self, *, server_key=None, client_key=None, is_production=None,
+                 core_url=None, snap_url=None, connect_timeout=None, read_timeout=None,
+                 max_retries=None, pool_size=None, breaker_threshold=None, breaker_reset=None):
+        def setting(value, name):
+            return getattr(settings, name) if value is None else value
+
+        self.breaker = CircuitBreaker(
+            setting(breaker_threshold, 'MIDTRANS_BREAKER_THRESHOLD'),
+            setting(breaker_reset, 'MIDTRANS_BREAKER_RESET'),
+        )
+        self.transport = ResilientSession(
+            connect_timeout=setting(connect_timeout, 'MIDTRANS_CONNECT_TIMEOUT'),
+            read_timeout=setting(read_timeout, 'MIDTRANS_READ_TIMEOUT'),
+            max_retries=setting(max_retries, 'MIDTRANS_MAX_RETRIES'),
+            pool_size=setting(pool_size, 'MIDTRANS_POOL_SIZE'),
+            breaker=self.breaker,
+        )
+        http_client = HttpClient()
+        http_client.http_client = self.transport
+
+        config = {
+            'is_production': setting(is_production, 'MIDTRANS_IS_PRODUCTION'),
+            'server_key': setting(server_key, 'MIDTRANS_SERVER_KEY'),
+            'client_key': setting(client_key, 'MIDTRANS_CLIENT_KEY'),
+            'core_url': setting(core_url, 'MIDTRANS_API_URL'),
+            'snap_url': setting(snap_url, 'MIDTRANS_SNAP_URL'),
+        }
+        self.snap = midtransclient.Snap()
+        self.core = midtransclient.CoreApi()
+        for api in (self.snap, self.core):
+            api.api_config = GatewayConfig(**config)
+            api.http_client = http_client
+
+    def close(self):
+        self.transport.close()
+
+
+def call_timeout():
+    """
+    Batas atas (detik) satu panggilan ke Midtrans.
+
+    Setiap percobaan (GET diulang juga untuk read timeout) bisa memakan
+    connect + read timeout, ditambah backoff maksimum di antara percobaan.
+    Dipakai sebagai TTL lock coalescing dan batas tunggu di tokens/status.
+    """
+    retries = settings.MIDTRANS_MAX_RETRIES
+    attempt_timeout = settings.MIDTRANS_CONNECT_TIMEOUT + settings.MIDTRANS_READ_TIMEOUT
+    backoff = sum(backoff_limit(attempt) for attempt in range(retries))
+    return int(attempt_timeout * (retries + 1) + backoff) + 1
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_midtrans_client():
+    """MidtransClient milik proses ini (dibuat sekali, dipakai semua request)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MidtransClient()
+    return _client
+
+
+def reset_midtrans_client():
+    """Buang client bersama (mis. setelah setting MIDTRANS_* berubah di test)"""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
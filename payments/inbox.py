@@ -0,0 +1,257 @@
+"""
+Pemrosesan inbox notifikasi Midtrans (PaymentNotification).
+
+Webhook hanya memanggil enqueue_notification (satu INSERT) lalu menjawab
+200, sehingga Midtrans tidak menunggu update Payment/Order. Worker
+(`manage.py process_payment_notifications`) memanggil process_batch:
+
+- notifikasi diambil berurutan (received_at, id) per batch;
+- retry Midtrans dengan (transaction_id, transaction_status) yang sudah
+  pernah diproses ditandai `duplicate` dan tidak diterapkan ulang;
+- transisi diterapkan sesuai urutan masuk di memori, lalu disimpan
+  sekaligus: bulk_update kolom per baris Payment, satu UPDATE per
+  kelompok status Payment dan per status Order tujuan;
+- notifikasi yang datang terlambat (mis. `pending` setelah `settlement`)
+  tidak memundurkan status, ditandai `stale`;
+- order yang dibatalkan (pembayaran kedaluwarsa) mengembalikan stoknya
+  di transaksi yang sama (orders.stock.release_order_stock);
+- notifikasi untuk order ID lama (token Snap yang sudah diganti, lihat
+  PaymentOrderAlias) diarahkan ke Payment-nya; hanya pembayaran berhasil
+  yang diterapkan, status lain dari transaksi lama ditandai `stale`;
+- Payment `verifying` (bukti transfer manual menunggu admin) hanya
+  berubah status jika pembayaran Midtrans berhasil; notifikasi lain cukup
+  memperbarui kolom midtrans_* (`ignored`), order tidak dibatalkan.
+
+Jalankan satu worker saja agar urutan per transaksi terjaga; di
+PostgreSQL/MySQL batch dikunci dengan SKIP LOCKED sehingga worker yang
+tidak sengaja berjalan ganda tidak memproses notifikasi yang sama dua kali.
+"""
+from dataclasses import dataclass, field
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from orders.models import Order
+from orders.stock import release_order_stock
+
+from .models import Payment, PaymentNotification, PaymentOrderAlias
+
+# transaction_status Midtrans -> Payment.status (capture hanya jika fraud_status accept)
+STATUS_TRANSITIONS = {
+    'capture': 'success',
+    'settlement': 'success',
+    'pending': 'pending',
+    'deny': 'failed',
+    'cancel': 'failed',
+    'expire': 'expired',
+}
+# Status akhir tidak boleh kembali ke pending karena notifikasi yang terlambat
+FINAL_STATUSES = {'success', 'failed', 'expired', 'refunded'}
+# Payment.status -> Order.status (sama seperti mark_as_success / mark_as_expired)
+ORDER_TRANSITIONS = {'success': 'paid', 'expired': 'cancelled'}
+
+# Kolom yang nilainya berbeda per payment (bulk_update: CASE per baris)
+PAYMENT_ROW_FIELDS = ['midtrans_transaction_id', 'midtrans_response']
+# Kolom yang nilainya sama untuk banyak payment sekaligus (status tujuan,
+# jenis pembayaran): satu UPDATE ... WHERE id IN per kelompok, jauh lebih
+# murah daripada CASE per baris
+PAYMENT_SHARED_FIELDS = [
+    'status', 'midtrans_transaction_status', 'midtrans_payment_type', 'verified_at',
+    'verified_by_id', 'admin_notes',
+]
+
+
+@dataclass
+class BatchResult:
+    processed: int = 0
+    results: dict = field(default_factory=dict)  # result -> jumlah
+    max_lag: float = 0.0  # detik dari diterima sampai diproses
+
+    def count(self, result):
+        self.results[result] = self.results.get(result, 0) + 1
+
+
+def enqueue_notification(payload):
+    """Simpan notifikasi mentah ke inbox (dipanggil webhook)"""
+    return PaymentNotification.objects.create(
+        order_id=str(payload.get('order_id') or ''),
+        transaction_id=str(payload.get('transaction_id') or ''),
+        transaction_status=str(payload.get('transaction_status') or ''),
+        payload=payload,
+    )
+
+
+def pending_notifications():
+    return PaymentNotification.objects.filter(processed_at__isnull=True).order_by('received_at', 'id')
+
+
+def inbox_stats():
+    """Jumlah notifikasi yang belum diproses dan umur yang tertua (detik)"""
+    pending = pending_notifications()
+    oldest = pending.values_list('received_at', flat=True).first()
+    return {
+        'backlog': pending.count(),
+        'oldest_age': (timezone.now() - oldest).total_seconds() if oldest else 0.0,
+    }
+
+
+def target_status(notification):
+    status = STATUS_TRANSITIONS.get(notification.transaction_status)
+    if notification.transaction_status == 'capture':
+        if notification.payload.get('fraud_status', 'accept') != 'accept':
+            return None
+    return status
+
+
+def lock_payments(order_ids):
+    """
+    Payment (SELECT ... FOR UPDATE) untuk order ID Midtrans, termasuk order
+    ID lama dari PaymentOrderAlias.
+
+    Returns:
+        {order_id: (payment, superseded)}; superseded=True untuk order ID lama
+    """
+    aliases = dict(
+        PaymentOrderAlias.objects.filter(midtrans_order_id__in=order_ids)
+        .values_list('midtrans_order_id', 'payment_id')
+    )
+    payments = {
+        payment.pk: payment
+        for payment in Payment.objects.select_for_update().filter(
+            Q(midtrans_order_id__in=order_ids) | Q(pk__in=aliases.values())
+        )
+    }
+    resolved = {payment.midtrans_order_id: (payment, False) for payment in payments.values()}
+    for order_id, payment_id in aliases.items():
+        if payment_id in payments:
+            resolved[order_id] = (payments[payment_id], True)
+    return resolved
+
+
+def apply_notification(payment, notification, now):
+    """
+    Terapkan satu notifikasi ke `payment` (di memori).
+
+    Returns:
+        (result, status Order tujuan atau None)
+    """
+    status = target_status(notification)
+    if status == 'pending' and payment.status in FINAL_STATUSES:
+        return 'stale', None
+
+    payload = notification.payload
+    payment.midtrans_transaction_id = notification.transaction_id
+    payment.midtrans_transaction_status = notification.transaction_status
+    payment.midtrans_payment_type = payload.get('payment_type')
+    payment.midtrans_response = payload
+    payment.updated_at = now
+    if status is None:
+        return 'ignored', None
+    if payment.status == 'verifying' and status != 'success':
+        # Bukti transfer manual menunggu verifikasi admin: transaksi Snap yang
+        # kedaluwarsa/gagal/pending tidak boleh membatalkan order ini
+        return 'ignored', None
+
+    payment.status = status
+    if status == 'success':
+        payment.verified_at = now
+        payment.verified_by = None
+    elif status == 'failed':
+        payment.admin_notes = f'Transaction {notification.transaction_status}'
+    return 'applied', ORDER_TRANSITIONS.get(status)
+
+
+def apply_notifications(notifications, now):
+    """
+    Terapkan `notifications` (urut waktu masuk) ke Payment/Order sekaligus.
+
+    Harus dipanggil di dalam transaction.atomic(). Setiap notifikasi diberi
+    `result` dan `processed_at`, tetapi tidak disimpan di sini.
+
+    Returns:
+        BatchResult
+    """
+    outcome = BatchResult()
+    keys = {(n.transaction_id, n.transaction_status) for n in notifications if n.transaction_id}
+    seen = set(
+        PaymentNotification.objects.filter(
+            processed_at__isnull=False,
+            transaction_id__in={transaction_id for transaction_id, _ in keys},
+        ).values_list('transaction_id', 'transaction_status')
+    ) & keys
+    payments = lock_payments({n.order_id for n in notifications})
+
+    changed = {}  # payment id -> Payment
+    orders = {}  # order id -> status tujuan (yang terakhir menang)
+    for notification in notifications:
+        key = (notification.transaction_id, notification.transaction_status)
+        payment, superseded = payments.get(notification.order_id, (None, False))
+        if payment is None:
+            result = 'unknown'
+        elif notification.transaction_id and key in seen:
+            result = 'duplicate'
+        elif superseded and target_status(notification) != 'success':
+            # Transaksi token lama (kedaluwarsa/pending) tidak mengubah transaksi sekarang
+            result = 'stale'
+        else:
+            result, order_status = apply_notification(payment, notification, now)
+            if result != 'stale':
+                changed[payment.pk] = payment
+            if order_status and payment.order_id:
+                orders[payment.order_id] = order_status
+        if notification.transaction_id:
+            seen.add(key)
+        notification.result = result
+        notification.processed_at = now
+        outcome.count(result)
+        outcome.max_lag = max(outcome.max_lag, (now - notification.received_at).total_seconds())
+
+    if changed:
+        Payment.objects.bulk_update(changed.values(), PAYMENT_ROW_FIELDS)
+        groups = {}
+        for payment in changed.values():
+            values = tuple(getattr(payment, name) for name in PAYMENT_SHARED_FIELDS)
+            groups.setdefault(values, []).append(payment.pk)
+        for values, payment_ids in groups.items():
+            Payment.objects.filter(pk__in=payment_ids).update(
+                updated_at=now, **dict(zip(PAYMENT_SHARED_FIELDS, values))
+            )
+    for status in set(orders.values()):
+        order_ids = [order_id for order_id, target in orders.items() if target == status]
+        update = {'status': status, 'updated_at': now}
+        if status == 'paid':
+            update['paid_at'] = now
+        elif status == 'cancelled':
+            # Stok dikembalikan sekali, hanya untuk order yang baru dibatalkan
+            order_ids = list(
+                Order.objects.select_for_update().filter(pk__in=order_ids)
+                .exclude(status='cancelled').values_list('pk', flat=True)
+            )
+            release_order_stock(order_ids)
+        Order.objects.filter(pk__in=order_ids).update(**update)
+    outcome.processed = len(notifications)
+    return outcome
+
+
+def process_batch(batch_size=100):
+    """
+    Proses maksimal `batch_size` notifikasi tertua dalam satu transaksi.
+
+    Returns:
+        BatchResult (processed == 0 berarti inbox kosong)
+    """
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    with transaction.atomic():
+        batch = list(pending_notifications().select_for_update(skip_locked=skip_locked)[:batch_size])
+        if not batch:
+            return BatchResult()
+
+        now = timezone.now()
+        outcome = apply_notifications(batch, now)
+        results = {}  # result -> [notification id]
+        for notification in batch:
+            results.setdefault(notification.result, []).append(notification.pk)
+        for result, ids in results.items():
+            PaymentNotification.objects.filter(pk__in=ids).update(processed_at=now, result=result)
+    return outcome
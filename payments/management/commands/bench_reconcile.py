@@ -0,0 +1,99 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from backend.benchmark import scratch_database
+from payments.fake_midtrans import FakeMidtrans
+from payments.gateway import MidtransClient
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark reconcile_payments terhadap stand-in Midtrans lokal: N payment pending '
+        'dengan latensi gateway buatan, untuk beberapa ukuran thread pool.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--payments', type=int, default=10_000)
+        parser.add_argument('--latency', type=float, default=0.02, help='Latensi gateway (detik)')
+        parser.add_argument('--workers', default='4,16,32', help='Ukuran thread pool, dipisah koma')
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        workers = [int(value) for value in options['workers'].split(',')]
+        fake = FakeMidtrans(delay=options['latency'])
+        with scratch_database():
+            self.populate(options['payments'], fake)
+            # Proses terpisah: server stand-in tidak berebut GIL dengan rekonsiliasi
+            fake.start_process()
+            try:
+                self.stdout.write(
+                    f"{options['payments']} payment pending, latensi gateway "
+                    f"{options['latency'] * 1000:.0f}ms"
+                )
+                for size in workers:
+                    self.run(fake, size, options['chunk_size'])
+            finally:
+                fake.stop()
+
+    def run(self, fake, workers, chunk_size):
+        from payments.reconcile import reconcile
+
+        self.reset()
+        client = MidtransClient(
+            core_url=fake.url, snap_url=fake.snap_url, pool_size=workers,
+            breaker_threshold=1_000_000,
+        )
+        try:
+            outcome = reconcile(timezone.now(), chunk_size=chunk_size, workers=workers, client=client)
+        finally:
+            client.close()
+        results = ', '.join(f'{name}={total}' for name, total in sorted(outcome.results.items()))
+        self.stdout.write(
+            f'[{workers:>2} thread] {outcome.checked} dicek dalam {outcome.elapsed:.2f}s '
+            f'({outcome.rate:.0f} payment/s) | tidak berubah={outcome.unchanged}, '
+            f'tidak ditemukan={outcome.not_found}, error={outcome.errors} | {results}'
+        )
+
+    def populate(self, total, fake):
+        from django.contrib.auth import get_user_model
+
+        from orders.models import Order
+        from payments.models import Payment
+
+        user = get_user_model().objects.create(username='bench')
+        Order.objects.bulk_create([
+            Order(
+                order_number=f'BENCH-{index:06d}', user=user, customer_name='Bench',
+                customer_phone='-', customer_email='bench@example.com', delivery_address='-',
+                delivery_date='2030-01-02', total=100000,
+            )
+            for index in range(total)
+        ], batch_size=1000)
+        orders = Order.objects.order_by('pk').values_list('pk', flat=True)
+        Payment.objects.bulk_create([
+            Payment(order_id=order_id, amount=100000, midtrans_order_id=f'ORDER-BENCH-{index:06d}')
+            for index, order_id in enumerate(orders)
+        ], batch_size=1000)
+
+        # 50% lunas, 20% kedaluwarsa, 20% masih pending, 10% tidak dikenal Midtrans
+        for index in range(total):
+            bucket = index % 10
+            if bucket < 5:
+                fake.transactions[f'ORDER-BENCH-{index:06d}'] = 'settlement'
+            elif bucket < 7:
+                fake.transactions[f'ORDER-BENCH-{index:06d}'] = 'expire'
+            elif bucket < 9:
+                fake.transactions[f'ORDER-BENCH-{index:06d}'] = 'pending'
+
+    def reset(self):
+        from orders.models import Order
+        from payments.models import Payment, PaymentNotification
+
+        PaymentNotification.objects.all().delete()
+        Order.objects.update(status='pending', paid_at=None)
+        Payment.objects.update(
+            status='pending', midtrans_transaction_id=None, midtrans_transaction_status=None,
+            updated_at=timezone.now() - timedelta(days=1),
+        )
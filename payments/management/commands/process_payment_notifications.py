@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments.inbox import inbox_stats, process_batch
+
+
+class Command(BaseCommand):
+    help = (
+        'Proses inbox notifikasi Midtrans per batch: dedupe retry, terapkan '
+        'transisi status Payment/Order sesuai urutan masuk, laporkan lag.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Jika inbox kosong, tunggu N detik lalu cek lagi (0 = berhenti saat inbox kosong)',
+        )
+        parser.add_argument(
+            '--stats', action='store_true',
+            help='Hanya tampilkan backlog dan umur notifikasi tertua (untuk monitoring)',
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            stats = inbox_stats()
+            self.stdout.write(
+                f"backlog={stats['backlog']} oldest_age={stats['oldest_age']:.1f}s"
+            )
+            return
+
+        while True:
+            started = time.perf_counter()
+            batch = process_batch(options['batch_size'])
+            if batch.processed:
+                elapsed = (time.perf_counter() - started) * 1000
+                results = ', '.join(f'{name}={total}' for name, total in sorted(batch.results.items()))
+                stats = inbox_stats()
+                self.stdout.write(
+                    f'{batch.processed} notifikasi ({results}) dalam {elapsed:.1f}ms, '
+                    f'lag maks {batch.max_lag:.1f}s, sisa backlog {stats["backlog"]}'
+                )
+                continue
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
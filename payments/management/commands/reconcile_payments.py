@@ -0,0 +1,53 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from payments.reconcile import reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        'Cek ulang status Midtrans untuk pembayaran pending/verifying yang lama tidak berubah '
+        '(webhook hilang), paralel per chunk, lalu terapkan hasilnya sekaligus.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--minutes', type=int, default=60,
+            help='Hanya payment yang tidak berubah selama N menit',
+        )
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument(
+            '--workers', type=int, default=settings.MIDTRANS_POOL_SIZE,
+            help='Jumlah request ke Midtrans yang berjalan bersamaan',
+        )
+        parser.add_argument('--limit', type=int, help='Maksimal payment yang dicek')
+        parser.add_argument('--dry-run', action='store_true', help='Hanya cek, tidak mengubah status')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(minutes=options['minutes'])
+
+        def progress(outcome):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'chunk {outcome.chunks}: {outcome.checked} dicek ({outcome.rate:.0f}/s)')
+
+        outcome = reconcile(
+            cutoff,
+            chunk_size=options['chunk_size'],
+            workers=options['workers'],
+            limit=options['limit'],
+            dry_run=options['dry_run'],
+            progress=progress,
+        )
+        results = ', '.join(f'{name}={total}' for name, total in sorted(outcome.results.items())) or '-'
+        self.stdout.write(
+            f'{outcome.checked} payment dicek dalam {outcome.elapsed:.2f}s ({outcome.rate:.0f}/s): '
+            f'tidak berubah={outcome.unchanged}, tidak ditemukan={outcome.not_found}, '
+            f'error={outcome.errors}, hasil [{results}]'
+        )
+        if outcome.aborted:
+            self.stderr.write(self.style.ERROR(
+                'Dihentikan: Midtrans tidak tersedia (circuit breaker terbuka)'
+            ))
@@ -1,22 +1,24 @@
-import midtransclient
 from django.conf import settings
+from django.db import transaction as db_transaction
+from django.utils import timezone
+from datetime import timedelta
 import hashlib
 
+from .gateway import get_midtrans_client
+from .models import Payment, PaymentOrderAlias
+
+# Masa berlaku Snap token / transaksi (parameter `expiry`)
+SNAP_EXPIRY_MINUTES = 1440  # 24 jam
+
 class MidtransService:
     """Service untuk handle Midtrans Snap API"""
     
     def __init__(self):
-        self.snap = midtransclient.Snap(
-            is_production=settings.MIDTRANS_IS_PRODUCTION,
-            server_key=settings.MIDTRANS_SERVER_KEY,
-            client_key=settings.MIDTRANS_CLIENT_KEY
-        )
-        
-        self.core = midtransclient.CoreApi(
-            is_production=settings.MIDTRANS_IS_PRODUCTION,
-            server_key=settings.MIDTRANS_SERVER_KEY,
-            client_key=settings.MIDTRANS_CLIENT_KEY
-        )
+        # Snap/CoreApi bersama per proses: koneksi keep-alive, timeout,
+        # retry dan circuit breaker (lihat payments.gateway)
+        client = get_midtrans_client()
+        self.snap = client.snap
+        self.core = client.core
     
     def create_transaction(self, order, payment):
         """
@@ -28,15 +30,28 @@ class MidtransService:
         
         Returns:
             dict: {'snap_token': str, 'redirect_url': str}
+
+        Raises:
+            ValueError: transaksi di order ID sekarang sudah dimulai
+            (VA/QRIS dibuat); order ID tidak boleh diganti lagi
         """
-        # Generate unique order ID
+        if payment.midtrans_transaction_status:
+            raise ValueError('Transaksi Midtrans sudah dimulai, token tidak bisa diganti')
+
+        # Generate unique order ID. Midtrans menolak order_id yang sudah
+        # pernah dipakai, jadi token pengganti (token lama hampir kedaluwarsa)
+        # memakai order ID baru dengan akhiran waktu; order ID lama dicatat
+        # di PaymentOrderAlias karena transaksinya masih bisa dibayar.
+        previous_order_id = payment.midtrans_order_id
         midtrans_order_id = f"ORDER-{order.order_number}-{payment.id}"
+        if previous_order_id:
+            midtrans_order_id += f"-{int(timezone.now().timestamp())}"
         
         # Item details
         item_details = []
         for item in order.items.all():
             item_details.append({
-                'id': str(item.product.id if item.product else 0),
+                'id': str(item.product_id or 0),
                 'price': int(item.product_price),
                 'quantity': item.quantity,
                 'name': item.product_name[:50],  # Max 50 chars
@@ -106,17 +121,37 @@ class MidtransService:
             ],
             'expiry': {
                 'unit': 'minutes',
-                'duration': 1440  # 24 jam
+                'duration': SNAP_EXPIRY_MINUTES
             }
         }
+        # Dihitung sebelum request: sedikit lebih awal dari expiry sebenarnya
+        expires_at = timezone.now() + timedelta(minutes=SNAP_EXPIRY_MINUTES)
         
         try:
             transaction = self.snap.create_transaction(param)
             
-            # Update payment dengan snap token
+            # Update payment dengan snap token (hanya kolom token: bisa
+            # berjalan di background bersamaan dengan worker notifikasi).
+            # Bersyarat: jika webhook sempat mencatat transaksi di order ID
+            # lama selama request ini, order ID lama tetap dipakai dan
+            # transaksi Snap baru dibiarkan kedaluwarsa.
+            with db_transaction.atomic():
+                updated = Payment.objects.filter(
+                    pk=payment.pk, midtrans_transaction_status__isnull=True,
+                ).update(
+                    midtrans_order_id=midtrans_order_id,
+                    midtrans_snap_token=transaction['token'],
+                    midtrans_token_expires_at=expires_at,
+                    updated_at=timezone.now(),
+                )
+                if updated and previous_order_id:
+                    PaymentOrderAlias.objects.create(payment=payment, midtrans_order_id=previous_order_id)
+            if not updated:
+                payment.refresh_from_db()
+                raise ValueError('Transaksi Midtrans sudah dimulai, token tidak bisa diganti')
             payment.midtrans_order_id = midtrans_order_id
             payment.midtrans_snap_token = transaction['token']
-            payment.save()
+            payment.midtrans_token_expires_at = expires_at
             
             return {
                 'snap_token': transaction['token'],
@@ -145,9 +180,12 @@ class MidtransService:
             print(f"Error checking transaction status: {str(e)}")
             return None
     
-    def verify_signature(self, order_id, status_code, gross_amount, server_key):
+    @staticmethod
+    def verify_signature(order_id, status_code, gross_amount, server_key):
         """
         Verifikasi signature dari Midtrans notification
+
+        Static agar webhook bisa memakainya tanpa membuat client Snap/CoreApi.
         
         Args:
             order_id: Order ID
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0005_payment_status_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_id', models.CharField(max_length=200)),
+                ('transaction_id', models.CharField(blank=True, max_length=200)),
+                ('transaction_status', models.CharField(blank=True, max_length=50)),
+                ('payload', models.JSONField()),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('result', models.CharField(blank=True, choices=[('applied', 'Diterapkan'), ('duplicate', 'Duplikat'), ('stale', 'Kalah oleh status yang lebih baru'), ('ignored', 'Tidak mengubah status'), ('unknown', 'Payment tidak ditemukan')], max_length=20)),
+            ],
+            options={
+                'db_table': 'payment_notifications',
+                'ordering': ['received_at', 'id'],
+                'indexes': [models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['received_at', 'id'], name='notification_pending_idx'), models.Index(fields=['transaction_id', 'transaction_status'], name='notification_dedupe_idx')],
+            },
+        ),
+    ]
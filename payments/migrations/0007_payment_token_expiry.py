@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0006_payment_notification_inbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='midtrans_token_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
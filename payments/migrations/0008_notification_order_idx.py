@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0007_payment_token_expiry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='paymentnotification',
+            index=models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['order_id'], name='notification_order_idx'),
+        ),
+    ]
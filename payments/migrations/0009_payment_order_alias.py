@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0008_notification_order_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentOrderAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('midtrans_order_id', models.CharField(max_length=200, unique=True)),
+                ('replaced_at', models.DateTimeField(auto_now_add=True)),
+                ('payment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_aliases', to='payments.payment')),
+            ],
+            options={
+                'db_table': 'payment_order_aliases',
+                'ordering': ['replaced_at', 'id'],
+            },
+        ),
+    ]
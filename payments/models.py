@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.utils import timezone
 
@@ -40,6 +40,7 @@ class Payment(models.Model):
     # ===== MIDTRANS FIELDS (NEW) =====
     midtrans_order_id = models.CharField(max_length=200, blank=True, null=True, unique=True)
     midtrans_snap_token = models.TextField(blank=True, null=True)
+    midtrans_token_expires_at = models.DateTimeField(blank=True, null=True)
     midtrans_transaction_id = models.CharField(max_length=200, blank=True, null=True)
     midtrans_transaction_status = models.CharField(max_length=50, blank=True, null=True)
     midtrans_payment_type = models.CharField(max_length=50, blank=True, null=True)
@@ -63,6 +64,11 @@ class Payment(models.Model):
     class Meta:
         db_table = 'payments'
         ordering = ['-payment_date']
+        indexes = [
+            # Filter status di admin & rekonsiliasi pembayaran pending, urut terbaru.
+            # Riwayat per user (order__user) memakai index orders.user + payments.order.
+            models.Index(fields=['status', '-payment_date'], name='payment_status_idx'),
+        ]
 
     def __str__(self):
         return f"Payment #{self.id} - {self.midtrans_order_id or 'No Order ID'}"
@@ -86,10 +92,82 @@ class Payment(models.Model):
         self.save()
 
     def mark_as_expired(self):
-        """Mark payment as expired"""
-        self.status = 'expired'
-        self.save()
-        
-        if self.order:
-            self.order.status = 'cancelled'
-            self.order.save()
\ No newline at end of file
+        """Mark payment as expired (order dibatalkan, stoknya dikembalikan)"""
+        from orders.stock import release_order_stock
+
+        with transaction.atomic():
+            self.status = 'expired'
+            self.save()
+            
+            if self.order and self.order.status != 'cancelled':
+                self.order.status = 'cancelled'
+                self.order.save()
+                release_order_stock([self.order.pk])
+
+class PaymentOrderAlias(models.Model):
+    """
+    Order ID Midtrans lama sebuah Payment.
+
+    Token Snap yang hampir kedaluwarsa diganti dengan transaksi Snap baru
+    (order ID baru, lihat MidtransService.create_transaction). Transaksi
+    lama masih bisa dibayar sampai kedaluwarsa, jadi notifikasi dan
+    rekonsiliasi untuk order ID lama tetap harus menemukan Payment-nya.
+    """
+
+    payment = models.ForeignKey(Payment, on_delete=models.CASCADE, related_name='order_aliases')
+    midtrans_order_id = models.CharField(max_length=200, unique=True)
+    replaced_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'payment_order_aliases'
+        ordering = ['replaced_at', 'id']
+
+    def __str__(self):
+        return f"{self.midtrans_order_id} -> Payment #{self.payment_id}"
+
+class PaymentNotification(models.Model):
+    """
+    Inbox notifikasi (webhook) Midtrans.
+
+    Endpoint hanya menyimpan notifikasi mentah lalu langsung menjawab 200;
+    perubahan status Payment/Order dikerjakan oleh
+    `manage.py process_payment_notifications` (lihat payments.inbox).
+    """
+
+    RESULT_CHOICES = [
+        ('applied', 'Diterapkan'),
+        ('duplicate', 'Duplikat'),
+        ('stale', 'Kalah oleh status yang lebih baru'),
+        ('ignored', 'Tidak mengubah status'),
+        ('unknown', 'Payment tidak ditemukan'),
+    ]
+
+    order_id = models.CharField(max_length=200)
+    transaction_id = models.CharField(max_length=200, blank=True)
+    transaction_status = models.CharField(max_length=50, blank=True)
+    payload = models.JSONField()
+
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    result = models.CharField(max_length=20, choices=RESULT_CHOICES, blank=True)
+
+    class Meta:
+        db_table = 'payment_notifications'
+        ordering = ['received_at', 'id']
+        indexes = [
+            # Antrean worker: hanya baris yang belum diproses
+            models.Index(
+                fields=['received_at', 'id'], name='notification_pending_idx',
+                condition=models.Q(processed_at__isnull=True),
+            ),
+            # Status terbaru yang belum diproses untuk satu order (payments.status)
+            models.Index(
+                fields=['order_id'], name='notification_order_idx',
+                condition=models.Q(processed_at__isnull=True),
+            ),
+            # Dedupe retry Midtrans
+            models.Index(fields=['transaction_id', 'transaction_status'], name='notification_dedupe_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.order_id} - {self.transaction_status}"
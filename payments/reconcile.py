@@ -0,0 +1,166 @@
+"""
+Rekonsiliasi pembayaran yang webhook-nya hilang.
+
+Payment pending/verifying yang tidak berubah sejak `cutoff` diambil per
+chunk (keyset pada id). Status setiap order ditanyakan ke Midtrans secara
+paralel dengan thread pool terbatas (client bersama, lihat
+payments.gateway). Hasilnya diterapkan sekaligus per chunk lewat
+inbox.apply_notifications, jalur yang sama dengan webhook: dedupe,
+status final tidak mundur, bulk_update Payment dan UPDATE Order per
+status. Setiap jawaban yang mengubah status dicatat sebagai
+PaymentNotification yang sudah diproses (audit).
+
+Order ID lama (PaymentOrderAlias, token Snap yang sudah diganti) ikut
+ditanyakan: transaksinya masih bisa dibayar. Dari order ID lama hanya
+pembayaran berhasil yang diteruskan.
+
+Thread hanya melakukan HTTP; semua akses database ada di thread pemanggil.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.utils import timezone
+from midtransclient.error_midtrans import MidtransAPIError
+
+from .gateway import GatewayUnavailable, get_midtrans_client
+from .inbox import STATUS_TRANSITIONS, apply_notifications
+from .models import Payment, PaymentNotification, PaymentOrderAlias
+
+RECONCILE_STATUSES = ['pending', 'verifying']
+
+
+@dataclass
+class ReconcileResult:
+    checked: int = 0
+    unchanged: int = 0
+    not_found: int = 0
+    errors: int = 0
+    results: dict = field(default_factory=dict)  # result notifikasi -> jumlah
+    chunks: int = 0
+    elapsed: float = 0.0
+    aborted: bool = False  # circuit breaker terbuka: gateway mati
+
+    @property
+    def rate(self):
+        return self.checked / self.elapsed if self.elapsed else 0.0
+
+
+def stale_payments(cutoff):
+    return Payment.objects.filter(
+        status__in=RECONCILE_STATUSES,
+        midtrans_order_id__isnull=False,
+        updated_at__lt=cutoff,
+    )
+
+
+def fetch_status(client, order_id):
+    """(order_id, response | None, error | None)"""
+    try:
+        return order_id, client.core.transactions.status(order_id), None
+    except MidtransAPIError as e:
+        if e.http_status_code == 404 or (e.api_response_dict or {}).get('status_code') == '404':
+            return order_id, None, None
+        return order_id, None, e
+    except GatewayUnavailable as e:
+        return order_id, None, e
+
+
+def notification(order_id, response, now):
+    """Jawaban status Midtrans sebagai notifikasi inbox (langsung diterapkan)"""
+    return PaymentNotification(
+        order_id=order_id,
+        transaction_id=str(response.get('transaction_id') or ''),
+        transaction_status=str(response.get('transaction_status') or ''),
+        payload=response,
+        received_at=now,
+    )
+
+
+def reconcile(cutoff, chunk_size=500, workers=8, limit=None, client=None, dry_run=False, progress=None):
+    """
+    Rekonsiliasi payment basi sebelum `cutoff`.
+
+    Request untuk chunk berikutnya sudah berjalan di thread pool selama
+    hasil chunk sebelumnya ditulis ke database, jadi waktu total mendekati
+    max(waktu gateway, waktu database), bukan jumlah keduanya.
+
+    Args:
+        progress: callable(ReconcileResult) dipanggil setelah setiap chunk
+
+    Returns:
+        ReconcileResult
+    """
+    client = client or get_midtrans_client()
+    outcome = ReconcileResult()
+    started = time.perf_counter()
+
+    def chunks():
+        last_pk, taken = 0, 0
+        while limit is None or taken < limit:
+            size = chunk_size if limit is None else min(chunk_size, limit - taken)
+            chunk = list(
+                stale_payments(cutoff).filter(pk__gt=last_pk).order_by('pk')
+                .values_list('pk', 'midtrans_order_id', 'midtrans_transaction_status')[:size]
+            )
+            if not chunk:
+                return
+            last_pk, taken = chunk[-1][0], taken + len(chunk)
+            local = {order_id: status for _, order_id, status in chunk}
+            superseded = set(
+                PaymentOrderAlias.objects.filter(payment_id__in=[pk for pk, _, _ in chunk])
+                .values_list('midtrans_order_id', flat=True)
+            )
+            yield local, superseded
+
+    def apply(local, superseded, futures):
+        now = timezone.now()
+        notifications = []
+        for future in futures:
+            order_id, response, error = future.result()
+            outcome.checked += 1
+            if error is not None:
+                outcome.errors += 1
+            elif response is None:
+                outcome.not_found += 1
+            elif order_id in superseded:
+                if STATUS_TRANSITIONS.get(response.get('transaction_status')) == 'success':
+                    notifications.append(notification(order_id, response, now))
+                else:
+                    outcome.unchanged += 1
+            elif response.get('transaction_status') == local[order_id]:
+                outcome.unchanged += 1
+            else:
+                notifications.append(notification(order_id, response, now))
+
+        if notifications and not dry_run:
+            with transaction.atomic():
+                batch = apply_notifications(notifications, now)
+                PaymentNotification.objects.bulk_create(notifications)
+            for result, total in batch.results.items():
+                outcome.results[result] = outcome.results.get(result, 0) + total
+        elif notifications:
+            outcome.results['would_apply'] = outcome.results.get('would_apply', 0) + len(notifications)
+        outcome.chunks += 1
+        outcome.elapsed = time.perf_counter() - started
+        if progress:
+            progress(outcome)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='reconcile') as executor:
+        in_flight = None
+        for local, superseded in chunks():
+            futures = [
+                executor.submit(fetch_status, client, order_id) for order_id in [*local, *superseded]
+            ]
+            if in_flight:
+                apply(*in_flight)
+            in_flight = (local, superseded, futures)
+            if client.breaker.state == 'open':
+                outcome.aborted = True
+                break
+        if in_flight:
+            apply(*in_flight)
+
+    outcome.elapsed = time.perf_counter() - started
+    return outcome
@@ -0,0 +1,89 @@
+"""
+Status transaksi Midtrans untuk halaman redirect (finish/pending/error).
+
+Webhook lebih dulu: status yang sudah dicatat notifikasi (di Payment atau
+masih antre di inbox) dipakai tanpa menghubungi Midtrans. Gateway hanya
+ditanya jika status lokal belum final, mis. customer kembali dari Snap
+sebelum webhook diproses.
+
+Jawaban gateway disimpan di cache selama STATUS_CACHE_TTL detik (termasuk
+jawaban kosong saat gateway gagal, agar gateway yang mati tidak terus
+dipanggil). Pencarian bersamaan untuk order yang sama digabung lewat kunci
+di cache: hanya satu request yang memanggil gateway, sisanya menunggu
+hasilnya di cache. Status baru dari gateway dimasukkan ke inbox sehingga
+worker notifikasi yang memperbarui Payment/Order.
+"""
+import time
+
+from django.core.cache import cache
+
+from .gateway import call_timeout
+from .inbox import enqueue_notification
+from .midtrans_service import MidtransService
+from .models import PaymentNotification
+
+STATUS_CACHE_TTL = 15  # detik
+POLL_INTERVAL = 0.05  # detik
+
+FINAL_TRANSACTION_STATUSES = {
+    'capture', 'settlement', 'deny', 'cancel', 'expire', 'failure', 'refund', 'partial_refund',
+}
+
+
+def cache_key(order_id):
+    return f'payments:gateway-status:{order_id}'
+
+
+def local_transaction_status(payment):
+    """Status terbaru dari webhook: yang sudah diterapkan, atau yang masih di inbox"""
+    queued = (
+        PaymentNotification.objects
+        .filter(order_id=payment.midtrans_order_id, processed_at__isnull=True)
+        .order_by('-received_at', '-id')
+        .values_list('transaction_status', flat=True)
+        .first()
+    )
+    applied = payment.midtrans_transaction_status
+    if applied in FINAL_TRANSACTION_STATUSES:
+        return applied
+    return queued or applied
+
+
+def gateway_transaction_status(order_id, local_status=None):
+    """
+    Status dari Midtrans (lewat cache, satu pemanggil per order_id).
+
+    Returns:
+        transaction_status, atau None jika gateway tidak menjawab
+    """
+    key = cache_key(order_id)
+    lock = f'{key}:lock'
+    deadline = time.monotonic() + call_timeout()
+    while True:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached.get('transaction_status')
+        if cache.add(lock, 1, call_timeout()):
+            break
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(POLL_INTERVAL)
+
+    try:
+        response = MidtransService().get_transaction_status(order_id) or {}
+        cache.set(key, response, STATUS_CACHE_TTL)
+    finally:
+        cache.delete(lock)
+
+    status = response.get('transaction_status')
+    if status and status != local_status and response.get('order_id') == order_id:
+        enqueue_notification(response)
+    return status
+
+
+def transaction_status(payment):
+    """Status transaksi untuk ditampilkan ke customer"""
+    local = local_transaction_status(payment)
+    if local in FINAL_TRANSACTION_STATUSES or not payment.midtrans_order_id:
+        return local
+    return gateway_transaction_status(payment.midtrans_order_id, local) or local
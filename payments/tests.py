@@ -1,3 +1,599 @@
-from django.test import TestCase
+import json
+import socket
+import threading
+import time
+from io import StringIO
 
-# Create your tests here.
+from django.conf import settings
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from backend.query_plan import QueryPlanAssertions
+from orders.models import Order
+from products.models import Category, Product
+from users.models import CustomUser
+
+from .fake_midtrans import FakeMidtrans
+from .gateway import (
+    CircuitBreaker, GatewayUnavailable, MidtransClient, call_timeout, reset_midtrans_client,
+)
+from .inbox import inbox_stats, process_batch
+from .reconcile import reconcile
+from .status import gateway_transaction_status
+from .tokens import ensure_snap_token, lock_key
+from .midtrans_service import MidtransService
+from .models import Payment, PaymentNotification, PaymentOrderAlias
+from .views import PAYMENT_PAGE_SIZE
+
+
+class PaymentListTest(TestCase):
+    """Riwayat pembayaran tanpa query per order, dengan keyset pagination"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(username='pelanggan')
+
+    def create_payments(self, total):
+        for _ in range(total):
+            order = Order.objects.create(
+                user=self.user, customer_name='Budi', customer_phone='-',
+                customer_email='budi@example.com', delivery_address='-',
+                delivery_date='2030-01-02',
+            )
+            Payment.objects.create(order=order, amount=100000)
+
+    def list_queries(self, **params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('payment_list'), params)
+        self.assertEqual(response.status_code, 200)
+        return response, len(context.captured_queries)
+
+    def test_query_count_independent_of_payment_count(self):
+        self.client.force_login(self.user)
+        self.create_payments(2)
+        _, few = self.list_queries()
+        self.create_payments(10)
+        _, many = self.list_queries()
+        self.assertEqual(few, many)
+
+    def test_cursor_pagination(self):
+        self.client.force_login(self.user)
+        self.create_payments(PAYMENT_PAGE_SIZE + 1)
+        first, _ = self.list_queries()
+        second, _ = self.list_queries(cursor=first.context['page'].next_cursor)
+        self.assertEqual(len(second.context['page']), 1)
+        self.assertNotIn(second.context['page'].items[0], first.context['page'].items)
+
+
+class PaymentQueryPlanTest(QueryPlanAssertions, TestCase):
+    """Riwayat pembayaran dan filter status admin memakai index"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(username='pelanggan')
+        cls.admin = CustomUser.objects.create_superuser(
+            username='admin', email='admin@example.com', password='password'
+        )
+        for _ in range(3):
+            order = Order.objects.create(
+                user=cls.user, customer_name='Budi', customer_phone='-',
+                customer_email='budi@example.com', delivery_address='-',
+                delivery_date='2030-01-02',
+            )
+            Payment.objects.create(order=order, amount=100000)
+
+    def test_payment_list(self):
+        self.client.force_login(self.user)
+        with self.assertNoFullScans():
+            self.client.get(reverse('payment_list'))
+
+    def test_admin_status_filter(self):
+        self.client.force_login(self.admin)
+        with self.assertNoFullScans():
+            self.client.get(reverse('admin:payments_payment_changelist'), {'status__exact': 'pending'})
+
+
+class MidtransNotificationInboxTest(TestCase):
+    """Webhook hanya menyimpan ke inbox; worker menerapkan status berurutan"""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = CustomUser.objects.create(username='pelanggan')
+        cls.order = Order.objects.create(
+            user=user, customer_name='Budi', customer_phone='-',
+            customer_email='budi@example.com', delivery_address='-',
+            delivery_date='2030-01-02', total=100000,
+        )
+        cls.payment = Payment.objects.create(
+            order=cls.order, amount=100000, midtrans_order_id='ORDER-1',
+        )
+
+    def notify(self, transaction_status, transaction_id='trx-1', **extra):
+        notification = {
+            'order_id': 'ORDER-1',
+            'transaction_id': transaction_id,
+            'transaction_status': transaction_status,
+            'status_code': '200',
+            'gross_amount': '100000.00',
+            'payment_type': 'qris',
+            **extra,
+        }
+        notification.setdefault('signature_key', MidtransService.verify_signature(
+            'ORDER-1', '200', '100000.00', settings.MIDTRANS_SERVER_KEY
+        ))
+        return self.client.post(
+            reverse('midtrans_notification'), json.dumps(notification),
+            content_type='application/json',
+        )
+
+    def test_webhook_only_inserts(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.notify('settlement')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertEqual(Payment.objects.get().status, 'pending')
+        self.assertEqual(inbox_stats()['backlog'], 1)
+
+    def test_invalid_signature_rejected(self):
+        response = self.notify('settlement', signature_key='salah')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(PaymentNotification.objects.exists())
+
+    def test_settlement_marks_order_paid(self):
+        self.notify('pending')
+        self.notify('settlement')
+        batch = process_batch()
+        self.assertEqual(batch.processed, 2)
+        self.assertEqual(batch.results, {'applied': 2})
+        payment = Payment.objects.select_related('order').get()
+        self.assertEqual(payment.status, 'success')
+        self.assertEqual(payment.midtrans_transaction_status, 'settlement')
+        self.assertEqual(payment.order.status, 'paid')
+        self.assertIsNotNone(payment.order.paid_at)
+        self.assertEqual(inbox_stats()['backlog'], 0)
+
+    def test_retries_are_deduplicated(self):
+        self.notify('settlement')
+        process_batch()
+        Order.objects.filter(pk=self.order.pk).update(status='processing')
+        self.notify('settlement')
+        self.notify('settlement')
+        self.assertEqual(process_batch().results, {'duplicate': 2})
+        self.assertEqual(Order.objects.get().status, 'processing')
+
+    def test_late_pending_does_not_revert(self):
+        self.notify('settlement')
+        self.notify('pending')
+        self.assertEqual(process_batch().results, {'applied': 1, 'stale': 1})
+        self.assertEqual(Payment.objects.get().status, 'success')
+
+    def test_expire_cancels_order(self):
+        self.notify('expire')
+        process_batch()
+        self.assertEqual(Order.objects.get().status, 'cancelled')
+
+    def test_expire_does_not_cancel_verifying_payment(self):
+        Payment.objects.filter(pk=self.payment.pk).update(status='verifying')
+        Order.objects.filter(pk=self.order.pk).update(status='processing')
+        self.notify('expire')
+        self.notify('pending', transaction_id='trx-2')
+        self.assertEqual(process_batch().results, {'ignored': 2})
+        payment = Payment.objects.select_related('order').get()
+        self.assertEqual((payment.status, payment.midtrans_transaction_status), ('verifying', 'pending'))
+        self.assertEqual(payment.order.status, 'processing')
+
+        # Pembayaran Midtrans yang berhasil tetap diterapkan
+        self.notify('settlement', transaction_id='trx-3')
+        process_batch()
+        self.assertEqual(Order.objects.get().status, 'paid')
+
+    def test_unknown_order_id(self):
+        PaymentNotification.objects.create(
+            order_id='ORDER-X', transaction_id='trx-x', transaction_status='settlement', payload={},
+        )
+        self.assertEqual(process_batch().results, {'unknown': 1})
+
+    def test_worker_command_reports_lag(self):
+        self.notify('settlement')
+        out = StringIO()
+        call_command('process_payment_notifications', stdout=out)
+        self.assertIn('1 notifikasi (applied=1)', out.getvalue())
+        self.assertIn('sisa backlog 0', out.getvalue())
+
+
+class MidtransClientTest(SimpleTestCase):
+    """Client bersama: keep-alive, timeout, retry dan circuit breaker"""
+
+    def setUp(self):
+        self.fake = FakeMidtrans().start()
+        self.addCleanup(self.fake.stop)
+        self.fake.transactions['ORDER-1'] = 'settlement'
+
+    def make_client(self, **options):
+        options = {
+            'core_url': self.fake.url, 'snap_url': self.fake.snap_url,
+            'connect_timeout': 1, 'read_timeout': 0.2, 'max_retries': 2,
+            'breaker_threshold': 3, 'breaker_reset': 60, **options,
+        }
+        client = MidtransClient(**options)
+        self.addCleanup(client.close)
+        return client
+
+    def test_connection_reused(self):
+        client = self.make_client()
+        for _ in range(5):
+            status = client.core.transactions.status('ORDER-1')
+        self.assertEqual(status['transaction_status'], 'settlement')
+        self.assertTrue(client.snap.create_transaction({
+            'transaction_details': {'order_id': 'ORDER-2', 'gross_amount': 1000},
+        })['token'])
+        self.assertEqual(self.fake.requests, 6)
+        self.assertEqual(len(self.fake.connections), 1)
+
+    def test_status_retried_on_server_error(self):
+        client = self.make_client()
+        self.fake.fail_next(2)
+        self.assertEqual(client.core.transactions.status('ORDER-1')['transaction_status'], 'settlement')
+        self.assertEqual(self.fake.requests, 3)
+
+    def test_slow_gateway_times_out(self):
+        client = self.make_client(max_retries=1)
+        self.fake.delay = 1
+        started = time.perf_counter()
+        with self.assertRaises(GatewayUnavailable):
+            client.core.transactions.status('ORDER-1')
+        # 2 percobaan x read timeout 0.2s + jitter, bukan 2 x 1 detik
+        self.assertLess(time.perf_counter() - started, 1.5)
+
+    def test_create_transaction_not_retried_after_send(self):
+        client = self.make_client()
+        self.fake.delay = 0.5
+        with self.assertRaises(GatewayUnavailable):
+            client.snap.create_transaction({'transaction_details': {'order_id': 'ORDER-2'}})
+        time.sleep(0.6)
+        self.assertEqual(self.fake.requests, 1)
+
+    def test_create_transaction_retried_when_connection_refused(self):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            closed_url = f'http://127.0.0.1:{sock.getsockname()[1]}'
+        client = self.make_client(snap_url=closed_url)
+        backoffs = []
+        client.transport.backoff = backoffs.append
+        with self.assertRaises(GatewayUnavailable):
+            client.snap.create_transaction({'transaction_details': {'order_id': 'ORDER-2'}})
+        # Request belum pernah terkirim: semua percobaan dipakai
+        self.assertEqual(backoffs, [0, 1])
+
+    def test_call_timeout_covers_every_attempt(self):
+        with self.settings(MIDTRANS_CONNECT_TIMEOUT=1, MIDTRANS_READ_TIMEOUT=2, MIDTRANS_MAX_RETRIES=2):
+            # 3 percobaan x (1 + 2) detik + backoff 0.2 + 0.4
+            self.assertEqual(call_timeout(), 10)
+        with self.settings(MIDTRANS_CONNECT_TIMEOUT=1, MIDTRANS_READ_TIMEOUT=2, MIDTRANS_MAX_RETRIES=0):
+            self.assertEqual(call_timeout(), 4)
+
+    def test_breaker_fails_fast_when_gateway_down(self):
+        client = self.make_client(max_retries=0)
+        self.fake.fail_next(3)
+        for _ in range(3):
+            with self.assertRaises(Exception):
+                client.core.transactions.status('ORDER-1')
+        with self.assertRaises(GatewayUnavailable):
+            client.core.transactions.status('ORDER-1')
+        self.assertEqual(self.fake.requests, 3)
+
+    def test_breaker_half_open(self):
+        now = [0.0]
+        breaker = CircuitBreaker(threshold=2, reset_timeout=30, clock=lambda: now[0])
+        breaker.record_failure()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+        now[0] = 31
+        breaker.before_call()  # satu percobaan boleh lewat
+        with self.assertRaises(GatewayUnavailable):
+            breaker.before_call()
+        breaker.record_success()
+        self.assertEqual(breaker.state, 'closed')
+
+
+class SnapTokenTest(TestCase):
+    """Snap token disiapkan setelah checkout dan diganti sebelum kedaluwarsa"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(username='pelanggan')
+        category = Category.objects.create(name='Nasi')
+        cls.product = Product.objects.create(
+            category=category, name='Nasi Kuning', description='-', price=25000, stock=50,
+        )
+
+    def setUp(self):
+        self.fake = FakeMidtrans().start()
+        self.addCleanup(self.fake.stop)
+        self.enterContext(self.settings(
+            MIDTRANS_API_URL=self.fake.url, MIDTRANS_SNAP_URL=self.fake.snap_url,
+            BACKGROUND_TASKS_SYNC=True,
+        ))
+        reset_midtrans_client()
+        self.addCleanup(reset_midtrans_client)
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def checkout(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('checkout_direct', args=[self.product.pk]), {
+                'quantity': 10, 'price_per_portion': 25000, 'delivery_date': '2030-01-02',
+            })
+        return Payment.objects.select_related('order').get()
+
+    def test_token_prepared_after_checkout(self):
+        payment = self.checkout()
+        self.assertTrue(payment.midtrans_snap_token)
+        self.assertEqual(payment.midtrans_order_id, f'ORDER-{payment.order.order_number}-{payment.pk}')
+        expected = timezone.now() + timedelta(days=1)
+        self.assertAlmostEqual(payment.midtrans_token_expires_at, expected, delta=timedelta(minutes=1))
+
+        response = self.client.get(reverse('payment_detail', args=[payment.order_id]))
+        self.assertEqual(response.context['snap_token'], payment.midtrans_snap_token)
+        self.assertEqual(self.fake.requests, 1)
+
+    def test_token_refreshed_before_expiry(self):
+        payment = self.checkout()
+        old_token, old_order_id = payment.midtrans_snap_token, payment.midtrans_order_id
+        Payment.objects.filter(pk=payment.pk).update(
+            midtrans_token_expires_at=timezone.now() + timedelta(minutes=5)
+        )
+        response = self.client.get(reverse('payment_token', args=[payment.order_id]))
+        self.assertEqual(response.status_code, 200)
+        payment.refresh_from_db()
+        self.assertEqual(response.json()['token'], payment.midtrans_snap_token)
+        self.assertNotEqual(payment.midtrans_snap_token, old_token)
+        self.assertNotEqual(payment.midtrans_order_id, old_order_id)
+        self.assertEqual(
+            list(payment.order_aliases.values_list('midtrans_order_id', flat=True)), [old_order_id]
+        )
+
+    def refresh_token(self, payment):
+        Payment.objects.filter(pk=payment.pk).update(
+            midtrans_token_expires_at=timezone.now() + timedelta(minutes=5)
+        )
+        return self.client.get(reverse('payment_token', args=[payment.order_id]))
+
+    def test_webhook_for_pre_refresh_order_id(self):
+        payment = self.checkout()
+        old_order_id = payment.midtrans_order_id
+        self.refresh_token(payment)
+        # Customer membayar VA dari token lama sebelum kedaluwarsa
+        for status in ['pending', 'settlement']:
+            PaymentNotification.objects.create(
+                order_id=old_order_id, transaction_id='trx-lama', transaction_status=status,
+                payload={'payment_type': 'bank_transfer'},
+            )
+        self.assertEqual(process_batch().results, {'stale': 1, 'applied': 1})
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'success')
+        self.assertEqual(payment.midtrans_transaction_id, 'trx-lama')
+        self.assertEqual(Order.objects.get().status, 'paid')
+
+        response = self.client.get(reverse('payment_finish'), {'order_id': old_order_id})
+        self.assertRedirects(response, reverse('order_detail', args=[payment.order_id]),
+                             fetch_redirect_response=False)
+
+    def test_expired_pre_refresh_transaction_ignored(self):
+        payment = self.checkout()
+        old_order_id = payment.midtrans_order_id
+        self.refresh_token(payment)
+        PaymentNotification.objects.create(
+            order_id=old_order_id, transaction_id='trx-lama', transaction_status='expire', payload={},
+        )
+        self.assertEqual(process_batch().results, {'stale': 1})
+        self.assertEqual(Payment.objects.get().status, 'pending')
+        self.assertEqual(Order.objects.get().status, 'pending')
+
+    def test_order_id_not_rotated_after_transaction_started(self):
+        payment = self.checkout()
+        order_id, token = payment.midtrans_order_id, payment.midtrans_snap_token
+        Payment.objects.filter(pk=payment.pk).update(midtrans_transaction_status='pending')
+        response = self.refresh_token(payment)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['token'], token)
+        payment.refresh_from_db()
+        self.assertEqual(payment.midtrans_order_id, order_id)
+        self.assertFalse(PaymentOrderAlias.objects.exists())
+        self.assertEqual(self.fake.requests, 1)
+        with self.assertRaises(ValueError):
+            MidtransService().create_transaction(payment.order, payment)
+
+    def test_waits_for_token_in_progress(self):
+        payment = self.checkout()
+        Payment.objects.filter(pk=payment.pk).update(midtrans_token_expires_at=None)
+        payment.refresh_from_db()
+        cache.add(lock_key(payment.pk), 1)
+        with self.assertRaises(GatewayUnavailable):
+            ensure_snap_token(payment, wait=0.2)
+        self.assertEqual(self.fake.requests, 1)
+
+    def test_gateway_down_does_not_block_page(self):
+        self.fake.delay = 0.5
+        self.enterContext(self.settings(MIDTRANS_READ_TIMEOUT=0.1))
+        reset_midtrans_client()
+        payment = self.checkout()
+        self.assertFalse(payment.midtrans_snap_token)
+        response = self.client.get(reverse('payment_detail', args=[payment.order_id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['snap_token'], '')
+
+
+class PaymentStatusLookupTest(TestCase):
+    """Halaman redirect Snap memakai status webhook dulu, gateway lewat cache"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(username='pelanggan')
+        cls.order = Order.objects.create(
+            user=cls.user, customer_name='Budi', customer_phone='-',
+            customer_email='budi@example.com', delivery_address='-',
+            delivery_date='2030-01-02', total=100000,
+        )
+        cls.payment = Payment.objects.create(
+            order=cls.order, amount=100000, midtrans_order_id='ORDER-1',
+        )
+
+    def setUp(self):
+        self.fake = FakeMidtrans().start()
+        self.addCleanup(self.fake.stop)
+        self.enterContext(self.settings(
+            MIDTRANS_API_URL=self.fake.url, MIDTRANS_SNAP_URL=self.fake.snap_url,
+        ))
+        reset_midtrans_client()
+        self.addCleanup(reset_midtrans_client)
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def finish(self):
+        response = self.client.get(reverse('payment_finish'), {'order_id': 'ORDER-1'}, follow=True)
+        return [str(message) for message in response.context['messages']]
+
+    def test_webhook_status_skips_gateway(self):
+        Payment.objects.filter(pk=self.payment.pk).update(midtrans_transaction_status='settlement')
+        self.assertIn('✅ Pembayaran berhasil! Pesanan sedang diproses.', self.finish())
+        self.assertEqual(self.fake.requests, 0)
+
+    def test_queued_notification_skips_gateway(self):
+        PaymentNotification.objects.create(
+            order_id='ORDER-1', transaction_id='trx-1', transaction_status='settlement', payload={},
+        )
+        self.assertIn('✅ Pembayaran berhasil! Pesanan sedang diproses.', self.finish())
+        self.assertEqual(self.fake.requests, 0)
+
+    def test_gateway_answer_cached_and_queued(self):
+        self.fake.transactions['ORDER-1'] = 'settlement'
+        self.finish()
+        self.finish()
+        self.assertEqual(self.fake.requests, 1)
+        # Jawaban gateway masuk inbox; worker memperbarui Payment/Order
+        process_batch()
+        self.assertEqual(Payment.objects.get().status, 'success')
+        self.assertEqual(Order.objects.get().status, 'paid')
+
+    def test_concurrent_lookups_coalesced(self):
+        self.fake.transactions['ORDER-1'] = 'settlement'
+        self.fake.delay = 0.3
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                gateway_transaction_status('ORDER-1', local_status='settlement')
+            ))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['settlement'] * 5)
+        self.assertEqual(self.fake.requests, 1)
+
+
+class ReconcilePaymentsTest(TestCase):
+    """Rekonsiliasi payment pending yang webhook-nya hilang"""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = CustomUser.objects.create(username='pelanggan')
+        for index in range(5):
+            order = Order.objects.create(
+                user=user, customer_name='Budi', customer_phone='-',
+                customer_email='budi@example.com', delivery_address='-',
+                delivery_date='2030-01-02', total=100000,
+            )
+            Payment.objects.create(order=order, amount=100000, midtrans_order_id=f'ORDER-{index}')
+        Payment.objects.exclude(midtrans_order_id='ORDER-4').update(
+            updated_at=timezone.now() - timedelta(hours=2)
+        )
+
+    def setUp(self):
+        self.fake = FakeMidtrans().start()
+        self.addCleanup(self.fake.stop)
+        self.client_api = MidtransClient(core_url=self.fake.url, snap_url=self.fake.snap_url)
+        self.addCleanup(self.client_api.close)
+        self.fake.transactions.update({
+            'ORDER-0': 'settlement', 'ORDER-1': 'expire', 'ORDER-2': 'pending', 'ORDER-4': 'settlement',
+        })
+
+    def run_reconcile(self, **options):
+        return reconcile(
+            timezone.now() - timedelta(hours=1), client=self.client_api, chunk_size=2, workers=4, **options
+        )
+
+    def statuses(self):
+        return dict(Payment.objects.values_list('midtrans_order_id', 'status'))
+
+    def test_stale_payments_reconciled(self):
+        outcome = self.run_reconcile()
+        self.assertEqual(outcome.checked, 4)  # ORDER-4 baru saja berubah
+        self.assertEqual(outcome.not_found, 1)  # ORDER-3 tidak dikenal Midtrans
+        self.assertEqual(outcome.chunks, 2)
+        self.assertEqual(self.statuses(), {
+            'ORDER-0': 'success', 'ORDER-1': 'expired', 'ORDER-2': 'pending',
+            'ORDER-3': 'pending', 'ORDER-4': 'pending',
+        })
+        orders = dict(Order.objects.values_list('payment__midtrans_order_id', 'status'))
+        self.assertEqual((orders['ORDER-0'], orders['ORDER-1']), ('paid', 'cancelled'))
+        self.assertEqual(
+            PaymentNotification.objects.filter(result='applied').count(), 3
+        )
+
+    def test_dry_run_changes_nothing(self):
+        outcome = self.run_reconcile(dry_run=True)
+        self.assertEqual(outcome.results, {'would_apply': 3})
+        self.assertEqual(set(self.statuses().values()), {'pending'})
+        self.assertFalse(PaymentNotification.objects.exists())
+
+    def test_limit(self):
+        self.assertEqual(self.run_reconcile(limit=3).checked, 3)
+
+    def test_pre_refresh_order_id_checked(self):
+        payment = Payment.objects.get(midtrans_order_id='ORDER-3')
+        PaymentOrderAlias.objects.create(payment=payment, midtrans_order_id='ORDER-3-lama')
+        PaymentOrderAlias.objects.create(
+            payment=Payment.objects.get(midtrans_order_id='ORDER-2'), midtrans_order_id='ORDER-2-lama',
+        )
+        self.fake.transactions.update({'ORDER-3-lama': 'settlement', 'ORDER-2-lama': 'expire'})
+        outcome = self.run_reconcile()
+        self.assertEqual(outcome.checked, 6)
+        self.assertEqual(self.statuses()['ORDER-3'], 'success')
+        self.assertEqual(self.statuses()['ORDER-2'], 'pending')
+        self.assertEqual(Order.objects.get(payment=payment).status, 'paid')
+
+    def test_verifying_payment_not_cancelled(self):
+        payment = Payment.objects.get(midtrans_order_id='ORDER-1')
+        Payment.objects.filter(pk=payment.pk).update(status='verifying')
+        Order.objects.filter(payment=payment).update(status='processing')
+
+        outcome = self.run_reconcile()
+        self.assertEqual(outcome.results, {'applied': 2, 'ignored': 1})
+        payment.refresh_from_db()
+        self.assertEqual((payment.status, payment.midtrans_transaction_status), ('verifying', 'expire'))
+        self.assertEqual(Order.objects.get(payment=payment).status, 'processing')
+
+        # Status gateway sudah tercatat: rekonsiliasi berikutnya tidak menulis ulang
+        Payment.objects.filter(pk=payment.pk).update(updated_at=timezone.now() - timedelta(hours=2))
+        self.assertEqual(self.run_reconcile().results, {})
+
+    def test_command(self):
+        self.enterContext(self.settings(
+            MIDTRANS_API_URL=self.fake.url, MIDTRANS_SNAP_URL=self.fake.snap_url,
+        ))
+        reset_midtrans_client()
+        self.addCleanup(reset_midtrans_client)
+        out = StringIO()
+        call_command('reconcile_payments', stdout=out)
+        self.assertIn('4 payment dicek', out.getvalue())
+        self.assertIn('applied=3', out.getvalue())
@@ -0,0 +1,117 @@
+"""
+Snap token yang disiapkan sebelum halaman pembayaran dibuka.
+
+Checkout menjadwalkan prepare_snap_token (backend.tasks.run_in_background)
+setelah transaksi commit, sehingga round trip ke Midtrans berjalan saat
+customer masih di-redirect. Halaman pembayaran cukup membaca token yang
+sudah ada; jika belum siap, halaman tetap tampil dan JS mengambil token
+lewat endpoint payment_token.
+
+Token dianggap basi TOKEN_REFRESH_MARGIN sebelum midtrans_token_expires_at
+(customer butuh waktu untuk menyelesaikan pembayaran) dan diganti dengan
+token baru, tetapi hanya selama transaksinya belum dimulai: setelah
+customer membuat VA/QRIS (midtrans_transaction_status terisi) order ID
+tidak pernah diganti dan token lama dipakai sampai benar-benar
+kedaluwarsa. Order ID yang diganti dicatat di PaymentOrderAlias. Pembuatan token per payment dikunci di cache agar task
+background dan request halaman tidak membuat dua transaksi Snap sekaligus;
+pihak yang kalah menunggu token dari pemegang kunci.
+"""
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .gateway import GatewayUnavailable, call_timeout
+from .midtrans_service import MidtransService
+from .models import Payment
+
+TOKEN_REFRESH_MARGIN = timedelta(minutes=30)
+POLL_INTERVAL = 0.1  # detik
+
+
+def lock_key(payment_id):
+    return f'payments:snap-token:{payment_id}'
+
+
+def token_is_fresh(payment, now=None):
+    now = now or timezone.now()
+    return bool(
+        payment.midtrans_snap_token
+        and payment.midtrans_token_expires_at
+        and payment.midtrans_token_expires_at - TOKEN_REFRESH_MARGIN > now
+    )
+
+
+def transaction_started(payment):
+    """Customer sudah memilih metode pembayaran di Snap (webhook mencatat statusnya)"""
+    return bool(payment.midtrans_transaction_status)
+
+
+def usable_token(payment, now=None):
+    """Token untuk halaman pembayaran, atau '' jika harus dibuat (ulang)"""
+    now = now or timezone.now()
+    if token_is_fresh(payment, now):
+        return payment.midtrans_snap_token
+    if transaction_started(payment) and payment.midtrans_snap_token and (
+        payment.midtrans_token_expires_at is None or payment.midtrans_token_expires_at > now
+    ):
+        return payment.midtrans_snap_token
+    return ''
+
+
+def needs_token(payment):
+    """Hanya pembayaran yang masih menunggu dan belum dimulai yang perlu token Snap baru"""
+    return (
+        payment.status == 'pending'
+        and not transaction_started(payment)
+        and not token_is_fresh(payment)
+    )
+
+
+def ensure_snap_token(payment, wait=None):
+    """
+    Pastikan `payment` punya Snap token yang masih segar.
+
+    Jika payment lain (task background / request lain) sedang membuat token
+    untuk payment ini, tunggu maksimal `wait` detik (default: call_timeout()).
+
+    Returns:
+        payment (sudah di-refresh dari database)
+
+    Raises:
+        GatewayUnavailable jika token belum siap setelah menunggu; error
+        Midtrans diteruskan apa adanya.
+    """
+    wait = call_timeout() if wait is None else wait
+    deadline = time.monotonic() + wait
+    key = lock_key(payment.pk)
+    while needs_token(payment):
+        if cache.add(key, 1, call_timeout()):
+            try:
+                # Bisa saja sudah dibuat pemegang kunci sebelumnya
+                payment.refresh_from_db()
+                if needs_token(payment):
+                    try:
+                        MidtransService().create_transaction(payment.order, payment)
+                    except ValueError:
+                        # Webhook lebih dulu mencatat transaksi: token lama tetap dipakai
+                        payment.refresh_from_db()
+            finally:
+                cache.delete(key)
+            break
+        if time.monotonic() >= deadline:
+            raise GatewayUnavailable('Token pembayaran sedang disiapkan, silakan coba lagi')
+        time.sleep(POLL_INTERVAL)
+        payment.refresh_from_db()
+    return payment
+
+
+def prepare_snap_token(payment_id):
+    """Task background setelah checkout: buat token tanpa menunggu kunci"""
+    payment = Payment.objects.select_related('order').get(pk=payment_id)
+    try:
+        ensure_snap_token(payment, wait=0)
+    except GatewayUnavailable:
+        # Request lain sedang membuatnya, atau gateway mati: halaman akan mencoba lagi
+        pass
@@ -7,6 +7,7 @@ urlpatterns = [
     
     # Payment detail (Midtrans)
     path('<int:order_id>/', views.payment_detail, name='payment_detail'),
+    path('<int:order_id>/token/', views.payment_token, name='payment_token'),
     
     # Midtrans callbacks
     path('notification/', views.midtrans_notification, name='midtrans_notification'),
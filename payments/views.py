@@ -4,17 +4,31 @@ from django.contrib import messages
 from django.views.decorators.csrf import csrf_exempt
 from django.http import JsonResponse, HttpResponse
 from django.conf import settings
+from django.db.models import Q
 import json
 
 from .models import Payment
 from orders.models import Order
 from .midtrans_service import MidtransService
+from .inbox import enqueue_notification
+from .status import transaction_status
+from .tokens import ensure_snap_token, needs_token, prepare_snap_token, usable_token
+from backend.tasks import run_in_background
+from backend.pagination import paginate_keyset
+
+PAYMENT_PAGE_SIZE = 20
+PAYMENT_LIST_ORDERING = ['-payment_date', '-id']
 
 
 @login_required
 def payment_detail(request, order_id):
     """
     Halaman pembayaran dengan Midtrans Snap
+
+    Snap token biasanya sudah disiapkan di background sejak checkout
+    (payments.tokens). Jika belum siap atau hampir kedaluwarsa, halaman
+    tetap tampil tanpa menunggu Midtrans; JS mengambil token dari
+    payment_token.
     """
     order = get_object_or_404(Order, id=order_id, user=request.user)
     
@@ -28,160 +42,160 @@ def payment_detail(request, order_id):
             amount=order.total,
         )
     
-    # Generate Snap Token jika belum ada
-    if not payment.midtrans_snap_token:
-        try:
-            midtrans = MidtransService()
-            transaction = midtrans.create_transaction(order, payment)
-            payment.midtrans_snap_token = transaction['snap_token']
-            payment.midtrans_order_id = transaction['order_id']
-            payment.save()
-        except Exception as e:
-            messages.error(request, f'Gagal membuat pembayaran: {str(e)}')
-            return redirect('order_detail', order_id=order.id)
+    if needs_token(payment):
+        run_in_background(prepare_snap_token, payment.pk)
     
     context = {
         'order': order,
         'payment': payment,
+        'snap_token': usable_token(payment),
         'midtrans_client_key': settings.MIDTRANS_CLIENT_KEY,
         'midtrans_environment': 'sandbox' if not settings.MIDTRANS_IS_PRODUCTION else 'api',
     }
     return render(request, 'payments/payment_midtrans.html', context)
 
 
+@login_required
+def payment_token(request, order_id):
+    """
+    Snap token (JSON) untuk halaman pembayaran.
+
+    Menunggu token yang sedang dibuat di background, atau membuatnya
+    sendiri jika belum ada / hampir kedaluwarsa.
+    """
+    payment = get_object_or_404(
+        Payment.objects.select_related('order'), order_id=order_id, order__user=request.user
+    )
+    try:
+        payment = ensure_snap_token(payment)
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': f'Gagal membuat pembayaran: {e}'}, status=503)
+    token = usable_token(payment)
+    if not token:
+        return JsonResponse({'status': 'error', 'message': 'Pembayaran ini sudah tidak menunggu pembayaran'}, status=409)
+    expires_at = payment.midtrans_token_expires_at
+    return JsonResponse({
+        'status': 'success',
+        'token': token,
+        'expires_at': expires_at.isoformat() if expires_at else None,
+    })
+
+
 @csrf_exempt
 def midtrans_notification(request):
     """
     Webhook untuk notifikasi dari Midtrans
     Dipanggil otomatis oleh Midtrans saat ada perubahan status pembayaran
+
+    Hanya verifikasi signature lalu simpan ke inbox (payments.inbox) dan
+    langsung jawab 200; status Payment/Order diubah oleh worker
+    `manage.py process_payment_notifications`.
     """
     if request.method != 'POST':
         return HttpResponse('Method not allowed', status=405)
     
     try:
-        # Parse notification body
         notification = json.loads(request.body)
-        
-        order_id = notification.get('order_id')
-        transaction_status = notification.get('transaction_status')
-        fraud_status = notification.get('fraud_status', 'accept')
-        signature_key = notification.get('signature_key')
-        
-        # Verify signature
-        midtrans = MidtransService()
-        gross_amount = notification.get('gross_amount')
-        status_code = notification.get('status_code')
-        
-        expected_signature = midtrans.verify_signature(
-            order_id, status_code, gross_amount, settings.MIDTRANS_SERVER_KEY
-        )
-        
-        if signature_key != expected_signature:
-            return JsonResponse({'status': 'error', 'message': 'Invalid signature'}, status=403)
-        
-        # Get payment object
-        try:
-            payment = Payment.objects.get(midtrans_order_id=order_id)
-        except Payment.DoesNotExist:
-            return JsonResponse({'status': 'error', 'message': 'Payment not found'}, status=404)
-        
-        # Update payment details
-        payment.midtrans_transaction_id = notification.get('transaction_id')
-        payment.midtrans_transaction_status = transaction_status
-        payment.midtrans_payment_type = notification.get('payment_type')
-        payment.midtrans_response = notification
-        
-        # Handle transaction status
-        if transaction_status == 'capture':
-            if fraud_status == 'accept':
-                payment.mark_as_success()
-        elif transaction_status == 'settlement':
-            payment.mark_as_success()
-        elif transaction_status == 'pending':
-            payment.status = 'pending'
-            payment.save()
-        elif transaction_status in ['deny', 'cancel']:
-            payment.mark_as_failed(f'Transaction {transaction_status}')
-        elif transaction_status == 'expire':
-            payment.mark_as_expired()
-        
-        return JsonResponse({'status': 'success'})
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid JSON'}, status=400)
+    if not isinstance(notification, dict) or not notification.get('order_id'):
+        return JsonResponse({'status': 'error', 'message': 'Invalid notification'}, status=400)
     
-    except Exception as e:
-        print(f"Error processing Midtrans notification: {str(e)}")
-        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+    expected_signature = MidtransService.verify_signature(
+        notification.get('order_id'),
+        notification.get('status_code'),
+        notification.get('gross_amount'),
+        settings.MIDTRANS_SERVER_KEY,
+    )
+    if notification.get('signature_key') != expected_signature:
+        return JsonResponse({'status': 'error', 'message': 'Invalid signature'}, status=403)
+    
+    enqueue_notification(notification)
+    return JsonResponse({'status': 'success'})
+
+
+def _redirect_payment(request):
+    """Payment dari ?order_id= (order ID Midtrans, termasuk order ID lama) pada redirect Snap"""
+    order_id = request.GET.get('order_id')
+    if not order_id:
+        return None
+    return Payment.objects.filter(
+        Q(midtrans_order_id=order_id) | Q(order_aliases__midtrans_order_id=order_id)
+    ).first()
+
+
+def _show_transaction_status(request, transaction_status):
+    if transaction_status in ['capture', 'settlement']:
+        messages.success(request, '✅ Pembayaran berhasil! Pesanan sedang diproses.')
+    elif transaction_status == 'pending':
+        messages.info(request, '⏳ Pembayaran pending. Silakan selesaikan pembayaran Anda.')
+    else:
+        messages.warning(request, f'Status pembayaran: {transaction_status}')
 
 
 @login_required
 def payment_finish(request):
-    """Halaman setelah pembayaran selesai (redirect dari Midtrans)"""
-    order_id = request.GET.get('order_id')
-    
-    if order_id:
-        try:
-            payment = Payment.objects.get(midtrans_order_id=order_id)
-            
-            # Check status dari Midtrans
-            midtrans = MidtransService()
-            status = midtrans.get_transaction_status(order_id)
-            
-            if status:
-                transaction_status = status.get('transaction_status')
-                
-                if transaction_status in ['capture', 'settlement']:
-                    messages.success(request, '✅ Pembayaran berhasil! Pesanan sedang diproses.')
-                elif transaction_status == 'pending':
-                    messages.info(request, '⏳ Pembayaran pending. Silakan selesaikan pembayaran Anda.')
-                else:
-                    messages.warning(request, f'Status pembayaran: {transaction_status}')
-            
-            return redirect('order_detail', order_id=payment.order.id)
-        
-        except Payment.DoesNotExist:
+    """
+    Halaman setelah pembayaran selesai (redirect dari Midtrans)
+
+    Status dari webhook dipakai lebih dulu; Midtrans hanya ditanya jika
+    webhook belum mencatat status final (payments.status).
+    """
+    payment = _redirect_payment(request)
+    if payment is None:
+        if request.GET.get('order_id'):
             messages.error(request, 'Payment tidak ditemukan')
+        return redirect('order_list')
     
-    return redirect('order_list')
+    status = transaction_status(payment)
+    if status:
+        _show_transaction_status(request, status)
+    return redirect('order_detail', order_id=payment.order_id)
 
 
 @login_required
 def payment_error(request):
     """Halaman saat pembayaran error"""
-    messages.error(request, '❌ Pembayaran gagal. Silakan coba lagi.')
-    
-    order_id = request.GET.get('order_id')
-    if order_id:
-        try:
-            payment = Payment.objects.get(midtrans_order_id=order_id)
-            return redirect('payment_detail', order_id=payment.order.id)
-        except Payment.DoesNotExist:
-            pass
+    payment = _redirect_payment(request)
+    if payment is not None and transaction_status(payment) in ['capture', 'settlement']:
+        # Webhook sudah mencatat pembayaran berhasil (mis. percobaan ulang di Snap)
+        _show_transaction_status(request, 'settlement')
+        return redirect('order_detail', order_id=payment.order_id)
     
+    messages.error(request, '❌ Pembayaran gagal. Silakan coba lagi.')
+    if payment is not None:
+        return redirect('payment_detail', order_id=payment.order_id)
     return redirect('order_list')
 
 
 @login_required
 def payment_pending(request):
     """Halaman saat pembayaran pending"""
-    messages.info(request, '⏳ Pembayaran pending. Silakan selesaikan pembayaran Anda.')
+    payment = _redirect_payment(request)
+    if payment is None:
+        messages.info(request, '⏳ Pembayaran pending. Silakan selesaikan pembayaran Anda.')
+        return redirect('order_list')
     
-    order_id = request.GET.get('order_id')
-    if order_id:
-        try:
-            payment = Payment.objects.get(midtrans_order_id=order_id)
-            return redirect('order_detail', order_id=payment.order.id)
-        except Payment.DoesNotExist:
-            pass
-    
-    return redirect('order_list')
+    _show_transaction_status(request, transaction_status(payment) or 'pending')
+    return redirect('order_detail', order_id=payment.order_id)
 
 
 @login_required
 def payment_list(request):
-    """Daftar pembayaran user"""
-    payments = Payment.objects.filter(order__user=request.user).order_by('-payment_date')
+    """
+    Daftar pembayaran user, terbaru dulu.
+
+    Order ikut di-JOIN (select_related) agar nomor order tidak memicu
+    query per baris; halaman berikutnya lewat ?cursor= (payment_date, id).
+    """
+    payments = Payment.objects.filter(order__user=request.user).select_related('order')
+    page = paginate_keyset(
+        payments, PAYMENT_LIST_ORDERING, request.GET.get('cursor'), PAYMENT_PAGE_SIZE
+    )
     
     context = {
-        'payments': payments,
+        'payments': page.items,
+        'page': page,
     }
     return render(request, 'payments/payment_list.html', context)
 
@@ -1,12 +1,72 @@
 from django.contrib import admin
+from django.contrib.admin.utils import unquote
+from django.core.exceptions import PermissionDenied
+from django.db.models import Count
+from django.forms.models import BaseInlineFormSet
+from django.http import QueryDict
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
 from django.utils.html import format_html
+from .catalog import catalog_changed
+from .forms import CategoryBulkUpdateForm
 from .models import Category, Product, Review
+from .ratings import rebuild_rating_stats
+
+
+class PaginatedInlineFormSet(BaseInlineFormSet):
+    """
+    Inline formset yang hanya memuat satu halaman objek.
+
+    Halaman diambil dari ?inline_page= (diset oleh ProductInline.get_formset),
+    sehingga kategori dengan ribuan produk tetap ringan dibuka.
+    """
+    per_page = 20
+    page = 1
+    # Query string halaman change form (mis. _changelist_filters), dipertahankan di link halaman
+    query_params = QueryDict()
+
+    def get_queryset(self):
+        if not hasattr(self, '_page_queryset'):
+            queryset = super().get_queryset()
+            self.total_count = queryset.count()
+            self.num_pages = max(1, -(-self.total_count // self.per_page))
+            self.page = min(max(1, self.page), self.num_pages)
+            start = (self.page - 1) * self.per_page
+            page_ids = list(queryset.values_list('pk', flat=True)[start:start + self.per_page])
+            self._page_queryset = queryset.filter(pk__in=page_ids)
+        return self._page_queryset
+
+    def page_range(self):
+        return range(1, self.num_pages + 1)
+
+    def page_links(self):
+        """List (nomor halaman, query string) untuk navigasi inline"""
+        params = self.query_params.copy()
+        links = []
+        for number in self.page_range():
+            params['inline_page'] = number
+            links.append((number, params.urlencode()))
+        return links
 
 
 class ProductInline(admin.TabularInline):
     model = Product
+    formset = PaginatedInlineFormSet
     extra = 0
-    fields = ['name', 'price', 'stock', 'status', 'image']
+    fields = ['name', 'price', 'stock', 'status']
+    show_change_link = True
+    template = 'admin/products/category/product_inline.html'
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.query_params = request.GET.copy()
+        try:
+            formset.page = int(request.GET.get('inline_page', 1))
+        except ValueError:
+            formset.page = 1
+        return formset
 
 
 @admin.register(Category)
@@ -16,10 +76,60 @@ class CategoryAdmin(admin.ModelAdmin):
     search_fields = ['name', 'description']
     prepopulated_fields = {'slug': ('name',)}
     inlines = [ProductInline]
+    change_form_template = 'admin/products/category/change_form.html'
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(product_total=Count('products'))
     
     def product_count(self, obj):
-        return obj.products.count()
+        return obj.product_total
     product_count.short_description = 'Total Products'
+    product_count.admin_order_field = 'product_total'
+    
+    def get_urls(self):
+        urls = [
+            path(
+                '<path:object_id>/bulk-update/',
+                self.admin_site.admin_view(self.bulk_update_view),
+                name='products_category_bulk_update',
+            ),
+        ]
+        return urls + super().get_urls()
+    
+    def bulk_update_view(self, request, object_id):
+        """Ubah harga/stok/status semua produk kategori dengan satu UPDATE"""
+        category = self.get_object(request, unquote(object_id))
+        if category is None:
+            return self._get_obj_does_not_exist_redirect(request, self.opts, object_id)
+        if not (self.has_change_permission(request, category)
+                and request.user.has_perm('products.change_product')):
+            raise PermissionDenied
+        
+        if request.method == 'POST':
+            form = CategoryBulkUpdateForm(request.POST)
+            if form.is_valid():
+                products = Product.objects.filter(category=category)
+                product_ids = list(products.values_list('pk', flat=True))
+                updated = products.update(updated_at=timezone.now(), **form.get_update_kwargs())
+                catalog_changed(product_ids)
+                self.message_user(
+                    request, f'{updated} produk di kategori "{category}" berhasil diperbarui.'
+                )
+                return redirect('admin:products_category_change', category.pk)
+        else:
+            form = CategoryBulkUpdateForm()
+        
+        context = {
+            **self.admin_site.each_context(request),
+            'title': f'Bulk update produk: {category}',
+            'opts': self.opts,
+            'object': category,
+            'form': form,
+            'product_total': category.product_total,
+        }
+        return TemplateResponse(
+            request, 'admin/products/category/bulk_update.html', context
+        )
 
 
 @admin.register(Product)
@@ -30,6 +140,7 @@ class ProductAdmin(admin.ModelAdmin):
     search_fields = ['name', 'description']
     prepopulated_fields = {'slug': ('name',)}
     list_editable = ['status', 'is_featured']
+    list_select_related = ['category']
     readonly_fields = ['image_preview', 'created_at', 'updated_at', 'rating_summary']
     
     fieldsets = (
@@ -60,7 +171,7 @@ class ProductAdmin(admin.ModelAdmin):
     formatted_price_display.admin_order_field = 'price'
     
     def average_rating(self, obj):
-        """Tampilkan rating rata-rata di list"""
+        """Tampilkan rating rata-rata di list (dari kolom statistik, tanpa query)"""
         avg = obj.get_average_rating()
         count = obj.get_review_count()
         if avg > 0:
@@ -71,6 +182,7 @@ class ProductAdmin(admin.ModelAdmin):
             )
         return format_html('<span style="color: #999;">Belum ada review</span>')
     average_rating.short_description = 'Rating'
+    average_rating.admin_order_field = 'rating_average'
     
     def rating_summary(self, obj):
         """Tampilkan detail rating di form"""
@@ -78,11 +190,7 @@ class ProductAdmin(admin.ModelAdmin):
         count = obj.get_review_count()
         
         if count > 0:
-            # Hitung distribusi rating
-            reviews = obj.reviews.filter(is_approved=True)
-            rating_counts = {i: 0 for i in range(1, 6)}
-            for review in reviews:
-                rating_counts[review.rating] += 1
+            rating_counts = obj.get_rating_distribution()
             
             html = f'<div style="font-family: monospace;">'
             html += f'<h3>Rating Summary</h3>'
@@ -117,15 +225,23 @@ class ProductAdmin(admin.ModelAdmin):
     image_preview.short_description = 'Preview'
     
     def make_active(self, request, queryset):
-        queryset.update(status='active')
+        # Ambil id sebelum update: changelist yang difilter pada field ini
+        # akan kosong jika queryset dievaluasi ulang setelahnya
+        product_ids = list(queryset.values_list('pk', flat=True))
+        queryset.update(status='active', updated_at=timezone.now())
+        catalog_changed(product_ids)
     make_active.short_description = "Mark selected as Active"
     
     def make_inactive(self, request, queryset):
-        queryset.update(status='inactive')
+        product_ids = list(queryset.values_list('pk', flat=True))
+        queryset.update(status='inactive', updated_at=timezone.now())
+        catalog_changed(product_ids)
     make_inactive.short_description = "Mark selected as Inactive"
     
     def make_featured(self, request, queryset):
-        queryset.update(is_featured=True)
+        product_ids = list(queryset.values_list('pk', flat=True))
+        queryset.update(is_featured=True, updated_at=timezone.now())
+        catalog_changed(product_ids)
     make_featured.short_description = "Mark as Featured"
 
 
@@ -135,6 +251,7 @@ class ReviewAdmin(admin.ModelAdmin):
     list_filter = ['rating', 'is_approved', 'created_at']
     search_fields = ['user__username', 'product__name', 'comment']
     list_editable = ['is_approved']
+    list_select_related = ['user', 'product']
     readonly_fields = ['user', 'product', 'rating', 'comment', 'created_at', 'updated_at']
     
     fieldsets = (
@@ -170,11 +287,17 @@ class ReviewAdmin(admin.ModelAdmin):
     rating_display.short_description = 'Rating'
     
     def approve_reviews(self, request, queryset):
-        updated = queryset.update(is_approved=True)
+        product_ids = set(queryset.filter(is_approved=False).values_list('product_id', flat=True))
+        updated = queryset.update(is_approved=True, updated_at=timezone.now())
+        rebuild_rating_stats(product_ids)
+        catalog_changed(product_ids)
         self.message_user(request, f'{updated} review berhasil diapprove.')
     approve_reviews.short_description = "✅ Approve selected reviews"
     
     def reject_reviews(self, request, queryset):
-        updated = queryset.update(is_approved=False)
+        product_ids = set(queryset.filter(is_approved=True).values_list('product_id', flat=True))
+        updated = queryset.update(is_approved=False, updated_at=timezone.now())
+        rebuild_rating_stats(product_ids)
+        catalog_changed(product_ids)
         self.message_user(request, f'{updated} review berhasil direject.')
     reject_reviews.short_description = "❌ Reject selected reviews"
\ No newline at end of file
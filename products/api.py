@@ -0,0 +1,149 @@
+"""
+Snapshot katalog dalam satu dokumen JSON untuk menu page dan mobile app.
+
+Dokumen dibangun dari values() (tanpa instance model), lalu disimpan di
+cache beserta versi gzip/brotli-nya, satu kali per versi katalog. ETag
+dihitung dari max(updated_at) + jumlah baris Product, Category dan Review,
+sehingga client yang datanya masih sama mendapat 304 tanpa dokumen
+diserialisasi ulang. Agregat itu di-cache per versi katalog
+(products.catalog), jadi tidak dihitung ulang di setiap request.
+"""
+import gzip
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db.models import Count, Max
+
+from .catalog import get_catalog_version
+from .models import Category, Product, Review
+
+try:
+    import brotli
+except ImportError:  # brotli opsional
+    brotli = None
+
+SCHEMA_VERSION = 1
+DOCUMENT_TIMEOUT = 60 * 60 * 24
+
+PRODUCT_FIELDS = (
+    'id', 'category_id', 'name', 'slug', 'description', 'price', 'stock', 'status',
+    'is_featured', 'image', 'rating_average', 'rating_count',
+    'rating_1_count', 'rating_2_count', 'rating_3_count', 'rating_4_count', 'rating_5_count',
+)
+
+
+def catalog_state():
+    """
+    (etag, last_modified) katalog saat ini.
+
+    Di-cache dengan key versi katalog: perubahan katalog lewat signal/admin
+    mengganti versi sehingga state dihitung ulang. Perubahan dari proses lain
+    tanpa cache bersama terlihat paling lambat setelah
+    settings.CATALOG_PAGE_CACHE_TIMEOUT.
+    """
+    key = f'catalog-api:state:{get_catalog_version()}'
+    state = cache.get(key)
+    if state is None:
+        state = compute_catalog_state()
+        cache.set(key, state, settings.CATALOG_PAGE_CACHE_TIMEOUT)
+    return state
+
+
+def compute_catalog_state():
+    """
+    Hitung (etag, last_modified) dari tabel: tiga agregat COUNT + MAX.
+
+    Jumlah baris ikut dihitung karena penghapusan tidak menggeser max(updated_at).
+    """
+    parts = []
+    last_modified = None
+    for model in (Product, Category, Review):
+        state = model.objects.aggregate(last=Max('updated_at'), total=Count('pk'))
+        parts.append(f"{state['total']}:{state['last'].isoformat() if state['last'] else '-'}")
+        if state['last'] and (last_modified is None or state['last'] > last_modified):
+            last_modified = state['last']
+    etag = hashlib.md5('|'.join([str(SCHEMA_VERSION)] + parts).encode()).hexdigest()
+    return etag, last_modified
+
+
+def build_document(version):
+    categories = list(
+        Category.objects.filter(is_active=True).values('id', 'name', 'slug').order_by('name')
+    )
+    products = []
+    rows = (
+        Product.objects.exclude(status='inactive')
+        .order_by('-created_at', '-id')
+        .values(*PRODUCT_FIELDS)
+    )
+    for row in rows:
+        products.append({
+            'id': row['id'],
+            'category': row['category_id'],
+            'name': row['name'],
+            'slug': row['slug'],
+            'description': row['description'],
+            'price': int(row['price']),
+            'stock': row['stock'],
+            'status': row['status'],
+            'featured': row['is_featured'],
+            'image': default_storage.url(row['image']) if row['image'] else None,
+            'rating': {
+                'average': round(row['rating_average'], 1) if row['rating_count'] else 0,
+                'count': row['rating_count'],
+                'distribution': [row[f'rating_{rating}_count'] for rating in range(1, 6)],
+            },
+        })
+    return {
+        'schema': SCHEMA_VERSION,
+        'version': version,
+        'categories': categories,
+        'products': products,
+    }
+
+
+def get_encoded_document(version):
+    """
+    Dokumen terkompresi untuk `version`, dibangun sekali lalu di-cache.
+
+    Returns:
+        dict encoding -> bytes ('identity', 'gzip', dan 'br' jika tersedia)
+    """
+    key = f'catalog-api:{version}'
+    encoded = cache.get(key)
+    if encoded is None:
+        body = json.dumps(
+            build_document(version), separators=(',', ':'), ensure_ascii=False
+        ).encode()
+        encoded = {
+            'identity': body,
+            'gzip': gzip.compress(body, compresslevel=9, mtime=0),
+        }
+        if brotli is not None:
+            encoded['br'] = brotli.compress(body, quality=11)
+        cache.set(key, encoded, DOCUMENT_TIMEOUT)
+    return encoded
+
+
+def choose_encoding(accept_encoding, available):
+    """Pilih encoding terbaik yang diterima client (mengabaikan q=0)"""
+    accepted = set()
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name and quality > 0:
+            accepted.add(name.strip().lower())
+
+    for encoding in ('br', 'gzip'):
+        if encoding in accepted and encoding in available:
+            return encoding
+    return 'identity'
@@ -0,0 +1,140 @@
+"""
+Fragment cache untuk kartu produk di menu.html dan home.html.
+
+Setiap kartu disimpan di cache dengan key
+    product-card:<generation>:<template>:<product_id>:<version>:<popular>
+
+`version` per produk disimpan terpisah dan di-invalidate oleh signal
+Product/Category/Review, sehingga hanya kartu yang berubah yang dirender
+ulang. `generation` global dipakai untuk membuang semua kartu sekaligus
+(mis. setelah rebuild statistik rating).
+
+Satu halaman hanya butuh dua get_many (versi + fragment), berapa pun
+jumlah kartunya.
+
+Invalidasi hanya berlaku lintas worker jika cache-nya bersama (REDIS_URL);
+tanpa itu umur fragment dibatasi settings.PRODUCT_CARD_CACHE_TIMEOUT.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+VERSION_TIMEOUT = None  # versi tidak pernah kedaluwarsa sendiri
+GENERATION_KEY = 'product-card:generation'
+HITS_KEY = 'product-card:hits'
+MISSES_KEY = 'product-card:misses'
+
+
+def _version_key(product_id):
+    return f'product-card:version:{product_id}'
+
+
+def _new_token():
+    return uuid.uuid4().hex[:12]
+
+
+def _get_or_create(key, current=None):
+    """Ambil token dari cache; jika tidak ada, buat token baru secara atomik"""
+    if current is not None:
+        return current
+    token = _new_token()
+    if not cache.add(key, token, VERSION_TIMEOUT):
+        token = cache.get(key) or token
+    return token
+
+
+def _incr(key, delta):
+    if not delta:
+        return
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        if not cache.add(key, delta, None):
+            cache.incr(key, delta)
+
+
+def get_versions(product_ids):
+    """Versi kartu untuk banyak produk dalam satu get_many"""
+    keys = {product_id: _version_key(product_id) for product_id in product_ids}
+    found = cache.get_many(list(keys.values()) + [GENERATION_KEY])
+    generation = _get_or_create(GENERATION_KEY, found.get(GENERATION_KEY))
+    versions = {
+        product_id: _get_or_create(key, found.get(key))
+        for product_id, key in keys.items()
+    }
+    return generation, versions
+
+
+def invalidate_products(product_ids):
+    """Paksa render ulang kartu produk tertentu"""
+    cache.delete_many([_version_key(product_id) for product_id in product_ids])
+
+
+def invalidate_all():
+    """Buang semua kartu produk (ganti generation)"""
+    cache.set(GENERATION_KEY, _new_token(), None)
+
+
+def render_product_cards(products, template_name, popular_count=0):
+    """
+    Render kartu untuk list produk, memakai cache jika versinya cocok.
+
+    Args:
+        products: iterable Product (category sebaiknya sudah select_related)
+        template_name: template satu kartu, menerima `product` dan `popular`
+        popular_count: N kartu pertama yang mendapat badge "Populer"
+
+    Returns:
+        SafeString HTML semua kartu
+    """
+    products = list(products)
+    if not products:
+        return ''
+
+    generation, versions = get_versions([product.pk for product in products])
+    keys = [
+        f'product-card:{generation}:{template_name}:{product.pk}:'
+        f'{versions[product.pk]}:{int(index < popular_count)}'
+        for index, product in enumerate(products)
+    ]
+    cached = cache.get_many(keys)
+
+    template = None
+    rendered = {}
+    fragments = []
+    for index, (product, key) in enumerate(zip(products, keys)):
+        html = cached.get(key)
+        if html is None:
+            if template is None:
+                template = get_template(template_name)
+            # Tanpa request: isi kartu harus sama untuk semua user
+            html = template.render({'product': product, 'popular': index < popular_count})
+            rendered[key] = html
+        fragments.append(html)
+
+    if rendered:
+        cache.set_many(rendered, settings.PRODUCT_CARD_CACHE_TIMEOUT)
+    _incr(HITS_KEY, len(cached))
+    _incr(MISSES_KEY, len(rendered))
+
+    return mark_safe(''.join(fragments))
+
+
+def get_stats():
+    """Hit/miss kumulatif (dibagi oleh semua proses yang memakai cache yang sama)"""
+    stats = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits = stats.get(HITS_KEY, 0)
+    misses = stats.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / total if total else 0.0,
+    }
+
+
+def reset_stats():
+    cache.delete_many([HITS_KEY, MISSES_KEY])
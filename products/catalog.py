@@ -0,0 +1,132 @@
+"""
+Versi katalog global + cache full-response untuk halaman publik.
+
+Versi katalog berganti setiap ada perubahan Product/Category/Review
+(lewat signal dan bulk action admin), sehingga semua halaman yang
+di-cache dengan versi lama otomatis tidak terpakai lagi. Versi disimpan di
+cache default: tanpa cache bersama (REDIS_URL) versi baru hanya terlihat di
+proses yang mengubah data, jadi umur halaman dibatasi
+settings.CATALOG_PAGE_CACHE_TIMEOUT.
+"""
+import hashlib
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+from . import card_cache
+
+CATALOG_VERSION_KEY = 'catalog:version'
+# Berapa lama proxy/browser boleh memakai response tanpa revalidasi
+PROXY_MAX_AGE = 60
+# Sama dengan cart.guest.COOKIE_NAME
+GUEST_CART_COOKIE = 'guest_cart'
+
+
+def get_catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex[:12]
+        if not cache.add(CATALOG_VERSION_KEY, version, None):
+            version = cache.get(CATALOG_VERSION_KEY) or version
+    return version
+
+
+def bump_catalog_version():
+    cache.set(CATALOG_VERSION_KEY, uuid.uuid4().hex[:12], None)
+
+
+def catalog_changed(product_ids=None):
+    """
+    Dipanggil setiap data katalog yang tampil di halaman berubah.
+
+    Args:
+        product_ids: produk yang kartunya perlu dirender ulang,
+                     None = semua kartu
+    """
+    if product_ids is None:
+        card_cache.invalidate_all()
+    else:
+        card_cache.invalidate_products(product_ids)
+    bump_catalog_version()
+
+
+def _is_cacheable_request(request):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if request.user.is_authenticated:
+        return False
+    # Tamu dengan keranjang cookie melihat badge cart di navbar
+    if GUEST_CART_COOKIE in request.COOKIES:
+        return False
+    # Pesan flash (mis. "Anda telah berhasil keluar") khusus untuk satu visitor
+    return len(get_messages(request)) == 0
+
+
+def _is_cacheable_response(request, response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        # Halaman yang memakai {% csrf_token %} berisi token per visitor
+        and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+    )
+
+
+def _page_key(request):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'page:{get_catalog_version()}:{path}'
+
+
+def _etag_matches(request, etag):
+    if_none_match = request.headers.get('If-None-Match', '')
+    return etag in [tag.strip() for tag in if_none_match.split(',')]
+
+
+def _patch_public_headers(response, etag):
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=PROXY_MAX_AGE)
+    # User yang login mendapat halaman berbeda (navbar, cart)
+    patch_vary_headers(response, ('Cookie',))
+
+
+def cache_anonymous_page(view):
+    """
+    Cache full-response untuk visitor anonim, dengan key versi katalog.
+
+    Visitor yang login, punya pesan flash, atau response yang memakai
+    CSRF/cookie selalu dirender biasa.
+    """
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if not _is_cacheable_request(request):
+            return view(request, *args, **kwargs)
+
+        key = _page_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type, etag = cached
+            if _etag_matches(request, etag):
+                response = HttpResponseNotModified()
+            else:
+                response = HttpResponse(content, content_type=content_type)
+            _patch_public_headers(response, etag)
+            return response
+
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render') and callable(response.render):
+            response = response.render()
+        if _is_cacheable_response(request, response):
+            etag = f'"{hashlib.md5(response.content).hexdigest()}"'
+            cache.set(
+                key, (response.content, response['Content-Type'], etag),
+                settings.CATALOG_PAGE_CACHE_TIMEOUT,
+            )
+            _patch_public_headers(response, etag)
+        return response
+
+    return wrapped
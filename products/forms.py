@@ -0,0 +1,54 @@
+from decimal import Decimal
+
+from django import forms
+from django.db.models import F, Value
+from django.db.models.functions import Greatest, Round
+
+from .models import Product
+
+
+class CategoryBulkUpdateForm(forms.Form):
+    """Ubah harga/stok/status semua produk dalam satu kategori sekaligus"""
+    status = forms.ChoiceField(
+        choices=[('', '— Tidak diubah —')] + Product.STATUS_CHOICES,
+        required=False,
+        label='Status',
+    )
+    stock = forms.IntegerField(
+        min_value=0, required=False, label='Stok',
+        help_text='Stok 0 otomatis mengubah status menjadi Out of Stock.',
+    )
+    # Sama dengan Product.price: rupiah bulat, tanpa sen
+    price = forms.DecimalField(
+        min_value=0, max_digits=12, decimal_places=0, required=False, label='Harga baru',
+    )
+    price_percent = forms.DecimalField(
+        min_value=-99, max_value=1000, max_digits=6, decimal_places=2, required=False,
+        label='Ubah harga (%)',
+        help_text='Contoh: 10 untuk naik 10%, -15 untuk diskon 15%. Dibulatkan ke rupiah.',
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('price') is not None and cleaned_data.get('price_percent') is not None:
+            raise forms.ValidationError('Pilih salah satu: harga baru atau persentase perubahan harga.')
+        if not self.get_update_kwargs():
+            raise forms.ValidationError('Isi minimal satu perubahan.')
+        return cleaned_data
+
+    def get_update_kwargs(self):
+        """Argumen untuk QuerySet.update() dari data yang diisi"""
+        data = getattr(self, 'cleaned_data', {})
+        kwargs = {}
+        if data.get('status'):
+            kwargs['status'] = data['status']
+        if data.get('stock') is not None:
+            kwargs['stock'] = data['stock']
+            if data['stock'] == 0:
+                kwargs['status'] = 'out_of_stock'
+        if data.get('price') is not None:
+            kwargs['price'] = data['price']
+        elif data.get('price_percent') is not None:
+            factor = Decimal(1) + data['price_percent'] / Decimal(100)
+            kwargs['price'] = Greatest(Round(F('price') * Value(factor)), Value(Decimal(0)))
+        return kwargs
@@ -0,0 +1,145 @@
+"""
+Turunan gambar produk (responsive images).
+
+Setiap upload Product.image dibuatkan versi WebP dan JPEG di beberapa
+lebar, tanpa metadata EXIF, dengan hash di nama file:
+
+    products/derivatives/ab/ab12cd34ef56..-640w.webp
+
+Hash mencakup isi gambar dan parameter encoding (WIDTHS, FORMATS), jadi
+nama file aman di-cache selamanya oleh browser/CDN, gambar identik tidak
+diproses dua kali, dan perubahan lebar/kualitas menghasilkan file baru.
+Hasilnya dicatat di Product.image_variants dan dipakai template lewat
+{% product_picture %}.
+"""
+import hashlib
+import io
+import logging
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from backend.tasks import run_in_background
+
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+WIDTHS = (320, 640, 960, 1280)
+DERIVATIVE_DIR = 'products/derivatives'
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 6}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def _prepare(source):
+    """Terapkan orientasi EXIF lalu buang semua metadata"""
+    image = ImageOps.exif_transpose(source)
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+    image.info.clear()
+    return image
+
+
+def _target_widths(original_width):
+    widths = [width for width in WIDTHS if width < original_width]
+    # Selalu sediakan minimal satu versi, maksimal selebar aslinya
+    widths.append(min(original_width, WIDTHS[-1]))
+    return sorted(set(widths))
+
+
+def _digest(data):
+    """Hash isi gambar + parameter encoding"""
+    digest = hashlib.sha256(data)
+    encoding = [list(WIDTHS)] + [
+        [extension, pil_format, sorted(options.items())]
+        for extension, (pil_format, options) in sorted(FORMATS.items())
+    ]
+    digest.update(repr(encoding).encode())
+    return digest.hexdigest()[:20]
+
+
+def build_derivatives(data, force=False):
+    """
+    Buat file turunan dari bytes gambar asli.
+
+    Args:
+        force: tulis ulang file walau nama yang sama sudah ada di storage
+
+    Returns:
+        dict untuk Product.image_variants (tanpa key 'source')
+    """
+    digest = _digest(data)
+    with Image.open(io.BytesIO(data)) as source:
+        image = _prepare(source)
+
+    variants = {'hash': digest, 'width': image.width, 'height': image.height}
+    for extension, (pil_format, options) in FORMATS.items():
+        entries = []
+        for width in _target_widths(image.width):
+            name = f'{DERIVATIVE_DIR}/{digest[:2]}/{digest}-{width}w.{extension}'
+            exists = default_storage.exists(name)
+            if exists and force:
+                default_storage.delete(name)
+            if force or not exists:
+                resized = image
+                if width < image.width:
+                    height = round(image.height * width / image.width)
+                    resized = image.resize((width, height), Image.LANCZOS)
+                buffer = io.BytesIO()
+                resized.save(buffer, pil_format, **options)
+                name = default_storage.save(name, ContentFile(buffer.getvalue()))
+            entries.append([width, name])
+        variants[extension] = entries
+    return variants
+
+
+def generate_derivatives(product_id, force=False):
+    """
+    Generate turunan untuk satu produk. Aman dipanggil berulang.
+
+    Returns:
+        bool: True jika image_variants diperbarui
+    """
+    from .catalog import catalog_changed
+
+    product = Product.objects.filter(pk=product_id).only('pk', 'image', 'image_variants').first()
+    if product is None or not product.image:
+        return False
+    source_name = product.image.name
+    if not force and product.image_variants.get('source') == source_name:
+        return False
+
+    try:
+        with product.image.open('rb') as image_file:
+            data = image_file.read()
+        variants = build_derivatives(data, force=force)
+    except (OSError, ValueError) as e:
+        logger.warning('Gagal membuat turunan gambar produk %s: %s', product_id, e)
+        return False
+
+    variants['source'] = source_name
+    # Hanya simpan jika gambar tidak diganti lagi selama proses berjalan
+    updated = Product.objects.filter(pk=product_id, image=source_name).update(
+        image_variants=variants
+    )
+    if updated:
+        catalog_changed([product_id])
+    return bool(updated)
+
+
+def schedule_derivatives(product):
+    """Dipanggil dari signal: generate di background jika gambar berubah"""
+    if not product.image:
+        if product.image_variants:
+            Product.objects.filter(pk=product.pk).update(image_variants={})
+        return
+    if product.image_variants.get('source') != product.image.name:
+        run_in_background(generate_derivatives, product.pk)
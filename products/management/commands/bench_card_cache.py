@@ -0,0 +1,65 @@
+import random
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+
+from backend.benchmark import Timer, scratch_database
+
+
+class Command(BaseCommand):
+    help = 'Benchmark render kartu produk menu: cold vs warm fragment cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+        parser.add_argument('--rounds', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            for size in options['sizes']:
+                self.bench(size, options['rounds'])
+
+    def bench(self, size, rounds):
+        from django.utils.text import slugify
+
+        from products import card_cache
+        from products.models import Category, Product
+
+        Product.objects.all().delete()
+        category, _ = Category.objects.get_or_create(name='Bench', slug='bench')
+        Product.objects.bulk_create([
+            Product(
+                category=category,
+                name=f'Menu {index}',
+                slug=slugify(f'menu-{index}'),
+                description='nasi ayam bumbu rempah ' * 5,
+                price=random.randint(10, 100) * 1000,
+                stock=100,
+                rating_count=random.randint(0, 50),
+                rating_average=random.uniform(1, 5),
+            )
+            for index in range(size)
+        ], batch_size=2000)
+        products = list(Product.objects.select_related('category'))
+
+        uncached, cold, warm = Timer(), Timer(), Timer()
+        for _ in range(rounds):
+            with uncached:
+                ''.join(
+                    render_to_string('menu_card.html', {'product': product, 'popular': False})
+                    for product in products
+                )
+            cache.clear()
+            with cold:
+                card_cache.render_product_cards(products, 'menu_card.html')
+            with warm:
+                card_cache.render_product_cards(products, 'menu_card.html')
+
+        self.stdout.write(f'[{size} produk] tanpa cache: {uncached.format()}')
+        self.stdout.write(f'[{size} produk] cold cache : {cold.format()}')
+        self.stdout.write(f'[{size} produk] warm cache : {warm.format()}')
+        speedup = uncached.summary()['p50'] / max(warm.summary()['p50'], 0.001)
+        self.stdout.write(self.style.SUCCESS(f'[{size} produk] warm {speedup:.1f}x lebih cepat'))
+        stats = card_cache.get_stats()
+        self.stdout.write(f"hits={stats['hits']} misses={stats['misses']}")
+        card_cache.reset_stats()
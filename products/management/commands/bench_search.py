@@ -0,0 +1,90 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from backend.benchmark import Timer, scratch_database
+
+BASES = [
+    'nasi goreng', 'nasi uduk', 'nasi kuning', 'ayam', 'soto', 'sate', 'rendang',
+    'gado gado', 'mie', 'bakso', 'ikan', 'tahu', 'tempe', 'sayur asem', 'sop buntut',
+    'rawon', 'pecel', 'gudeg', 'opor ayam', 'coto', 'konro', 'pallubasa', 'es cendol',
+]
+MODIFIERS = [
+    'goreng', 'bakar', 'kecap', 'balado', 'rica rica', 'penyet', 'pedas', 'manis',
+    'betawi', 'padang', 'madura', 'bali', 'lamongan', 'spesial', 'komplit', 'makassar',
+    'kampung', 'geprek', 'woku', 'suwir',
+]
+CATEGORIES = ['Nasi', 'Ayam', 'Sapi', 'Ikan', 'Sayur', 'Sup', 'Minuman', 'Jajanan', 'Paket']
+WORDS = [
+    'bumbu', 'rempah', 'gurih', 'segar', 'lezat', 'porsi', 'sambal', 'lalapan',
+    'kerupuk', 'santan', 'kelapa', 'daun', 'jeruk', 'bawang', 'cabai', 'acara',
+]
+QUERIES = [
+    'nasi goreng', 'ayam bakar', 'rendang', 'soto', 'sate madura', 'ren', 'nas',
+    'rendag', 'sotto', 'ayan bakar', 'bakso pedes', 'nasi oedoek', 'sáte', 'tjendol',
+    'gado', 'coto makassar', 'konro bakar', 'opor', 'mie goreng spesial', 'pecel lele',
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark latency pencarian produk di database sementara'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=50000)
+        parser.add_argument('--queries', type=int, default=2000)
+        parser.add_argument('--target-p99', type=float, default=20.0, help='ms')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        with scratch_database():
+            self.populate(options['products'])
+            self.run(options['queries'], options['target_p99'])
+
+    def populate(self, total):
+        from django.utils.text import slugify
+
+        from products.models import Category, Product
+        from products.search import rebuild_index
+
+        started = time.perf_counter()
+        categories = Category.objects.bulk_create(
+            [Category(name=name, slug=slugify(name)) for name in CATEGORIES]
+        )
+        products = []
+        for index in range(total):
+            name = f'{random.choice(BASES)} {random.choice(MODIFIERS)}'.title()
+            products.append(Product(
+                category=random.choice(categories),
+                name=name,
+                slug=f'{slugify(name)}-{index}',
+                description=' '.join(random.choices(WORDS, k=12)),
+                price=random.randint(10, 100) * 1000,
+                stock=100,
+            ))
+        Product.objects.bulk_create(products, batch_size=2000)
+        indexed = rebuild_index()
+        self.stdout.write(
+            f'{indexed} produk dibuat + diindex dalam {time.perf_counter() - started:.1f}s'
+        )
+
+    def run(self, total_queries, target_p99):
+        from products.search import search_products
+
+        # Warm-up: muat kosakata typo + cache halaman SQLite
+        for query in QUERIES:
+            search_products(query)
+
+        timer = Timer()
+        for _ in range(total_queries):
+            query = random.choice(QUERIES)
+            with timer:
+                search_products(query)
+
+        self.stdout.write(f'search_products: {timer.format()}')
+        p99 = timer.summary()['p99']
+        if p99 <= target_p99:
+            self.stdout.write(self.style.SUCCESS(f'PASS p99 {p99:.2f}ms <= {target_p99}ms'))
+        else:
+            self.stdout.write(self.style.ERROR(f'FAIL p99 {p99:.2f}ms > {target_p99}ms'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from products import card_cache
+
+
+class Command(BaseCommand):
+    help = 'Tampilkan hit/miss fragment cache kartu produk'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset counter setelah ditampilkan')
+        parser.add_argument('--flush', action='store_true', help='Buang semua kartu yang di-cache')
+
+    def handle(self, *args, **options):
+        stats = card_cache.get_stats()
+        self.stdout.write(
+            f"hits={stats['hits']} misses={stats['misses']} hit_rate={stats['hit_rate']:.1%}"
+        )
+        if options['reset']:
+            card_cache.reset_stats()
+        if options['flush']:
+            card_cache.invalidate_all()
+            self.stdout.write(self.style.SUCCESS('Semua kartu produk di-invalidate'))
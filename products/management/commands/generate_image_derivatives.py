@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.images import generate_derivatives
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Backfill turunan gambar responsive (WebP/JPEG) untuk media produk yang sudah ada'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Generate ulang walau sudah ada')
+        parser.add_argument('--product', type=int, action='append', dest='product_ids')
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image='').exclude(image__isnull=True)
+        if options['product_ids']:
+            products = products.filter(pk__in=options['product_ids'])
+
+        started = time.perf_counter()
+        generated = skipped = 0
+        for product_id in products.values_list('pk', flat=True).iterator():
+            if generate_derivatives(product_id, force=options['force']):
+                generated += 1
+                self.stdout.write(f'  ✓ produk #{product_id}')
+            else:
+                skipped += 1
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{generated} produk diproses, {skipped} dilewati dalam {elapsed:.1f}s'
+        ))
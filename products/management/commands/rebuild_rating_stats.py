@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from products.catalog import catalog_changed
+from products.ratings import rebuild_rating_stats
+
+
+class Command(BaseCommand):
+    help = 'Hitung ulang statistik rating Product dari tabel Review (satu GROUP BY)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--product', type=int, action='append', dest='product_ids',
+            help='Batasi ke ID produk tertentu (boleh diulang)',
+        )
+
+    def handle(self, *args, **options):
+        updated = rebuild_rating_stats(options['product_ids'])
+        catalog_changed()
+        self.stdout.write(self.style.SUCCESS(f'{updated} produk diperbarui'))
@@ -0,0 +1,89 @@
+# Generated by Django 5.2.7 on 2026-10-18 07:24
+
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_rating_stats(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    Review = apps.get_model('products', 'Review')
+
+    distribution = defaultdict(dict)
+    rows = (
+        Review.objects.filter(is_approved=True)
+        .values('product_id', 'rating')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    for row in rows:
+        distribution[row['product_id']][row['rating']] = row['total']
+
+    products = []
+    for product in Product.objects.filter(pk__in=distribution):
+        counts = distribution[product.pk]
+        product.rating_count = sum(counts.values())
+        product.rating_sum = sum(rating * total for rating, total in counts.items())
+        product.rating_average = product.rating_sum / product.rating_count
+        for rating in range(1, 6):
+            setattr(product, f'rating_{rating}_count', counts.get(rating, 0))
+        products.append(product)
+
+    Product.objects.bulk_update(
+        products,
+        ['rating_count', 'rating_sum', 'rating_average']
+        + [f'rating_{rating}_count' for rating in range(1, 6)],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_average',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_rating_stats, migrations.RunPython.noop),
+    ]
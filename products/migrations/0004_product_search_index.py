@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from products.search import get_backend
+
+    backend = get_backend(schema_editor.connection.vendor)
+    Product = apps.get_model('products', 'Product')
+    with schema_editor.connection.cursor() as cursor:
+        backend.create_schema(cursor)
+        rows = Product.objects.values_list('pk', 'name', 'category__name', 'description')
+        backend.index_rows(cursor, list(rows))
+
+
+def drop_search_index(apps, schema_editor):
+    from products.search import get_backend
+
+    backend = get_backend(schema_editor.connection.vendor)
+    with schema_editor.connection.cursor() as cursor:
+        backend.drop_schema(cursor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_product_rating_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
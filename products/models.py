@@ -2,6 +2,7 @@ from django.db import models
 from django.utils.text import slugify
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.conf import settings
+from django.core.files.storage import default_storage
 
 
 class Category(models.Model):
@@ -42,14 +43,38 @@ class Product(models.Model):
         validators=[MinValueValidator(0)]
     )
     image = models.ImageField(upload_to='products/%Y/%m/%d/', blank=True, null=True)
+    # Turunan responsive dari `image`, diisi products.images di background
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     stock = models.PositiveIntegerField(default=0)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
     is_featured = models.BooleanField(default=False)
+
+    # Statistik rating (denormalisasi dari Review yang disetujui).
+    # Dijaga oleh products.ratings; perbaiki dengan `manage.py rebuild_rating_stats`.
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_average = models.FloatField(default=0, editable=False)
+    rating_1_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_2_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_3_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_4_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_5_count = models.PositiveIntegerField(default=0, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Menu: status='active' urut terbaru (keyset created_at, id)
+            models.Index(fields=['status', '-created_at', '-id'], name='product_active_list_idx'),
+            # Homepage: produk unggulan aktif terbaru
+            models.Index(
+                fields=['status', '-created_at'],
+                condition=models.Q(is_featured=True),
+                name='product_featured_idx',
+            ),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -68,18 +93,43 @@ class Product(models.Model):
         if self.image:
             return self.image.url
         return '/static/images/no-image.png'
+
+    def get_image_srcset(self, image_format='webp'):
+        """
+        srcset untuk <img>/<source>, mis. "/media/...-320w.webp 320w, ..."
+        Kosong jika turunan belum dibuat.
+        """
+        return ', '.join(
+            f'{default_storage.url(name)} {width}w'
+            for width, name in self.image_variants.get(image_format, [])
+        )
+
+    def get_thumbnail_url(self, width=640, image_format='jpeg'):
+        """URL turunan terkecil yang >= width, fallback ke gambar asli"""
+        variants = self.image_variants.get(image_format, [])
+        for variant_width, name in variants:
+            if variant_width >= width:
+                return default_storage.url(name)
+        if variants:
+            return default_storage.url(variants[-1][1])
+        return self.get_image_url()
     
     def get_average_rating(self):
-        """Hitung rata-rata rating dari semua review yang disetujui"""
-        approved_reviews = self.reviews.filter(is_approved=True)
-        if approved_reviews.exists():
-            total = sum(review.rating for review in approved_reviews)
-            return round(total / approved_reviews.count(), 1)
+        """Rata-rata rating dari semua review yang disetujui"""
+        if self.rating_count:
+            return round(self.rating_average, 1)
         return 0
 
     def get_review_count(self):
-        """Hitung total review yang disetujui"""
-        return self.reviews.filter(is_approved=True).count()
+        """Total review yang disetujui"""
+        return self.rating_count
+
+    def get_rating_distribution(self):
+        """Jumlah review per bintang, {5: n, 4: n, ..., 1: n}"""
+        return {
+            rating: getattr(self, f'rating_{rating}_count')
+            for rating in range(5, 0, -1)
+        }
 
 
 class Review(models.Model):
@@ -104,6 +154,36 @@ class Review(models.Model):
     class Meta:
         ordering = ['-created_at']
         unique_together = ['product', 'user']
+        indexes = [
+            # Daftar review approved per produk (keyset di checkout).
+            # Partial index: filter boolean di-render sebagai `WHERE is_approved`,
+            # bukan `= 1`, jadi kolom itu tidak berguna sebagai prefix index.
+            models.Index(
+                fields=['product', '-created_at', '-id'],
+                condition=models.Q(is_approved=True),
+                name='review_approved_list_idx',
+            ),
+            # Antrian moderasi di admin (is_approved=False)
+            models.Index(
+                fields=['-created_at'],
+                condition=models.Q(is_approved=False),
+                name='review_pending_idx',
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Simpan state awal agar signal bisa menghitung delta statistik rating
+        if not {'product_id', 'rating', 'is_approved'} & instance.get_deferred_fields():
+            instance._rating_state = instance.rating_state()
+        return instance
+
+    def rating_state(self):
+        """(product_id, rating) jika review ini dihitung di statistik, else None"""
+        if self.is_approved and self.product_id and self.rating:
+            return (self.product_id, int(self.rating))
+        return None
 
     def __str__(self):
         return f"{self.user.username} - {self.product.name} ({self.rating}⭐)"
\ No newline at end of file
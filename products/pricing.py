@@ -0,0 +1,24 @@
+"""
+Harga per porsi bertingkat di halaman checkout.
+
+    10-50 porsi    harga normal
+    50-150 porsi   diskon 20%
+    >150 porsi     diskon 40%
+
+Harga per porsi yang dikirim client (checkout.js, cart_batch) hanya
+diterima jika sama dengan salah satu tingkat harga produk; nilai lain
+ditolak agar client tidak bisa menentukan harga OrderItem sendiri.
+"""
+from decimal import Decimal
+
+PORTION_DISCOUNTS = (Decimal('1'), Decimal('0.8'), Decimal('0.6'))
+
+
+def portion_prices(price):
+    """Harga per porsi tiap tingkat (dibulatkan ke bawah ke rupiah), dari yang termahal"""
+    return [int(price * discount) for discount in PORTION_DISCOUNTS]
+
+
+def is_portion_price(price, price_per_portion):
+    """True jika `price_per_portion` adalah salah satu tingkat harga untuk `price`"""
+    return price_per_portion in portion_prices(price)
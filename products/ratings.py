@@ -0,0 +1,113 @@
+"""
+Statistik rating produk yang didenormalisasi ke kolom Product.rating_*.
+
+Setiap perubahan Review menghasilkan delta per bintang yang diterapkan
+dengan UPDATE + F(), sehingga halaman menu tidak perlu membaca tabel
+review sama sekali.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, When
+from django.db.models.functions import Cast
+
+from .models import Product, Review
+
+RATINGS = range(1, 6)
+
+AVERAGE_EXPRESSION = Case(
+    When(rating_count__gt=0, then=Cast('rating_sum', FloatField()) / F('rating_count')),
+    default=0.0,
+    output_field=FloatField(),
+)
+
+
+def apply_rating_changes(product_id, changes):
+    """
+    Terapkan delta statistik untuk satu produk.
+
+    Args:
+        product_id: ID produk
+        changes: dict {rating: delta}, mis. {4: -1, 5: 1} saat review diubah dari 4 ke 5
+    """
+    changes = {rating: delta for rating, delta in changes.items() if delta}
+    if not changes:
+        return
+
+    updates = {
+        'rating_count': F('rating_count') + sum(changes.values()),
+        'rating_sum': F('rating_sum') + sum(rating * delta for rating, delta in changes.items()),
+    }
+    for rating, delta in changes.items():
+        field = f'rating_{rating}_count'
+        updates[field] = F(field) + delta
+
+    # Rata-rata dihitung di statement terpisah karena MySQL mengevaluasi
+    # assignment secara berurutan, berbeda dengan SQLite/Postgres
+    with transaction.atomic():
+        products = Product.objects.filter(pk=product_id)
+        products.update(**updates)
+        products.update(rating_average=AVERAGE_EXPRESSION)
+
+
+def review_state_changed(old_state, new_state):
+    """
+    Hitung dan terapkan delta dari perubahan state review.
+
+    State adalah (product_id, rating) atau None jika review tidak dihitung.
+    """
+    if old_state == new_state:
+        return
+
+    changes = defaultdict(lambda: defaultdict(int))
+    if old_state:
+        changes[old_state[0]][old_state[1]] -= 1
+    if new_state:
+        changes[new_state[0]][new_state[1]] += 1
+
+    for product_id, product_changes in changes.items():
+        apply_rating_changes(product_id, product_changes)
+
+
+def rebuild_rating_stats(product_ids=None):
+    """
+    Hitung ulang statistik rating dari tabel Review dalam satu GROUP BY.
+
+    Args:
+        product_ids: batasi ke produk tertentu, None = semua produk
+
+    Returns:
+        int: jumlah produk yang diperbarui
+    """
+    products = Product.objects.all()
+    reviews = Review.objects.filter(is_approved=True)
+    if product_ids is not None:
+        product_ids = list(product_ids)
+        products = products.filter(pk__in=product_ids)
+        reviews = reviews.filter(product_id__in=product_ids)
+
+    distribution = defaultdict(dict)
+    rows = reviews.values('product_id', 'rating').annotate(total=Count('id')).order_by()
+    for row in rows:
+        distribution[row['product_id']][row['rating']] = row['total']
+
+    stats_fields = ['rating_count', 'rating_sum', 'rating_average'] + [
+        f'rating_{rating}_count' for rating in RATINGS
+    ]
+
+    with transaction.atomic():
+        to_update = []
+        for product in products.only('pk').iterator():
+            counts = distribution.get(product.pk, {})
+            product.rating_count = sum(counts.values())
+            product.rating_sum = sum(rating * total for rating, total in counts.items())
+            product.rating_average = (
+                product.rating_sum / product.rating_count if product.rating_count else 0
+            )
+            for rating in RATINGS:
+                setattr(product, f'rating_{rating}_count', counts.get(rating, 0))
+            to_update.append(product)
+
+        Product.objects.bulk_update(to_update, stats_fields, batch_size=500)
+
+    return len(to_update)
@@ -0,0 +1,498 @@
+"""
+Pencarian produk full-text di sisi server.
+
+Index berisi name, nama kategori dan description yang sudah dinormalisasi
+(huruf kecil, tanpa aksen, ejaan lama Indonesia -> EYD). Backend dipilih
+berdasarkan database:
+
+- SQLite  : tabel virtual FTS5, ranking bm25
+- Postgres: tabel tsvector + index GIN, ranking ts_rank
+- lainnya : fallback icontains
+
+Toleransi typo memakai index deletion-neighbourhood (SymSpell) atas
+kosakata name/kategori, sehingga koreksi kata tetap O(1) per token.
+Kosakata di-cache per proses selama VOCABULARY_TTL detik.
+"""
+import re
+import time
+import unicodedata
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Product
+
+SEARCH_TABLE = 'products_search'
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+MAX_TOKENS = 6
+VOCABULARY_TTL = 300  # detik
+# Di atas jumlah kecocokan ini ranking bm25 diganti urutan nama+terbaru
+RANK_WINDOW = 1000
+
+# Ejaan lama -> EYD, umum di nama masakan ("Dapoer", "Oedang", "Tjendol")
+SPELLING_VARIANTS = [
+    ('oe', 'u'),
+    ('dj', 'j'),
+    ('tj', 'c'),
+    ('sj', 'sy'),
+    ('nj', 'ny'),
+    ('ch', 'kh'),
+]
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def normalize_text(text):
+    """Huruf kecil, hapus aksen dan seragamkan ejaan lama"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char)).lower()
+    for old, new in SPELLING_VARIANTS:
+        text = text.replace(old, new)
+    return text
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(normalize_text(text))[:MAX_TOKENS]
+
+
+# ==========================================
+# TYPO TOLERANCE
+# ==========================================
+def _max_distance(word):
+    return 1 if len(word) <= 5 else 2
+
+
+def _deletes(word, distance):
+    """Semua varian `word` dengan menghapus hingga `distance` huruf"""
+    results = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {
+            candidate[:index] + candidate[index + 1:]
+            for candidate in frontier
+            for index in range(len(candidate))
+        }
+        results |= frontier
+    return results
+
+
+def _edit_distance(a, b, limit):
+    """Damerau-Levenshtein (optimal string alignment) dengan early exit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, char_b in enumerate(b, 1):
+            cost = 0 if char_a == char_b else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous_previous is not None and i > 1 and j > 1
+                    and char_a == b[j - 2] and a[i - 2] == char_b):
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+class Vocabulary:
+    """Kosakata index + lookup koreksi typo"""
+
+    def __init__(self, words):
+        self.words = set(words)
+        self.sorted_words = sorted(self.words)
+        self.deletes = {}
+        for word in self.words:
+            for variant in _deletes(word, _max_distance(word)):
+                self.deletes.setdefault(variant, []).append(word)
+
+    def has_prefix(self, token):
+        index = bisect_left(self.sorted_words, token)
+        return index < len(self.sorted_words) and self.sorted_words[index].startswith(token)
+
+    def corrections(self, token, limit=3):
+        """Kata di kosakata yang berjarak edit kecil dari `token`"""
+        distance = _max_distance(token)
+        candidates = set()
+        for variant in _deletes(token, distance):
+            candidates.update(self.deletes.get(variant, ()))
+        scored = []
+        for candidate in candidates:
+            score = _edit_distance(token, candidate, distance)
+            if score <= distance:
+                scored.append((score, candidate))
+        scored.sort()
+        return [candidate for _, candidate in scored[:limit]]
+
+
+# ==========================================
+# BACKENDS
+# ==========================================
+class BaseSearchBackend(ABC):
+    def __init__(self):
+        self._vocabulary = None
+        self._vocabulary_loaded_at = 0
+
+    # --- schema ---
+    def create_schema(self, cursor):
+        pass
+
+    def drop_schema(self, cursor):
+        pass
+
+    # --- index ---
+    def index_rows(self, cursor, rows):
+        """rows: iterable (product_id, name, category_name, description)"""
+
+    def remove(self, cursor, product_ids):
+        pass
+
+    def clear(self, cursor):
+        pass
+
+    # --- query ---
+    def vocabulary_words(self, cursor):
+        return []
+
+    def vocabulary(self):
+        if (self._vocabulary is None
+                or time.monotonic() - self._vocabulary_loaded_at > VOCABULARY_TTL):
+            with connection.cursor() as cursor:
+                words = [
+                    word for word in self.vocabulary_words(cursor)
+                    if len(word) >= 3 and word.isalpha()
+                ]
+            self._vocabulary = Vocabulary(words)
+            self._vocabulary_loaded_at = time.monotonic()
+        return self._vocabulary
+
+    def invalidate_vocabulary(self):
+        self._vocabulary = None
+
+    def expand_tokens(self, tokens):
+        """
+        Setiap token menjadi list alternatif: token asli (prefix) ditambah
+        koreksi typo jika token tidak dikenal di kosakata.
+        """
+        vocabulary = self.vocabulary()
+        expanded = []
+        for token in tokens:
+            alternatives = [token]
+            if len(token) >= 3 and not vocabulary.has_prefix(token):
+                alternatives += vocabulary.corrections(token)
+            expanded.append(alternatives)
+        return expanded
+
+    @abstractmethod
+    def match_sql(self, query):
+        """(sql, params) subquery yang mengembalikan product_id yang cocok"""
+
+    @abstractmethod
+    def search(self, query, limit):
+        """List product_id aktif yang cocok, urut relevansi"""
+
+    def filter_queryset(self, queryset, query):
+        match = self.match_sql(query)
+        if match is None:
+            return queryset.none()
+        sql, params = match
+        return queryset.filter(pk__in=RawSQL(sql, params))
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    vocab_table = f'{SEARCH_TABLE}_vocab'
+
+    def create_schema(self, cursor):
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+            "name, category, description, "
+            "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.vocab_table} "
+            f"USING fts5vocab({SEARCH_TABLE}, 'col')"
+        )
+
+    def drop_schema(self, cursor):
+        cursor.execute(f'DROP TABLE IF EXISTS {self.vocab_table}')
+        cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+    def index_rows(self, cursor, rows):
+        rows = [
+            (pk, normalize_text(name), normalize_text(category), normalize_text(description))
+            for pk, name, category, description in rows
+        ]
+        if not rows:
+            return
+        self.remove(cursor, [row[0] for row in rows])
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE}(rowid, name, category, description) VALUES (%s, %s, %s, %s)',
+            rows,
+        )
+
+    def remove(self, cursor, product_ids):
+        cursor.executemany(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s',
+            [(pk,) for pk in product_ids],
+        )
+
+    def clear(self, cursor):
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+
+    def vocabulary_words(self, cursor):
+        cursor.execute(
+            f"SELECT DISTINCT term FROM {self.vocab_table} WHERE col IN ('name', 'category')"
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+    def _match_expression(self, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return None
+        groups = []
+        for alternatives in self.expand_tokens(tokens):
+            # token asli sebagai prefix, koreksi typo sebagai kata utuh
+            terms = [f'"{alternatives[0]}"*'] + [f'"{word}"' for word in alternatives[1:]]
+            groups.append('(' + ' OR '.join(terms) + ')')
+        return ' AND '.join(groups)
+
+    def match_sql(self, query):
+        expression = self._match_expression(query)
+        if expression is None:
+            return None
+        return (
+            f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s',
+            [expression],
+        )
+
+    def search(self, query, limit):
+        expression = self._match_expression(query)
+        if expression is None:
+            return []
+        product_table = Product._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM (SELECT 1 FROM {SEARCH_TABLE} '
+                f'WHERE {SEARCH_TABLE} MATCH %s LIMIT %s)',
+                [expression, RANK_WINDOW + 1],
+            )
+            if cursor.fetchone()[0] <= RANK_WINDOW:
+                cursor.execute(
+                    f'SELECT s.rowid FROM {SEARCH_TABLE} s '
+                    f'JOIN {product_table} p ON p.id = s.rowid '
+                    f"WHERE {SEARCH_TABLE} MATCH %s AND p.status = 'active' "
+                    f'ORDER BY bm25({SEARCH_TABLE}, 10.0, 4.0, 1.0) LIMIT %s',
+                    [expression, limit],
+                )
+                return [row[0] for row in cursor.fetchall()]
+
+            # Query sangat umum (mis. "nas"): skor bm25 ribuan dokumen pendek
+            # hampir seragam dan mahal, jadi ambil yang cocok di nama dulu,
+            # urut terbaru, agar latency tetap terbatas
+            product_ids = []
+            for column_expression in (f'{{name}} : ({expression})', expression):
+                cursor.execute(
+                    f'SELECT s.rowid FROM {SEARCH_TABLE} s '
+                    f'JOIN {product_table} p ON p.id = s.rowid '
+                    f"WHERE {SEARCH_TABLE} MATCH %s AND p.status = 'active' "
+                    'ORDER BY s.rowid DESC LIMIT %s',
+                    [column_expression, limit],
+                )
+                for (product_id,) in cursor.fetchall():
+                    if product_id not in product_ids:
+                        product_ids.append(product_id)
+                if len(product_ids) >= limit:
+                    break
+            return product_ids[:limit]
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    config = 'simple'
+
+    def create_schema(self, cursor):
+        product_table = Product._meta.db_table
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ('
+            f'product_id bigint PRIMARY KEY REFERENCES {product_table}(id) '
+            'ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, '
+            'document tsvector NOT NULL)'
+        )
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document_gin '
+            f'ON {SEARCH_TABLE} USING GIN (document)'
+        )
+
+    def drop_schema(self, cursor):
+        cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+    def index_rows(self, cursor, rows):
+        rows = [
+            (pk, normalize_text(name), normalize_text(category), normalize_text(description))
+            for pk, name, category, description in rows
+        ]
+        if not rows:
+            return
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE} (product_id, document) VALUES (%s, '
+            f"setweight(to_tsvector('{self.config}', %s), 'A') || "
+            f"setweight(to_tsvector('{self.config}', %s), 'B') || "
+            f"setweight(to_tsvector('{self.config}', %s), 'C')) "
+            'ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document',
+            rows,
+        )
+
+    def remove(self, cursor, product_ids):
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE product_id = ANY(%s)', [list(product_ids)]
+        )
+
+    def clear(self, cursor):
+        cursor.execute(f'TRUNCATE {SEARCH_TABLE}')
+
+    def vocabulary_words(self, cursor):
+        cursor.execute(f"SELECT word FROM ts_stat('SELECT document FROM {SEARCH_TABLE}', 'ab')")
+        return [row[0] for row in cursor.fetchall()]
+
+    def _tsquery(self, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return None
+        groups = []
+        for alternatives in self.expand_tokens(tokens):
+            terms = [f'{alternatives[0]}:*'] + alternatives[1:]
+            groups.append('(' + ' | '.join(terms) + ')')
+        return ' & '.join(groups)
+
+    def match_sql(self, query):
+        tsquery = self._tsquery(query)
+        if tsquery is None:
+            return None
+        return (
+            f'SELECT product_id FROM {SEARCH_TABLE} '
+            f"WHERE document @@ to_tsquery('{self.config}', %s)",
+            [tsquery],
+        )
+
+    def search(self, query, limit):
+        tsquery = self._tsquery(query)
+        if tsquery is None:
+            return []
+        product_table = Product._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT s.product_id FROM {SEARCH_TABLE} s '
+                f'JOIN {product_table} p ON p.id = s.product_id, '
+                f"to_tsquery('{self.config}', %s) q "
+                f"WHERE s.document @@ q AND p.status = 'active' "
+                'ORDER BY ts_rank(s.document, q) DESC LIMIT %s',
+                [tsquery, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class FallbackSearchBackend(BaseSearchBackend):
+    """Tanpa index full-text (mis. MySQL): icontains biasa"""
+
+    def vocabulary(self):
+        return Vocabulary([])
+
+    def condition(self, query):
+        return (
+            Q(name__icontains=query)
+            | Q(description__icontains=query)
+            | Q(category__name__icontains=query)
+        )
+
+    def match_sql(self, query):
+        return Product.objects.filter(self.condition(query)).values('pk').query.sql_with_params()
+
+    def filter_queryset(self, queryset, query):
+        # Kondisi langsung di queryset, tanpa subquery pk__in
+        return queryset.filter(self.condition(query))
+
+    def search(self, query, limit):
+        queryset = self.filter_queryset(Product.objects.filter(status='active'), query)
+        return list(queryset.order_by('name').values_list('pk', flat=True)[:limit])
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+_backends = {}
+
+
+def get_backend(vendor=None):
+    vendor = vendor or connection.vendor
+    if vendor not in _backends:
+        _backends[vendor] = BACKENDS.get(vendor, FallbackSearchBackend)()
+    return _backends[vendor]
+
+
+# ==========================================
+# PUBLIC API
+# ==========================================
+def _product_rows(products):
+    return [
+        (product.pk, product.name, product.category.name, product.description)
+        for product in products
+    ]
+
+
+def index_products(products):
+    """Tambah/perbarui produk di index pencarian"""
+    backend = get_backend()
+    with connection.cursor() as cursor:
+        backend.index_rows(cursor, _product_rows(products))
+
+
+def remove_products(product_ids):
+    backend = get_backend()
+    with connection.cursor() as cursor:
+        backend.remove(cursor, product_ids)
+
+
+def rebuild_index(batch_size=1000):
+    """Bangun ulang seluruh index, return jumlah produk yang diindex"""
+    backend = get_backend()
+    products = Product.objects.select_related('category').only(
+        'pk', 'name', 'description', 'category__name'
+    )
+    total = 0
+    with connection.cursor() as cursor:
+        backend.clear(cursor)
+        batch = []
+        for product in products.iterator(chunk_size=batch_size):
+            batch.append(product)
+            if len(batch) >= batch_size:
+                backend.index_rows(cursor, _product_rows(batch))
+                total += len(batch)
+                batch = []
+        backend.index_rows(cursor, _product_rows(batch))
+        total += len(batch)
+    backend.invalidate_vocabulary()
+    return total
+
+
+def filter_products(queryset, query):
+    """Batasi queryset ke produk yang cocok dengan `query` (tanpa ranking)"""
+    return get_backend().filter_queryset(queryset, query)
+
+
+def search_products(query, limit=DEFAULT_LIMIT):
+    """
+    Cari produk aktif, urut relevansi.
+
+    Returns:
+        list[Product] dengan category ter-select_related
+    """
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    product_ids = get_backend().search(query, limit)
+    products = Product.objects.select_related('category').in_bulk(product_ids)
+    return [products[pk] for pk in product_ids if pk in products]
@@ -0,0 +1,67 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .catalog import catalog_changed
+from .images import schedule_derivatives
+from .models import Category, Product, Review
+from .ratings import rebuild_rating_stats, review_state_changed
+from .search import index_products, remove_products
+
+
+@receiver(post_save, sender=Review)
+def update_rating_stats_on_save(sender, instance, created, raw=False, **kwargs):
+    """Perbarui statistik rating produk saat review dibuat/diubah/dimoderasi"""
+    if raw:
+        return
+
+    new_state = instance.rating_state()
+    if created:
+        review_state_changed(None, new_state)
+    elif hasattr(instance, '_rating_state'):
+        review_state_changed(instance._rating_state, new_state)
+    else:
+        # State awal tidak diketahui (instance tidak dimuat dari DB)
+        rebuild_rating_stats([instance.product_id])
+    instance._rating_state = new_state
+    catalog_changed([instance.product_id])
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_stats_on_delete(sender, instance, **kwargs):
+    """Kurangi statistik rating saat review dihapus"""
+    review_state_changed(getattr(instance, '_rating_state', instance.rating_state()), None)
+    catalog_changed([instance.product_id])
+
+
+@receiver(post_save, sender=Product)
+def index_product_on_save(sender, instance, raw=False, **kwargs):
+    """Sinkronkan index pencarian saat produk disimpan"""
+    if raw:
+        return
+    index_products([instance])
+    schedule_derivatives(instance)
+    catalog_changed([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_from_index(sender, instance, **kwargs):
+    remove_products([instance.pk])
+    catalog_changed([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_products(sender, instance, created, raw=False, **kwargs):
+    """Nama kategori ikut diindex, jadi produk di kategori ini perlu diindex ulang"""
+    if raw:
+        return
+    if created:
+        catalog_changed([])
+        return
+    products = list(instance.products.select_related('category'))
+    index_products(products)
+    catalog_changed([product.pk for product in products])
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    catalog_changed([])
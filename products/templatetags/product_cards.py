@@ -0,0 +1,14 @@
+from django import template
+
+from products.card_cache import render_product_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def product_cards(products, template_name, popular=0):
+    """
+    Render kartu produk dengan fragment cache
+    Usage: {% product_cards products 'menu_card.html' popular=3 %}
+    """
+    return render_product_cards(products, template_name, popular_count=int(popular))
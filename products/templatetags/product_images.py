@@ -0,0 +1,33 @@
+from django import template
+from django.utils.html import format_html
+
+register = template.Library()
+
+DEFAULT_SIZES = '(max-width: 480px) 100vw, (max-width: 1024px) 50vw, 320px'
+
+
+@register.simple_tag
+def product_picture(product, css_class='', sizes=DEFAULT_SIZES, loading='lazy'):
+    """
+    <picture> dengan srcset WebP + fallback JPEG dari Product.image_variants.
+    Selama turunan belum dibuat, pakai gambar asli.
+
+    Usage: {% product_picture product 'menu-img' %}
+    """
+    jpeg_srcset = product.get_image_srcset('jpeg')
+    if not jpeg_srcset:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="{}">',
+            product.get_image_url(), product.name, css_class, loading,
+        )
+
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" '
+        'alt="{}" class="{}" loading="{}" decoding="async">'
+        '</picture>',
+        product.get_image_srcset('webp'), sizes,
+        product.get_thumbnail_url(640), jpeg_srcset, sizes,
+        product.name, css_class, loading,
+    )
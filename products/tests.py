@@ -1,3 +1,924 @@
-from django.test import TestCase
+import gzip
+import io
+import shutil
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import messages
+from django.contrib.auth.models import AnonymousUser, Permission
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.http import HttpResponse, QueryDict
+from django.middleware.csrf import get_token
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.html import escape
+from PIL import Image
+
+from backend.pagination import encode_cursor
+from backend.query_plan import QueryPlanAssertions
+from users.models import CustomUser
+
+from . import card_cache, images
+from .admin import PaginatedInlineFormSet
+from .api import choose_encoding
+from .catalog import cache_anonymous_page, get_catalog_version
+from .forms import CategoryBulkUpdateForm
+from .models import Category, Product, Review
+from .search import FallbackSearchBackend, filter_products, get_backend, search_products
+from .templatetags.product_images import DEFAULT_SIZES
+from .views import REVIEW_PAGE_SIZE
+
+
+class ProductAdminQueryCountTest(TestCase):
+    """Changelist admin tidak boleh melakukan query per baris"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.reviewers = [
+            CustomUser.objects.create_user(f'reviewer{index}', password='password')
+            for index in range(3)
+        ]
+        cls.category = Category.objects.create(name='Nasi')
+
+    def create_products(self, total):
+        start = Product.objects.count()
+        for index in range(start, start + total):
+            product = Product.objects.create(
+                category=self.category,
+                name=f'Menu {index}',
+                description='Menu catering',
+                price=25000,
+                stock=10,
+            )
+            for rating, user in enumerate(self.reviewers, start=3):
+                Review.objects.create(product=product, user=user, rating=rating, comment='Enak')
+
+    def changelist_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('admin:products_product_changelist'))
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_query_count_independent_of_page_size(self):
+        self.client.force_login(self.admin)
+        self.create_products(2)
+        small_page = self.changelist_queries()
+
+        self.create_products(20)
+        large_page = self.changelist_queries()
+
+        self.assertEqual(small_page, large_page)
+
+    def test_change_form_rating_summary_uses_stored_stats(self):
+        self.client.force_login(self.admin)
+        self.create_products(1)
+        product = Product.objects.get()
+        url = reverse('admin:products_product_change', args=[product.pk])
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+
+        self.assertContains(response, 'Total Reviews:</strong> 3')
+        review_queries = [
+            query for query in context.captured_queries
+            if 'products_review' in query['sql']
+        ]
+        self.assertEqual(review_queries, [])
+
+
+class ProductQueryPlanTest(QueryPlanAssertions, TestCase):
+    """Halaman katalog tidak boleh membaca tabel produk/review dengan full scan"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Nasi')
+        cls.user = CustomUser.objects.create(username='pelanggan')
+        cls.products = [
+            Product.objects.create(
+                category=cls.category, name=f'Menu {index}', description='-',
+                price=20000 + index, stock=10, is_featured=index % 2 == 0,
+            )
+            for index in range(5)
+        ]
+        Review.objects.create(product=cls.products[0], user=cls.user, rating=5, comment='Enak')
+
+    def setUp(self):
+        # Halaman katalog di-cache; tanpa ini query kedua dst. tidak pernah dijalankan
+        cache.clear()
+        # menu_list wajib login; tanpa ini view hanya redirect dan query menu tidak diperiksa
+        self.client.force_login(self.user)
+
+    def assertMenuWithoutFullScans(self, params):
+        with self.assertNoFullScans() as queries:
+            response = self.client.get(reverse('menu'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(any('products_product' in sql for sql, _ in queries))
+        return response
+
+    def test_home(self):
+        with self.assertNoFullScans():
+            self.client.get(reverse('home'))
+
+    def test_menu_sorts(self):
+        for sort in ('newest', 'price_low', 'price_high', 'rating'):
+            with self.subTest(sort=sort):
+                self.assertMenuWithoutFullScans({'sort': sort})
+
+    def test_menu_category(self):
+        self.assertMenuWithoutFullScans({'category': self.category.slug})
+
+    def test_menu_search(self):
+        # Termasuk koreksi typo: kosakata dibaca utuh (dikecualikan di query_plan)
+        response = self.assertMenuWithoutFullScans({'search': 'menu 3'})
+        self.assertEqual([product.name for product in response.context['products']], ['Menu 3'])
+        self.assertMenuWithoutFullScans({'search': 'mneu'})
+
+    def test_product_pages(self):
+        product = self.products[0]
+        with self.assertNoFullScans():
+            self.client.get(reverse('checkout', args=[product.pk]))
+            self.client.get(reverse('product_reviews', args=[product.pk]))
+
+
+class MenuCursorTest(TestCase):
+    """Cursor dari query string tidak dipercaya: cursor rusak kembali ke halaman pertama"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(username='pelanggan')
+        category = Category.objects.create(name='Nasi')
+        cls.product = Product.objects.create(
+            category=category, name='Nasi Kuning', description='-', price=25000, stock=10,
+        )
+        Review.objects.create(product=cls.product, user=cls.user, rating=5, comment='Enak')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def assertFirstPage(self, url, params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 1)
+
+    def test_malformed_cursor(self):
+        for cursor in ['%%%', 'bm90IGpzb24', encode_cursor([1]), 'eyJhIjoxfQ']:
+            with self.subTest(cursor=cursor):
+                self.assertFirstPage(reverse('menu'), {'format': 'json', 'cursor': cursor})
+
+    def test_wrongly_typed_cursor(self):
+        cursors = [
+            encode_cursor(['abc', 1]),
+            encode_cursor([[1], {'a': 1}]),
+            encode_cursor([None, 1]),
+            encode_cursor(['2030-01-01T00:00:00+00:00', 10 ** 30]),
+        ]
+        for sort in ('newest', 'price_low', 'price_high', 'rating'):
+            for cursor in cursors:
+                with self.subTest(sort=sort, cursor=cursor):
+                    self.assertFirstPage(reverse('menu'), {'format': 'json', 'sort': sort, 'cursor': cursor})
+
+    def test_review_cursor(self):
+        url = reverse('product_reviews', args=[self.product.pk])
+        for cursor in ['%%%', encode_cursor(['abc', 'xyz'])]:
+            with self.subTest(cursor=cursor):
+                self.assertFirstPage(url, {'cursor': cursor})
+
+
+class ProductReviewsTest(TestCase):
+    """Review di checkout: halaman pertama inline, sisanya lewat product_reviews (keyset)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Nasi')
+        cls.product = Product.objects.create(
+            category=category, name='Nasi Kuning', description='-', price=25000, stock=10,
+        )
+        cls.users = [CustomUser.objects.create(username=f'pelanggan{index}') for index in range(15)]
+        cls.reviews = [
+            Review.objects.create(product=cls.product, user=user, rating=5, comment=f'Ulasan {index}')
+            for index, user in enumerate(cls.users)
+        ]
+        # Tidak approved: tidak pernah tampil
+        cls.hidden = Review.objects.create(
+            product=cls.product, user=CustomUser.objects.create(username='spam'),
+            rating=1, comment='Tersembunyi', is_approved=False,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def newest_first(self):
+        return sorted(self.reviews, key=lambda review: (review.created_at, review.pk), reverse=True)
+
+    def test_first_page_inline_on_checkout(self):
+        response = self.client.get(reverse('checkout', args=[self.product.pk]))
+        page = response.context['review_page']
+        self.assertEqual(list(page), self.newest_first()[:REVIEW_PAGE_SIZE])
+        self.assertTrue(page.has_next)
+        self.assertContains(response, f'data-next-cursor="{page.next_cursor}"')
+        self.assertContains(response, 'class="review-item"', count=REVIEW_PAGE_SIZE)
+        self.assertNotContains(response, 'Tersembunyi')
+
+    def test_cursor_returns_next_page_without_overlap(self):
+        first = self.client.get(reverse('checkout', args=[self.product.pk])).context['review_page']
+        response = self.client.get(
+            reverse('product_reviews', args=[self.product.pk]), {'cursor': first.next_cursor}
+        )
+        data = response.json()
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(data['count'], 5)
+        self.assertFalse(data['has_next'])
+        self.assertIsNone(data['next_cursor'])
+        shown = {review.comment for review in first}
+        rest = [review.comment for review in self.newest_first()[REVIEW_PAGE_SIZE:]]
+        for comment in rest:
+            self.assertIn(comment, data['html'])
+        self.assertFalse(shown & set(rest))
+        for comment in shown:
+            self.assertNotIn(f'>{comment}<', data['html'])
+
+    def test_invalid_cursor_returns_first_page(self):
+        url = reverse('product_reviews', args=[self.product.pk])
+        for cursor in ['%%%', encode_cursor(['abc', 'xyz']), encode_cursor([1])]:
+            with self.subTest(cursor=cursor):
+                data = self.client.get(url, {'cursor': cursor}).json()
+                self.assertEqual(data['count'], REVIEW_PAGE_SIZE)
+                self.assertIn(f'>{self.newest_first()[0].comment}<', data['html'])
+        self.assertEqual(self.client.get(reverse('product_reviews', args=[0])).status_code, 404)
+
+    def test_own_review_loaded_with_single_query(self):
+        author = self.users[0]  # review tertua: tidak ada di halaman pertama
+        url = reverse('checkout', args=[self.product.pk])
+        # Produk, halaman review, session, user, review sendiri (unique index),
+        # counter badge, kategori; sama untuk user tanpa review
+        for user in (author, CustomUser.objects.create(username='tanpa-review')):
+            with self.subTest(user=user.username):
+                cache.clear()
+                self.client.force_login(user)
+                with self.assertNumQueries(7):
+                    response = self.client.get(url)
+                expected = self.reviews[0] if user == author else None
+                self.assertEqual(response.context['user_review'], expected)
+        self.client.force_login(author)
+        self.assertContains(self.client.get(url), 'Edit Review Anda')
+
+
+class CatalogInvalidationTest(TestCase):
+    """Perubahan produk lewat admin membuang kartu & halaman katalog yang basi"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser('admin', 'admin@example.com', 'password')
+        category = Category.objects.create(name='Nasi')
+        cls.product = Product.objects.create(
+            category=category, name='Nasi Kuning', description='-', price=25000, stock=10,
+            status='inactive',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_bulk_action_on_filtered_changelist(self):
+        self.client.force_login(self.admin)
+        _, before = card_cache.get_versions([self.product.pk])
+        catalog_version = get_catalog_version()
+        url = reverse('admin:products_product_changelist') + '?status__exact=inactive'
+        response = self.client.post(url, {
+            'action': 'make_active', '_selected_action': [self.product.pk],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Product.objects.get().status, 'active')
+        _, after = card_cache.get_versions([self.product.pk])
+        self.assertNotEqual(before, after)
+        self.assertNotEqual(get_catalog_version(), catalog_version)
+
+    def test_card_timeout_from_settings(self):
+        with self.settings(PRODUCT_CARD_CACHE_TIMEOUT=0):
+            card_cache.render_product_cards([self.product], 'menu_card.html')
+            card_cache.render_product_cards([self.product], 'menu_card.html')
+        self.assertEqual(card_cache.get_stats()['misses'], 2)
+
+
+class RatingStatsTest(TestCase):
+    """Kolom rating_* di Product selalu sama dengan hasil hitung ulang dari tabel Review"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.users = [CustomUser.objects.create(username=f'pelanggan{index}') for index in range(3)]
+        category = Category.objects.create(name='Nasi')
+        cls.product, cls.other = [
+            Product.objects.create(category=category, name=name, description='-', price=25000, stock=10)
+            for name in ('Nasi Kuning', 'Nasi Uduk')
+        ]
+
+    def assertStats(self, product, counts):
+        """counts: {rating: jumlah review approved}"""
+        product = Product.objects.get(pk=product.pk)
+        total = sum(counts.values())
+        average = sum(rating * count for rating, count in counts.items()) / total if total else 0
+        self.assertEqual(product.rating_count, total)
+        self.assertAlmostEqual(product.rating_average, average)
+        for rating in range(1, 6):
+            self.assertEqual(getattr(product, f'rating_{rating}_count'), counts.get(rating, 0))
+
+    def review(self, user, rating, **extra):
+        return Review.objects.create(product=self.product, user=user, rating=rating, comment='-', **extra)
+
+    def test_incremental_updates(self):
+        first = self.review(self.users[0], 5)
+        self.assertStats(self.product, {5: 1})
+        pending = self.review(self.users[1], 2, is_approved=False)
+        self.assertStats(self.product, {5: 1})
+
+        pending.is_approved = True
+        pending.save()
+        self.assertStats(self.product, {5: 1, 2: 1})
+
+        first.rating = 4
+        first.save()
+        self.assertStats(self.product, {4: 1, 2: 1})
+
+        # Pindah produk: statistik kedua produk ikut berubah
+        first = Review.objects.get(pk=first.pk)
+        first.product = self.other
+        first.save()
+        self.assertStats(self.product, {2: 1})
+        self.assertStats(self.other, {4: 1})
+
+        pending.delete()
+        self.assertStats(self.product, {})
+        Review.objects.get(pk=first.pk).delete()
+        self.assertStats(self.other, {})
+
+    def test_admin_moderation_actions(self):
+        reviews = [self.review(user, rating) for user, rating in zip(self.users, (5, 3, 1))]
+        self.client.force_login(self.admin)
+        url = reverse('admin:products_review_changelist')
+
+        self.client.post(url, {'action': 'reject_reviews', '_selected_action': [r.pk for r in reviews[:2]]})
+        self.assertStats(self.product, {1: 1})
+        self.client.post(url, {'action': 'approve_reviews', '_selected_action': [reviews[0].pk]})
+        self.assertStats(self.product, {5: 1, 1: 1})
+
+    def test_rebuild(self):
+        self.review(self.users[0], 5)
+        self.review(self.users[1], 4)
+        self.review(self.users[2], 4, is_approved=False)
+        # Perubahan lewat queryset.update() tidak memicu signal
+        Review.objects.filter(rating=5).update(rating=3)
+        Product.objects.filter(pk=self.other.pk).update(rating_count=7, rating_5_count=7, rating_average=5)
+
+        out = StringIO()
+        call_command('rebuild_rating_stats', stdout=out)
+        self.assertIn('2 produk diperbarui', out.getvalue())
+        self.assertStats(self.product, {3: 1, 4: 1})
+        self.assertStats(self.other, {})
+
+    def test_add_review_view(self):
+        url = reverse('add_review', args=[self.product.pk])
+        self.client.force_login(self.users[0])
+        self.client.post(url, {'rating': '4', 'comment': 'Enak'})
+        self.assertStats(self.product, {4: 1})
+        # Review kedua dari user yang sama memperbarui review lama (update_or_create)
+        self.client.post(url, {'rating': '2', 'comment': 'Kurang'})
+        self.assertStats(self.product, {2: 1})
+        self.client.force_login(self.users[1])
+        self.client.post(url, {'rating': '5', 'comment': 'Mantap'})
+        self.assertStats(self.product, {2: 1, 5: 1})
+        self.assertEqual(Review.objects.count(), 2)
+
+
+class ProductSearchTest(TestCase):
+    """Pencarian full-text: prefix, tanpa aksen/ejaan lama, toleran typo, index ikut rename"""
+
+    @classmethod
+    def setUpTestData(cls):
+        nasi = Category.objects.create(name='Nasi')
+        dessert = Category.objects.create(name='Dessert')
+        cls.goreng, cls.brulee, cls.cendol = [
+            Product.objects.create(category=category, name=name, description='-', price=25000, stock=10)
+            for category, name in [
+                (nasi, 'Nasi Goreng Spesial'),
+                (dessert, 'Crème Brûlée'),
+                (dessert, 'Es Tjendol'),
+            ]
+        ]
+
+    def setUp(self):
+        # Kosakata koreksi typo di-cache per proses
+        get_backend().invalidate_vocabulary()
+
+    def assertFound(self, query, products):
+        self.assertEqual(search_products(query), products)
+        self.assertEqual(
+            list(filter_products(Product.objects.order_by('pk'), query)),
+            sorted(products, key=lambda product: product.pk),
+        )
+
+    def test_prefix(self):
+        self.assertFound('gor', [self.goreng])
+        self.assertFound('nasi spes', [self.goreng])
+        self.assertFound('dess', [self.brulee, self.cendol])
+
+    def test_accent_and_old_spelling(self):
+        self.assertFound('creme brulee', [self.brulee])
+        self.assertFound('Crème', [self.brulee])
+        self.assertFound('cendol', [self.cendol])
+
+    def test_typo(self):
+        self.assertFound('gorng', [self.goreng])
+        self.assertFound('nais goreng', [self.goreng])
+        self.assertFound('xyzqw', [])
+
+    def test_reindex_after_rename(self):
+        self.goreng.name = 'Rendang Sapi'
+        self.goreng.save()
+        get_backend().invalidate_vocabulary()
+        self.assertFound('rendang', [self.goreng])
+        self.assertFound('goreng', [])
+
+        # Nama kategori ikut diindex
+        category = self.cendol.category
+        category.name = 'Minuman'
+        category.save()
+        self.assertFound('minuman', [self.brulee, self.cendol])
+        self.assertFound('dessert', [])
+
+    def test_fallback_backend(self):
+        backend = FallbackSearchBackend()
+        sql, params = backend.match_sql('goreng')
+        self.assertEqual(
+            list(Product.objects.filter(pk__in=RawSQL(sql, params))),
+            list(backend.filter_queryset(Product.objects.all(), 'goreng')),
+        )
+        self.assertEqual(backend.search('dessert', 10), [self.brulee.pk, self.cendol.pk])
+
+
+class CatalogApiTest(TestCase):
+    """Conditional GET dan content negotiation untuk snapshot katalog"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Nasi')
+        cls.product = Product.objects.create(
+            category=category, name='Nasi Kuning', description='-', price=25000, stock=10,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_conditional_get(self):
+        url = reverse('catalog_api')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        self.assertEqual(response.json()['products'][0]['name'], 'Nasi Kuning')
+
+        # State di-cache per versi katalog: revalidasi tanpa query agregat
+        with self.assertNumQueries(0):
+            response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(url, headers={'If-Modified-Since': last_modified})
+        self.assertEqual(response.status_code, 304)
+
+        self.product.name = 'Nasi Uduk'
+        self.product.save()
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['products'][0]['name'], 'Nasi Uduk')
+
+    def test_deletion_changes_etag(self):
+        url = reverse('catalog_api')
+        etag = self.client.get(url)['ETag']
+        Product.objects.all().delete()
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['products'], [])
+
+    def test_gzip_response(self):
+        url = reverse('catalog_api')
+        plain = self.client.get(url)
+        compressed = self.client.get(url, headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', compressed['Vary'])
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+        self.assertFalse(plain.has_header('Content-Encoding'))
+
+    def test_choose_encoding(self):
+        both = {'identity': b'', 'gzip': b'', 'br': b''}
+        gzip_only = {'identity': b'', 'gzip': b''}
+        cases = [
+            ('', both, 'identity'),
+            ('gzip', both, 'gzip'),
+            ('gzip, br', both, 'br'),
+            ('br;q=0, gzip', both, 'gzip'),
+            ('GZIP;q=0.5', both, 'gzip'),
+            ('br', gzip_only, 'identity'),
+            ('gzip;q=abc', both, 'identity'),
+            ('deflate, *', both, 'identity'),
+        ]
+        for accept_encoding, available, expected in cases:
+            with self.subTest(accept_encoding=accept_encoding, available=list(available)):
+                self.assertEqual(choose_encoding(accept_encoding, available), expected)
+
+
+class CategoryAdminTest(TestCase):
+    """Inline produk per halaman dan bulk update produk satu kategori"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.category = Category.objects.create(name='Nasi')
+        other = Category.objects.create(name='Minuman')
+        Product.objects.bulk_create([
+            Product(
+                category=cls.category, name=f'Menu {index}', slug=f'menu-{index}',
+                description='-', price=10000 + index, stock=10,
+            )
+            for index in range(45)
+        ] + [Product(category=other, name='Es Teh', slug='es-teh', description='-', price=5000, stock=10)])
+        cls.change_url = reverse('admin:products_category_change', args=[cls.category.pk])
+        cls.bulk_url = reverse('admin:products_category_bulk_update', args=[cls.category.pk])
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def inline_formset(self, params=None):
+        response = self.client.get(self.change_url, params)
+        self.assertEqual(response.status_code, 200)
+        return response, response.context['inline_admin_formsets'][0].formset
+
+    def test_inline_pages(self):
+        _, formset = self.inline_formset()
+        self.assertIsInstance(formset, PaginatedInlineFormSet)
+        self.assertEqual((formset.page, formset.num_pages, formset.total_count), (1, 3, 45))
+        self.assertEqual(len(formset.forms), 20)
+
+        cases = [('3', 3, 5), ('99', 3, 5), ('0', 1, 20), ('abc', 1, 20)]
+        for page, expected_page, forms in cases:
+            with self.subTest(page=page):
+                _, formset = self.inline_formset({'inline_page': page})
+                self.assertEqual(formset.page, expected_page)
+                self.assertEqual(len(formset.forms), forms)
+
+        pages = [
+            {form.instance.pk for form in self.inline_formset({'inline_page': page})[1].forms}
+            for page in (1, 2, 3)
+        ]
+        self.assertEqual(len(set.union(*pages)), 45)
+
+    def test_inline_links_keep_query_string(self):
+        filters = 'is_active__exact=1'
+        response, _ = self.inline_formset({'_changelist_filters': filters, 'inline_page': '2'})
+        expected = QueryDict(mutable=True)
+        expected.update({'_changelist_filters': filters, 'inline_page': 3})
+        self.assertContains(response, f'href="?{escape(expected.urlencode())}"')
+        self.assertNotContains(response, 'href="?inline_page=')
+
+    def test_save_one_inline_page(self):
+        response, formset = self.inline_formset({'inline_page': '2'})
+        data = {
+            'name': 'Nasi', 'slug': 'nasi', 'description': '', 'is_active': 'on',
+            f'{formset.prefix}-TOTAL_FORMS': len(formset.forms),
+            f'{formset.prefix}-INITIAL_FORMS': len(formset.forms),
+        }
+        for form in formset.forms:
+            data.update({
+                form.add_prefix('id'): form.instance.pk,
+                form.add_prefix('category'): self.category.pk,
+                form.add_prefix('name'): form.instance.name,
+                form.add_prefix('price'): form.instance.price,
+                form.add_prefix('stock'): 99,
+                form.add_prefix('status'): form.instance.status,
+            })
+        response = self.client.post(f'{self.change_url}?inline_page=2', data)
+        self.assertEqual(response.status_code, 302)
+        page_ids = [form.instance.pk for form in formset.forms]
+        self.assertEqual(Product.objects.filter(stock=99).count(), 20)
+        self.assertFalse(Product.objects.filter(stock=99).exclude(pk__in=page_ids).exists())
+
+    def test_bulk_update_price_percent(self):
+        response = self.client.get(self.bulk_url)
+        self.assertContains(response, '45 produk')
+
+        response = self.client.post(self.bulk_url, {'price_percent': '10', 'status': 'inactive'})
+        self.assertRedirects(response, self.change_url)
+        products = Product.objects.filter(category=self.category)
+        self.assertEqual(products.get(slug='menu-5').price, 11006)  # 10005 * 1.1 dibulatkan
+        self.assertEqual(set(products.values_list('status', flat=True)), {'inactive'})
+        self.assertEqual(Product.objects.get(slug='es-teh').price, 5000)
+
+    def test_bulk_update_stock_zero(self):
+        self.client.post(self.bulk_url, {'stock': '0'})
+        products = Product.objects.filter(category=self.category)
+        self.assertEqual(set(products.values_list('stock', 'status')), {(0, 'out_of_stock')})
+
+    def test_bulk_update_invalid(self):
+        response = self.client.post(self.bulk_url, {'price': '1000', 'price_percent': '10'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Pilih salah satu')
+        self.assertFalse(Product.objects.filter(price=1000).exists())
+
+    def test_bulk_update_requires_product_permission(self):
+        staff = CustomUser.objects.create_user('staff', password='password', is_staff=True)
+        staff.user_permissions.add(Permission.objects.get(codename='change_category'))
+        self.client.force_login(staff)
+        response = self.client.post(self.bulk_url, {'stock': '0'})
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Product.objects.filter(stock=0).exists())
+
+
+class CategoryBulkUpdateFormTest(TestCase):
+    def test_requires_one_change(self):
+        form = CategoryBulkUpdateForm({})
+        self.assertFalse(form.is_valid())
+        self.assertIn('Isi minimal satu perubahan.', form.non_field_errors())
+
+    def test_price_and_percent_exclusive(self):
+        form = CategoryBulkUpdateForm({'price': '1000', 'price_percent': '10'})
+        self.assertFalse(form.is_valid())
+
+    def test_update_kwargs(self):
+        form = CategoryBulkUpdateForm({'stock': '0', 'status': 'active', 'price': '15000'})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(
+            form.get_update_kwargs(),
+            {'stock': 0, 'status': 'out_of_stock', 'price': Decimal('15000')},
+        )
+
+    def test_percent_bounds(self):
+        self.assertFalse(CategoryBulkUpdateForm({'price_percent': '-100'}).is_valid())
+        self.assertTrue(CategoryBulkUpdateForm({'price_percent': '-99'}).is_valid())
+
+    def test_price_whole_rupiah(self):
+        form = CategoryBulkUpdateForm({'price': '1500.50'})
+        self.assertFalse(form.is_valid())
+        self.assertIn('price', form.errors)
+        self.assertTrue(CategoryBulkUpdateForm({'price': '1500'}).is_valid())
+        self.assertFalse(CategoryBulkUpdateForm({'price': '1' * 13}).is_valid())
+
+
+def make_image(width, height, orientation=None, image_format='JPEG'):
+    """Bytes gambar uji: kiri merah, kanan biru (untuk mengecek rotasi)"""
+    image = Image.new('RGB', (width, height), (255, 0, 0))
+    image.paste((0, 0, 255), (width // 2, 0, width, height))
+    exif = Image.Exif()
+    exif[0x010F] = 'Kamera Uji'  # Make
+    if orientation:
+        exif[0x0112] = orientation
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, exif=exif)
+    return buffer.getvalue()
+
+
+class ImageDerivativesTest(TestCase):
+    """Turunan WebP/JPEG responsive untuk gambar produk"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Nasi')
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(self.settings(MEDIA_ROOT=media_root, BACKGROUND_TASKS_SYNC=True))
+
+    def open_variant(self, name):
+        with default_storage.open(name) as file:
+            image = Image.open(io.BytesIO(file.read()))
+            image.load()
+        return image
+
+    def create_product(self, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(
+                category=self.category, name='Nasi Kuning', description='-', price=25000, stock=10,
+                image=SimpleUploadedFile('nasi.jpg', data, content_type='image/jpeg'),
+            )
+        product.refresh_from_db()
+        return product
+
+    def test_widths_and_names(self):
+        variants = images.build_derivatives(make_image(1000, 500))
+        self.assertEqual((variants['width'], variants['height']), (1000, 500))
+        for extension, pil_format in (('webp', 'WEBP'), ('jpeg', 'JPEG')):
+            self.assertEqual([width for width, _ in variants[extension]], [320, 640, 960, 1000])
+            for width, name in variants[extension]:
+                self.assertEqual(
+                    name, f'products/derivatives/{variants["hash"][:2]}/{variants["hash"]}-{width}w.{extension}'
+                )
+                image = self.open_variant(name)
+                self.assertEqual((image.format, image.width), (pil_format, width))
+        # Gambar kecil tidak diperbesar
+        self.assertEqual([width for width, _ in images.build_derivatives(make_image(200, 100))['jpeg']], [200])
+
+    def test_exif_stripped_and_orientation_applied(self):
+        # Orientation 6: tampil diputar 90° searah jarum jam
+        variants = images.build_derivatives(make_image(400, 200, orientation=6))
+        self.assertEqual((variants['width'], variants['height']), (200, 400))
+        for extension in ('webp', 'jpeg'):
+            image = self.open_variant(variants[extension][-1][1])
+            self.assertEqual(image.size, (200, 400))
+            self.assertEqual(dict(image.getexif()), {})
+            self.assertNotIn('exif', image.info)
+            # Setelah diputar, merah (kiri) ada di atas
+            red, _, blue = image.convert('RGB').getpixel((100, 50))
+            self.assertGreater(red, blue)
+
+    def test_name_depends_on_encoding_parameters(self):
+        data = make_image(400, 200)
+        first = images.build_derivatives(data)
+        self.assertEqual(images.build_derivatives(data)['hash'], first['hash'])
+        with mock.patch.dict(images.FORMATS, {'jpeg': ('JPEG', {'quality': 60})}):
+            self.assertNotEqual(images.build_derivatives(data)['hash'], first['hash'])
+        with mock.patch.object(images, 'WIDTHS', (200, 400)):
+            variants = images.build_derivatives(data)
+        self.assertNotEqual(variants['hash'], first['hash'])
+        self.assertEqual([width for width, _ in variants['jpeg']], [200, 400])
+
+    def test_force_rewrites_existing_files(self):
+        data = make_image(400, 200)
+        name = images.build_derivatives(data)['jpeg'][0][1]
+        with default_storage.open(name, 'wb') as file:
+            file.write(b'rusak')
+        self.assertEqual(images.build_derivatives(data)['jpeg'][0][1], name)
+        with default_storage.open(name) as file:
+            self.assertEqual(file.read(), b'rusak')
+        self.assertEqual(images.build_derivatives(data, force=True)['jpeg'][0][1], name)
+        self.assertEqual(self.open_variant(name).format, 'JPEG')
+
+    def test_generated_after_upload(self):
+        product = self.create_product(make_image(800, 400))
+        self.assertEqual(product.image_variants['source'], product.image.name)
+        self.assertEqual([width for width, _ in product.image_variants['webp']], [320, 640, 800])
+        self.assertFalse(images.generate_derivatives(product.pk))
+        self.assertTrue(images.generate_derivatives(product.pk, force=True))
+
+    def test_image_replaced_during_generation(self):
+        product = self.create_product(make_image(800, 400))
+        Product.objects.filter(pk=product.pk).update(image_variants={})
+        build = images.build_derivatives
+
+        def replaced_meanwhile(data, force=False):
+            Product.objects.filter(pk=product.pk).update(image='products/baru.jpg')
+            return build(data, force)
+
+        with mock.patch.object(images, 'build_derivatives', side_effect=replaced_meanwhile):
+            self.assertFalse(images.generate_derivatives(product.pk))
+        self.assertEqual(Product.objects.get(pk=product.pk).image_variants, {})
+
+    def test_product_picture_tag(self):
+        template = Template("{% load product_images %}{% product_picture product 'menu-img' %}")
+        product = self.create_product(make_image(800, 400))
+        html = template.render(Context({'product': product}))
+        webp = ', '.join(f'/media/{name} {width}w' for width, name in product.image_variants['webp'])
+        jpeg_640 = product.image_variants['jpeg'][1][1]
+        self.assertInHTML(
+            f'<picture><source type="image/webp" srcset="{webp}" sizes="{DEFAULT_SIZES}">'
+            f'<img src="/media/{jpeg_640}" srcset="{product.get_image_srcset("jpeg")}" sizes="{DEFAULT_SIZES}" '
+            f'alt="Nasi Kuning" class="menu-img" loading="lazy" decoding="async"></picture>',
+            html,
+        )
+
+        product.image_variants = {}
+        html = template.render(Context({'product': product}))
+        self.assertInHTML(
+            f'<img src="{product.image.url}" alt="Nasi Kuning" class="menu-img" loading="lazy">', html,
+        )
+
+    def test_backfill_command(self):
+        product = self.create_product(make_image(800, 400))
+        Product.objects.create(category=self.category, name='Tanpa Gambar', description='-', price=1, stock=1)
+        Product.objects.filter(pk=product.pk).update(image_variants={})
+
+        out = StringIO()
+        call_command('generate_image_derivatives', stdout=out)
+        self.assertIn('1 produk diproses, 0 dilewati', out.getvalue())
+        self.assertEqual(Product.objects.get(pk=product.pk).image_variants['source'], product.image.name)
+
+        out = StringIO()
+        call_command('generate_image_derivatives', stdout=out)
+        self.assertIn('0 produk diproses, 1 dilewati', out.getvalue())
+        out = StringIO()
+        call_command('generate_image_derivatives', '--force', '--product', str(product.pk), stdout=out)
+        self.assertIn('1 produk diproses', out.getvalue())
+
+
+class AnonymousPageCacheTest(TestCase):
+    """cache_anonymous_page: hanya visitor anonim tanpa state per visitor yang dilayani dari cache"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(username='pelanggan')
+        category = Category.objects.create(name='Nasi')
+        cls.product = Product.objects.create(
+            category=category, name='Nasi Kuning', description='-', price=25000, stock=10,
+            is_featured=True,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.calls = 0
+
+    def counting_view(self, respond=None):
+        @cache_anonymous_page
+        def view(request):
+            self.calls += 1
+            response = HttpResponse('halaman')
+            if respond:
+                respond(request, response)
+            return response
+        return view
+
+    def request(self, **cookies):
+        request = self.factory.get('/halaman/')
+        request.user = AnonymousUser()
+        request.COOKIES.update(cookies)
+        return request
+
+    def test_anonymous_page_cached_with_etag(self):
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, 'Nasi Kuning')
+        etag = response['ETag']
+        self.assertIn('public', response['Cache-Control'])
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(reverse('home'))
+        self.assertEqual((cached.content, cached['ETag']), (response.content, etag))
+
+        not_modified = self.client.get(reverse('home'), headers={'If-None-Match': etag})
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b'')
+
+    def test_catalog_change_invalidates_page(self):
+        etag = self.client.get(reverse('home'))['ETag']
+        self.product.name = 'Nasi Uduk'
+        self.product.save()
+        response = self.client.get(reverse('home'), headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Nasi Uduk')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_authenticated_user_not_cached(self):
+        self.client.get(reverse('home'))
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('home'))
+        self.assertFalse(response.has_header('ETag'))
+
+        view = self.counting_view()
+        request = self.request()
+        request.user = self.user
+        view(request)
+        view(request)
+        self.assertEqual(self.calls, 2)
+
+    def test_request_with_messages_not_cached(self):
+        view = self.counting_view()
+        for _ in range(2):
+            request = self.request()
+            request._messages = CookieStorage(request)
+            request._messages.add(messages.SUCCESS, 'Anda telah berhasil keluar')
+            self.assertFalse(view(request).has_header('ETag'))
+        self.assertEqual(self.calls, 2)
+
+    def test_guest_cart_cookie_not_cached(self):
+        view = self.counting_view()
+        view(self.request(guest_cart='isi'))
+        view(self.request(guest_cart='isi'))
+        self.assertEqual(self.calls, 2)
+
+    def test_csrf_and_cookie_responses_not_cached(self):
+        responders = {
+            'csrf': lambda request, response: get_token(request),
+            'cookie': lambda request, response: response.set_cookie('pilihan', '1'),
+        }
+        for name, respond in responders.items():
+            with self.subTest(name):
+                cache.clear()
+                self.calls = 0
+                view = self.counting_view(respond)
+                self.assertFalse(view(self.request()).has_header('ETag'))
+                view(self.request())
+                self.assertEqual(self.calls, 2)
+
+        # Pembanding: response biasa di-cache
+        cache.clear()
+        self.calls = 0
+        view = self.counting_view()
+        view(self.request())
+        view(self.request())
+        self.assertEqual(self.calls, 1)
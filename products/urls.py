@@ -4,11 +4,16 @@ from . import views
 urlpatterns = [
     path('', views.home, name='home'),
     path('menu/', views.menu_list, name='menu'),
+    path('menu/search/', views.menu_search, name='menu_search'),
     path('checkout/<int:product_id>/', views.checkout, name='checkout'),
     path('contact/', views.contact, name='contact'),
+
+    # API
+    path('api/catalog/', views.catalog_api, name='catalog_api'),
     
     # Review
     path('product/<int:product_id>/review/', views.add_review, name='add_review'),
+    path('product/<int:product_id>/reviews/', views.product_reviews, name='product_reviews'),
     
     # Redirect product detail ke checkout
     path('product/<int:pk>/', views.product_detail, name='product_detail'),
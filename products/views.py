@@ -1,10 +1,40 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition, require_GET
+from django.template.loader import render_to_string
+from django.urls import reverse
+from . import api
+from .catalog import cache_anonymous_page
 from .models import Product, Review, Category
-from decimal import Decimal
+from .pricing import portion_prices
+from .search import DEFAULT_LIMIT, filter_products, search_products
+from backend.pagination import paginate_keyset
 
+MENU_PAGE_SIZE = 24
 
+# Urutan menu: field terakhir selalu 'id' agar cursor keyset unik
+MENU_SORTS = {
+    'newest': ['-created_at', '-id'],
+    'price_low': ['price', 'id'],
+    'price_high': ['-price', '-id'],
+    'rating': ['-rating_average', '-id'],
+}
+
+REVIEW_PAGE_SIZE = 10
+REVIEW_ORDERING = ['-created_at', '-id']
+
+MENU_SORT_CHOICES = [
+    ('newest', 'Terbaru'),
+    ('price_low', 'Harga Terendah'),
+    ('price_high', 'Harga Tertinggi'),
+    ('rating', 'Rating Tertinggi'),
+]
+
+
+@cache_anonymous_page
 def home(request):
     """Homepage - TETAP BISA DIAKSES TANPA LOGIN"""
     categories = Category.objects.filter(is_active=True)
@@ -21,14 +51,64 @@ def home(request):
     return render(request, 'home.html', context)
 
 
+def filter_menu_products(params):
+    """
+    Terapkan filter menu (category, search) dari query string.
+
+    Returns:
+        tuple: (queryset, filters) dengan filters berisi nilai yang dipakai
+    """
+    category = params.get('category', '').strip()
+    search = params.get('search', '').strip()
+    sort = params.get('sort', 'newest')
+    if sort not in MENU_SORTS:
+        sort = 'newest'
+
+    products = Product.objects.filter(status='active').select_related('category')
+    if category:
+        products = products.filter(category__slug=category)
+    if search:
+        products = filter_products(products, search)
+
+    filters = {'category': category, 'search': search, 'sort': sort}
+    return products, filters
+
+
 @login_required
 def menu_list(request):
-    """Menu page - WAJIB LOGIN"""
-    products = Product.objects.filter(status='active').select_related('category')
+    """
+    Menu page - WAJIB LOGIN
+
+    Query params: category (slug), search, sort, cursor.
+    Dengan ?format=json mengembalikan potongan HTML kartu + cursor
+    berikutnya untuk dimuat menu.js tanpa reload.
+    """
+    products, filters = filter_menu_products(request.GET)
+    cursor = request.GET.get('cursor')
+    page = paginate_keyset(products, MENU_SORTS[filters['sort']], cursor, MENU_PAGE_SIZE)
+    first_page = not cursor
+
+    if request.GET.get('format') == 'json':
+        html = render_to_string(
+            'menu_cards.html',
+            {'products': page.items, 'first_page': first_page},
+            request=request,
+        )
+        return JsonResponse({
+            'html': html,
+            'count': len(page),
+            'next_cursor': page.next_cursor,
+            'has_next': page.has_next,
+        })
+
     categories = Category.objects.filter(is_active=True)
     
     context = {
-        'products': products,
+        'products': page.items,
+        'page': page,
+        'first_page': first_page,
+        'filters': filters,
+        'sort_choices': MENU_SORT_CHOICES,
         'categories': categories,
         'show_search': True,  # ← SEARCH BAR MUNCUL DI MENU
     }
@@ -36,31 +116,126 @@ def menu_list(request):
 
 
 @login_required
+def menu_search(request):
+    """
+    Pencarian menu (JSON), urut relevansi.
+
+    Query params: q, limit (maks 50)
+    """
+    query = request.GET.get('q', '').strip()
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        limit = DEFAULT_LIMIT
+
+    products = search_products(query, limit) if query else []
+    results = [
+        {
+            'id': product.pk,
+            'name': product.name,
+            'slug': product.slug,
+            'category': product.category.name,
+            'price': int(product.price),
+            'image': product.get_image_url(),
+            'rating': product.get_average_rating(),
+            'review_count': product.get_review_count(),
+            'url': reverse('product_detail', args=[product.pk]),
+        }
+        for product in products
+    ]
+    return JsonResponse({'query': query, 'count': len(results), 'results': results})
+
+
+def _catalog_state(request):
+    """Hitung state katalog sekali per request (dipakai ETag & Last-Modified)"""
+    if not hasattr(request, '_catalog_state'):
+        request._catalog_state = api.catalog_state()
+    return request._catalog_state
+
+
+@require_GET
+@condition(
+    etag_func=lambda request: _catalog_state(request)[0],
+    last_modified_func=lambda request: _catalog_state(request)[1],
+)
+def catalog_api(request):
+    """
+    Snapshot katalog (JSON) untuk menu page dan mobile app.
+    Mendukung conditional GET (ETag / Last-Modified) dan gzip/brotli.
+    """
+    version = _catalog_state(request)[0]
+    encoded = api.get_encoded_document(version)
+    encoding = api.choose_encoding(request.headers.get('Accept-Encoding', ''), encoded)
+
+    response = HttpResponse(encoded[encoding], content_type='application/json')
+    if encoding != 'identity':
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ('Accept-Encoding',))
+    patch_cache_control(response, public=True, max_age=0, must_revalidate=True)
+    return response
+
+
+def get_review_page(product_id, cursor=None):
+    """Satu halaman review approved (keyset), memakai index product/is_approved/created_at"""
+    reviews = (
+        Review.objects.filter(product_id=product_id, is_approved=True)
+        .select_related('user')
+        .only('id', 'rating', 'comment', 'created_at', 'user__username')
+    )
+    return paginate_keyset(reviews, REVIEW_ORDERING, cursor, REVIEW_PAGE_SIZE)
+
+
 def checkout(request, product_id):
-    """Checkout page - WAJIB LOGIN"""
+    """
+    Halaman produk + form checkout.
+
+    Tamu boleh melihat dan menambah ke keranjang (cookie); checkout
+    langsung dan review tetap wajib login.
+    """
     product = get_object_or_404(Product, pk=product_id)
-    reviews = product.reviews.filter(is_approved=True).select_related('user')
+    # Halaman pertama saja; sisanya dimuat lewat product_reviews
+    review_page = get_review_page(product.pk)
     
     user_review = None
     if request.user.is_authenticated:
-        user_review = reviews.filter(user=request.user).first()
+        # Lookup tunggal lewat unique index (product, user)
+        user_review = Review.objects.filter(
+            product=product, user=request.user, is_approved=True
+        ).first()
     
-    base_price = product.price
-    mid_price = base_price * Decimal('0.8')
-    low_price = base_price * Decimal('0.6')
+    price_high, price_mid, price_low = portion_prices(product.price)
     
     context = {
         'product': product,
-        'reviews': reviews,
+        'reviews': review_page.items,
+        'review_page': review_page,
         'user_review': user_review,
-        'price_high': int(base_price),
-        'price_mid': int(mid_price),
-        'price_low': int(low_price),
+        'price_high': price_high,
+        'price_mid': price_mid,
+        'price_low': price_low,
         'show_search': False,  # ← SEARCH BAR TIDAK MUNCUL
     }
     return render(request, 'checkout.html', context)
 
 
+@require_GET
+def product_reviews(request, product_id):
+    """
+    Halaman review berikutnya untuk checkout.js (JSON).
+
+    Query params: cursor dari response sebelumnya / data-next-cursor.
+    """
+    product = get_object_or_404(Product.objects.only('pk'), pk=product_id)
+    page = get_review_page(product.pk, request.GET.get('cursor'))
+    html = render_to_string('review_items.html', {'reviews': page.items}, request=request)
+    return JsonResponse({
+        'html': html,
+        'count': len(page),
+        'next_cursor': page.next_cursor,
+        'has_next': page.has_next,
+    })
+
+
 def contact(request):
     """Contact page"""
     context = {
@@ -69,7 +244,6 @@ def contact(request):
     return render(request, 'contact.html', context)
 
 
-@login_required
 def product_detail(request, pk):
     """Redirect ke checkout"""
     return redirect('checkout', product_id=pk)
@@ -0,0 +1,147 @@
+// ==========================================
+// CART PAGE - Batch update tanpa reload
+// ==========================================
+
+document.addEventListener('DOMContentLoaded', function() {
+    const cartContent = document.querySelector('.cart-content');
+    if (!cartContent || !window.fetch) return;
+
+    const batchUrl = cartContent.dataset.batchUrl;
+    const csrfInput = document.querySelector('[name=csrfmiddlewaretoken]');
+    const csrfToken = csrfInput ? csrfInput.value : '';
+
+    // Operasi yang belum dikirim: product_id -> operasi terakhir
+    const pending = new Map();
+    let flushTimer = null;
+    let inFlight = false;
+    const FLUSH_DELAY = 400;
+
+    function formatRupiah(value) {
+        return 'Rp ' + Math.round(value).toLocaleString('id-ID');
+    }
+
+    function getItem(productId) {
+        return cartContent.querySelector(`.cart-item[data-product-id="${productId}"]`);
+    }
+
+    function getQuantity(item) {
+        return parseInt(item.querySelector('.quantity-display strong').textContent, 10) || 0;
+    }
+
+    // ==========================================
+    // UPDATE TAMPILAN
+    // ==========================================
+    function renderTotals(data) {
+        document.querySelectorAll('[data-cart-count]').forEach(el => {
+            el.textContent = data.count;
+        });
+        document.querySelectorAll('[data-cart-subtotal]').forEach(el => {
+            el.textContent = formatRupiah(data.subtotal);
+        });
+
+        const headerCount = document.querySelector('.cart-header .cart-count');
+        if (headerCount) headerCount.textContent = data.count + ' item';
+
+        const badge = document.getElementById('cartBadge');
+        if (badge) {
+            badge.textContent = data.count;
+            badge.classList.toggle('has-items', data.count > 0);
+            badge.style.display = data.count > 0 ? 'flex' : 'none';
+        }
+
+        data.items.forEach(line => {
+            const item = getItem(line.product_id);
+            if (!item) return;
+            item.querySelector('.quantity-display strong').textContent = line.quantity;
+            item.querySelector('.item-total').textContent = formatRupiah(line.line_total);
+        });
+
+        // Keranjang kosong: tampilkan empty state dari server
+        if (data.count === 0) window.location.reload();
+    }
+
+    // ==========================================
+    // KIRIM BATCH
+    // ==========================================
+    function scheduleFlush() {
+        clearTimeout(flushTimer);
+        flushTimer = setTimeout(flush, FLUSH_DELAY);
+    }
+
+    function flush() {
+        if (inFlight || pending.size === 0) {
+            if (pending.size) scheduleFlush();
+            return;
+        }
+
+        const operations = Array.from(pending.values());
+        pending.clear();
+        inFlight = true;
+        cartContent.classList.add('saving');
+
+        fetch(batchUrl, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': csrfToken,
+                'X-Requested-With': 'XMLHttpRequest',
+            },
+            credentials: 'same-origin',
+            body: JSON.stringify({ operations: operations }),
+        })
+            .then(response => response.json())
+            .then(data => {
+                if (!data.success) throw new Error(data.error);
+                // Klik yang terjadi selama request tetap tampil sampai batch berikutnya
+                if (pending.size === 0) renderTotals(data);
+            })
+            .catch(error => {
+                console.error('Gagal update keranjang:', error);
+                window.location.reload();
+            })
+            .finally(() => {
+                inFlight = false;
+                cartContent.classList.remove('saving');
+                if (pending.size) scheduleFlush();
+            });
+    }
+
+    // ==========================================
+    // TOMBOL +/- DAN HAPUS
+    // ==========================================
+    cartContent.querySelectorAll('form[data-cart-action]').forEach(form => {
+        form.addEventListener('submit', function(e) {
+            e.preventDefault();
+            const item = this.closest('.cart-item');
+            const productId = parseInt(item.dataset.productId, 10);
+            const action = this.dataset.cartAction;
+
+            let quantity = getQuantity(item);
+            if (action === 'increase') quantity += 1;
+            if (action === 'decrease') quantity -= 1;
+
+            if (action === 'remove' || quantity < 1) {
+                pending.set(productId, { op: 'remove', product_id: productId });
+                item.remove();
+            } else {
+                pending.set(productId, { op: 'update', product_id: productId, quantity: quantity });
+                item.querySelector('.quantity-display strong').textContent = quantity;
+            }
+            scheduleFlush();
+        });
+    });
+
+    // Jangan sampai perubahan hilang saat user pindah halaman
+    window.addEventListener('pagehide', function() {
+        if (pending.size === 0) return;
+        // fetch keepalive (bukan sendBeacon) agar header CSRF tetap terkirim
+        fetch(batchUrl, {
+            method: 'POST',
+            keepalive: true,
+            headers: { 'Content-Type': 'application/json', 'X-CSRFToken': csrfToken },
+            credentials: 'same-origin',
+            body: JSON.stringify({ operations: Array.from(pending.values()) }),
+        });
+        pending.clear();
+    });
+});
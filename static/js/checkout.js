@@ -408,9 +408,13 @@ document.addEventListener('DOMContentLoaded', function() {
                 
                 if (response.ok) {
                     return response.json();
-                } else {
-                    throw new Error('Request failed with status ' + response.status);
                 }
+                // Mis. keranjang tamu penuh: tampilkan pesan dari server
+                return response.json().catch(() => ({})).then(data => {
+                    const error = new Error(data.error || 'Request failed with status ' + response.status);
+                    error.serverMessage = data.error;
+                    throw error;
+                });
             })
             .then(data => {
                 console.log('Response data:', data); // ✅ Debug log
@@ -436,7 +440,9 @@ document.addEventListener('DOMContentLoaded', function() {
             })
             .catch(error => {
                 console.error('Error:', error); // ✅ Debug log
-                showNotification('❌ Gagal menambahkan ke keranjang. Silakan coba lagi.');
+                showNotification(error.serverMessage
+                    ? '⚠️ ' + error.serverMessage
+                    : '❌ Gagal menambahkan ke keranjang. Silakan coba lagi.');
                 addToCartBtn.disabled = false;
                 addToCartBtn.innerHTML = originalHTML;
             });
@@ -635,4 +641,32 @@ document.addEventListener('DOMContentLoaded', function() {
             });
         });
     }
-});
\ No newline at end of file
+
+    // ==========================================
+    // REVIEW LIST - MUAT HALAMAN BERIKUTNYA (keyset cursor)
+    // ==========================================
+    const reviewList = document.querySelector('.review-list');
+    const loadReviewsBtn = document.querySelector('.btn-load-reviews');
+    
+    if (reviewList && loadReviewsBtn) {
+        loadReviewsBtn.addEventListener('click', function() {
+            const cursor = this.dataset.nextCursor;
+            if (!cursor) return;
+            
+            this.classList.add('loading');
+            const url = reviewList.dataset.url + '?cursor=' + encodeURIComponent(cursor);
+            fetch(url, {
+                headers: { 'X-Requested-With': 'XMLHttpRequest' },
+                credentials: 'same-origin',
+            })
+                .then(response => response.json())
+                .then(data => {
+                    reviewList.insertAdjacentHTML('beforeend', data.html);
+                    this.dataset.nextCursor = data.next_cursor || '';
+                    this.hidden = !data.has_next;
+                })
+                .catch(error => console.error('Gagal memuat review:', error))
+                .finally(() => this.classList.remove('loading'));
+        });
+    }
+});
@@ -3,13 +3,75 @@
 // ==========================================
 
 document.addEventListener('DOMContentLoaded', function() {
-    // Get all category buttons and menu cards
+    // Get all category buttons and menu grid
     const categoryButtons = document.querySelectorAll('.category-btn');
-    const menuCards = document.querySelectorAll('.menu-card');
     const menuGrid = document.querySelector('.menu-grid');
+    const sortSelect = document.getElementById('menuSort');
+    const loadMoreBtn = document.querySelector('.btn-load-more');
+
+    // State filter saat ini (sumber data: server, bukan DOM)
+    const params = new URLSearchParams(window.location.search);
+    const state = {
+        category: params.get('category') || '',
+        search: params.get('search') || '',
+        sort: params.get('sort') || (sortSelect ? sortSelect.value : 'newest'),
+        cursor: loadMoreBtn ? loadMoreBtn.dataset.nextCursor : '',
+    };
+
+    // ==========================================
+    // SERVER-SIDE FETCH (JSON + keyset cursor)
+    // ==========================================
+    function buildQuery(extra) {
+        const query = new URLSearchParams();
+        if (state.category) query.set('category', state.category);
+        if (state.search) query.set('search', state.search);
+        if (state.sort) query.set('sort', state.sort);
+        Object.entries(extra || {}).forEach(([key, value]) => {
+            if (value) query.set(key, value);
+        });
+        return query;
+    }
+
+    function updateLoadMore() {
+        if (!loadMoreBtn) return;
+        loadMoreBtn.dataset.nextCursor = state.cursor || '';
+        loadMoreBtn.href = '?' + buildQuery({ cursor: state.cursor }).toString();
+        loadMoreBtn.hidden = !state.cursor;
+    }
+
+    function fetchMenu(append) {
+        const query = buildQuery({ format: 'json', cursor: append ? state.cursor : '' });
+        const url = (menuGrid.dataset.url || window.location.pathname) + '?' + query.toString();
+
+        if (!append) menuGrid.style.opacity = '0.5';
+        if (loadMoreBtn) loadMoreBtn.classList.add('loading');
+
+        return fetch(url, {
+            headers: { 'X-Requested-With': 'XMLHttpRequest' },
+            credentials: 'same-origin',
+        })
+            .then(response => response.json())
+            .then(data => {
+                if (append) {
+                    menuGrid.insertAdjacentHTML('beforeend', data.html);
+                } else {
+                    menuGrid.innerHTML = data.html;
+                    showEmptyState(data.count);
+                    window.history.replaceState(null, '', '?' + buildQuery().toString());
+                }
+                state.cursor = data.next_cursor;
+                updateLoadMore();
+                initCards(menuGrid);
+            })
+            .catch(error => console.error('Gagal memuat menu:', error))
+            .finally(() => {
+                menuGrid.style.opacity = '1';
+                if (loadMoreBtn) loadMoreBtn.classList.remove('loading');
+            });
+    }
 
     // ==========================================
-    // CATEGORY FILTER WITH SMOOTH ANIMATION
+    // CATEGORY FILTER
     // ==========================================
     categoryButtons.forEach(button => {
         button.addEventListener('click', function() {
@@ -25,70 +87,45 @@ document.addEventListener('DOMContentLoaded', function() {
             // Add active and filtering class
             this.classList.add('active', 'filtering');
             
-            // Get selected category
-            const selectedCategory = this.getAttribute('data-category');
-            
-            // Add loading effect to grid
-            menuGrid.style.opacity = '0.5';
-            
-            // Filter with delay for smooth transition
-            setTimeout(() => {
-                let visibleCount = 0;
-                
-                menuCards.forEach((card, index) => {
-                    const cardCategory = card.getAttribute('data-category');
-                    
-                    if (selectedCategory === 'all' || cardCategory === selectedCategory) {
-                        card.style.display = 'flex';
-                        
-                        // Stagger animation
-                        setTimeout(() => {
-                            card.style.opacity = '1';
-                            card.style.animation = `fadeInUp 0.5s ease-out ${visibleCount * 0.05}s forwards`;
-                        }, 50);
-                        
-                        visibleCount++;
-                    } else {
-                        card.style.opacity = '0';
-                        setTimeout(() => {
-                            card.style.display = 'none';
-                        }, 300);
-                    }
-                });
-                
-                // Remove loading effect
-                menuGrid.style.opacity = '1';
-                this.classList.remove('filtering');
-                
-                // Show empty state if no results
-                showEmptyState(visibleCount);
-            }, 200);
+            state.category = this.getAttribute('data-category');
+            fetchMenu(false).finally(() => this.classList.remove('filtering'));
         });
     });
 
+    // ==========================================
+    // SORT
+    // ==========================================
+    if (sortSelect) {
+        sortSelect.addEventListener('change', function() {
+            state.sort = this.value;
+            fetchMenu(false);
+        });
+    }
+
+    // ==========================================
+    // LOAD MORE (tanpa reload halaman)
+    // ==========================================
+    if (loadMoreBtn) {
+        loadMoreBtn.addEventListener('click', function(e) {
+            e.preventDefault();
+            if (state.cursor) fetchMenu(true);
+        });
+    }
+
     // ==========================================
     // EMPTY STATE HANDLER
     // ==========================================
     function showEmptyState(count) {
-        let emptyState = document.querySelector('.empty-state-filter');
-        
-        if (count === 0 && menuCards.length > 0) {
-            if (!emptyState) {
-                emptyState = document.createElement('div');
-                emptyState.className = 'empty-state empty-state-filter';
-                emptyState.innerHTML = `
-                    <div class="empty-icon">
-                        <i class="fas fa-search"></i>
-                    </div>
-                    <h3>Kategori Tidak Ditemukan</h3>
-                    <p>Tidak ada menu dalam kategori ini</p>
-                `;
-                menuGrid.appendChild(emptyState);
-            }
-            emptyState.style.display = 'block';
-        } else if (emptyState) {
-            emptyState.style.display = 'none';
-        }
+        if (count > 0) return;
+        menuGrid.innerHTML = `
+            <div class="empty-state empty-state-filter">
+                <div class="empty-icon">
+                    <i class="fas fa-search"></i>
+                </div>
+                <h3>Menu Tidak Ditemukan</h3>
+                <p>Tidak ada menu yang cocok dengan filter ini</p>
+            </div>
+        `;
     }
 
     // ==========================================
@@ -107,10 +144,19 @@ document.addEventListener('DOMContentLoaded', function() {
         rootMargin: '50px'
     });
 
-    // Observe all menu images
-    document.querySelectorAll('.menu-image img').forEach(img => {
-        imageObserver.observe(img);
-    });
+    // Observe menu images + fallback gambar error (juga untuk kartu hasil fetch)
+    function initCards(root) {
+        root.querySelectorAll('.menu-image img:not([data-initialized])').forEach(img => {
+            img.dataset.initialized = 'true';
+            imageObserver.observe(img);
+            img.addEventListener('error', function() {
+                this.src = 'https://images.unsplash.com/photo-1546069901-ba9599a7e63c?w=400&h=400&fit=crop';
+                this.alt = 'Gambar tidak tersedia';
+            });
+        });
+    }
+
+    initCards(menuGrid);
 
     // ==========================================
     // SMOOTH SCROLL TO TOP ON CATEGORY CHANGE
@@ -148,40 +194,17 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     // ==========================================
-    // SEARCH FUNCTIONALITY (if exists)
+    // SEARCH FUNCTIONALITY (server-side)
     // ==========================================
     const searchInput = document.getElementById('searchInput');
     if (searchInput) {
+        searchInput.value = state.search;
+
         const handleSearch = debounce(function(e) {
-            const searchTerm = e.target.value.toLowerCase().trim();
-            let visibleCount = 0;
-            
-            menuCards.forEach(card => {
-                const menuTitle = card.querySelector('.menu-title').textContent.toLowerCase();
-                const menuDesc = card.querySelector('.menu-desc').textContent.toLowerCase();
-                const menuCategory = card.querySelector('.menu-category-tag').textContent.toLowerCase();
-                
-                if (menuTitle.includes(searchTerm) || 
-                    menuDesc.includes(searchTerm) || 
-                    menuCategory.includes(searchTerm)) {
-                    card.style.display = 'flex';
-                    card.style.opacity = '1';
-                    visibleCount++;
-                } else {
-                    card.style.opacity = '0';
-                    setTimeout(() => {
-                        card.style.display = 'none';
-                    }, 300);
-                }
-            });
-            
-            // Reset category filter if searching
-            if (searchTerm) {
-                categoryButtons.forEach(btn => btn.classList.remove('active'));
-                document.querySelector('[data-category="all"]')?.classList.add('active');
-            }
-            
-            showEmptyState(visibleCount);
+            const searchTerm = e.target.value.trim();
+            if (searchTerm === state.search) return;
+            state.search = searchTerm;
+            fetchMenu(false);
         }, 300);
         
         searchInput.addEventListener('input', handleSearch);
@@ -249,20 +272,10 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
-    // ==========================================
-    // ERROR HANDLING FOR IMAGES
-    // ==========================================
-    document.querySelectorAll('.menu-image img').forEach(img => {
-        img.addEventListener('error', function() {
-            this.src = 'https://images.unsplash.com/photo-1546069901-ba9599a7e63c?w=400&h=400&fit=crop';
-            this.alt = 'Gambar tidak tersedia';
-        });
-    });
-
     // ==========================================
     // INITIALIZE: Set default state
     // ==========================================
     console.log('✅ Menu page initialized');
-    console.log(`📦 Total products: ${menuCards.length}`);
+    console.log(`📦 Products on page: ${menuGrid.querySelectorAll('.menu-card').length}`);
     console.log(`🏷️ Total categories: ${categoryButtons.length - 1}`); // -1 for "all" button
 });
\ No newline at end of file